@@ -1,3 +1,19 @@
-from ormm.network.main import transportation_model, Graph
+from ormm.network.main import facility_location_model, \
+    multicommodity_flow_model, transportation_model, \
+    transshipment_model, Graph
+from ormm.network.compact import CompactGraph
+from ormm.network.facilities import solve_p_median
+from ormm.network.flows import linear_assignment, max_flow, \
+    network_simplex, solve_multicommodity_flow, solve_transportation
+from ormm.network.hierarchy import ContractionHierarchy
+from ormm.network.paths import NegativeCycleError, ShortestPathTree
+from ormm.network.snapshot import GraphSnapshot
+from ormm.network.tours import solve_tsp
 
-__all__ = ["transportation_model", "Graph"]
+__all__ = ["transportation_model", "solve_transportation",
+           "network_simplex", "transshipment_model",
+           "multicommodity_flow_model", "solve_multicommodity_flow",
+           "max_flow", "linear_assignment", "solve_tsp",
+           "facility_location_model", "solve_p_median",
+           "Graph", "CompactGraph", "GraphSnapshot", "ContractionHierarchy",
+           "NegativeCycleError", "ShortestPathTree"]
@@ -0,0 +1,1300 @@
+"""
+Compact, array-backed graph representation.
+
+Node labels are interned to integer ids, and the arcs are kept in
+CSR (compressed sparse row) style NumPy arrays.  This uses a fraction of the
+memory of the dict based :py:obj:`Graph`, and lets algorithms work over
+contiguous arrays instead of hashing labels and arc tuples.
+"""
+
+from collections import defaultdict
+import os
+
+import numpy as np
+import pandas as pd
+
+from ormm.network.facilities import solve_p_median
+from ormm.network.flows import linear_assignment, max_flow, \
+    network_simplex, solve_multicommodity_flow
+from ormm.network.paths import _arc_position, bellman_ford, \
+    bidirectional_dijkstra, dijkstra, dijkstra_many, floyd_warshall, \
+    k_shortest_paths, NegativeCycleError, point_to_point, repair_tree, \
+    ShortestPathTree
+from ormm.network.projects import critical_path, pert
+from ormm.network.spatial import EARTH_RADIUS, neighbor_pairs
+from ormm.network.tours import solve_tsp
+from ormm.network.trees import connected_components, kruskal, prim, \
+    strongly_connected_components
+
+# Largest graph solved with Floyd-Warshall by method="auto"
+_FLOYD_WARSHALL_MAX_NODES = 300
+
+
+_ARRAY_NAMES = ["labels", "offsets", "targets", "costs"]
+
+
+def _index_dtype(size):
+    """Smallest integer dtype used to store ids/positions below `size`"""
+    return np.int32 if size < np.iinfo(np.int32).max else np.int64
+
+
+def _label_array(labels):
+    """1-D array of node labels, keeping labels such as tuples whole"""
+    if isinstance(labels, np.ndarray) and labels.ndim == 1:
+        return labels
+    return pd.Series(list(labels), dtype=object).to_numpy()
+
+
+def _storable_labels(labels):
+    """
+    Convert labels to a non-object array where possible, so they can be
+    saved without pickling and memory-mapped when loaded
+    """
+    if labels.dtype != object:
+        return labels
+    label_types = {type(label) for label in labels.tolist()}
+    if label_types == {str}:
+        return labels.astype(str)
+    if label_types == {int}:
+        return labels.astype(np.int64)
+    return labels
+
+
+def _point_labels(coordinates, labels):
+    """
+    Label of each row of `coordinates` - `labels` if given, else the
+    index of a DataFrame, else 0 through n - 1
+    """
+    if labels is None:
+        labels = (coordinates.index if isinstance(coordinates, pd.DataFrame)
+                  else range(len(coordinates)))
+    labels = _label_array(labels)
+    if len(labels) != len(coordinates):
+        raise ValueError("Argument `labels` must be the same length as"
+                         " `coordinates`!")
+    if not pd.Series(labels).is_unique:
+        raise ValueError("Point labels must be unique!")
+    return labels
+
+
+class CompactGraph():
+    """
+    Network of nodes and arcs stored in CSR style NumPy arrays.
+
+    Node `i` has label ``labels[i]``, and its outgoing arcs are
+    ``targets[offsets[i]:offsets[i + 1]]`` with costs
+    ``costs[offsets[i]:offsets[i + 1]]``.  Usually built with
+    :py:obj:`CompactGraph.from_graph`, :py:obj:`CompactGraph.from_arcs`,
+    or :py:obj:`Graph.to_compact` rather than directly.
+
+    Parameters
+    ----------
+    labels : array-like
+        Label of each node; a node's id is its position in `labels`
+    offsets : array-like
+        Array of length n + 1 with the start of each node's arcs
+    targets : array-like
+        Array of length m with the to node id of each arc
+    costs : array-like
+        Array of length m with the cost of each arc
+    capacities : array-like, optional
+        Array of length m with the capacity of each arc, ``inf`` for no
+        limit.  None if no arcs have capacities.
+    """
+    def __init__(self, labels, offsets, targets, costs, capacities=None):
+        self.labels = np.asanyarray(labels)
+        self.offsets = np.asanyarray(offsets)
+        self.targets = np.asanyarray(targets)
+        self.costs = np.asanyarray(costs)
+        self.capacities = (np.asanyarray(capacities)
+                           if capacities is not None else None)
+        self.index = {label: node_id
+                      for node_id, label in enumerate(self.labels.tolist())}
+        self._reverse = None
+
+    def __repr__(self):
+        return (f"CompactGraph(num_nodes={self.num_nodes}, "
+                f"num_arcs={self.num_arcs})")
+
+    @property
+    def num_nodes(self):
+        """Number of nodes in the graph"""
+        return len(self.labels)
+
+    @property
+    def num_arcs(self):
+        """Number of (one-directional) arcs in the graph"""
+        return len(self.targets)
+
+    @property
+    def sources(self):
+        """Array of length m with the from node id of each arc"""
+        return np.repeat(np.arange(self.num_nodes, dtype=self.targets.dtype),
+                         np.diff(self.offsets))
+
+    @property
+    def arrays(self):
+        """Tuple of the (offsets, targets, costs) CSR arrays"""
+        return self.offsets, self.targets, self.costs
+
+    def reverse(self):
+        """
+        Return the graph with the direction of every arc reversed.
+
+        Built the first time it is needed, then kept for later calls.
+
+        Returns
+        -------
+        CompactGraph
+        """
+        if self._reverse is None:
+            self._reverse = self._from_ids(
+                self.labels, self.targets.astype(np.int64),
+                self.sources.astype(np.int64), self.costs, self.capacities)
+            self._reverse._reverse = self
+        return self._reverse
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Build the compact representation of a :py:obj:`Graph`.
+
+        Parameters
+        ----------
+        graph : Graph
+            Graph object to copy the nodes, arcs, costs, and capacities
+            from
+
+        Returns
+        -------
+        CompactGraph
+        """
+        from_nodes, to_nodes, costs = [], [], []
+        for from_node, arcs in graph.arcs.items():
+            for to_node in arcs:
+                from_nodes.append(from_node)
+                to_nodes.append(to_node)
+                costs.append(graph.costs[(from_node, to_node)])
+        capacities = None
+        if graph.capacities:
+            capacities = [graph.capacities.get(arc, np.inf)
+                          for arc in zip(from_nodes, to_nodes)]
+        return cls.from_arcs(from_nodes, to_nodes, costs, "one",
+                             nodes=graph.nodes, capacities=capacities)
+
+    @classmethod
+    def from_arcs(cls, from_nodes, to_nodes, costs, directions="two",
+                  nodes=None, capacities=None):
+        """
+        Build the compact representation directly from bulk arc data.
+
+        Arcs given more than once keep their first position and last cost,
+        the same as repeated calls to :py:obj:`Graph.add_arcs`.
+
+        Parameters
+        ----------
+        from_nodes : array-like
+            From node label of each arc
+        to_nodes : array-like
+            To node label of each arc
+        costs : array-like
+            Cost of each arc
+        directions : array-like or str, optional
+            Whether each arc is one-directional ("one") or
+            bi-directional ("two"), or one of those for every arc.  As
+            with :py:obj:`Graph.add_arcs`, all arcs are bi-directional
+            if not given.
+        nodes : iterable, optional
+            Extra node labels to include, such as nodes without any arcs
+        capacities : array-like, optional
+            Capacity of each arc, with ``inf`` or ``nan`` for no limit
+
+        Returns
+        -------
+        CompactGraph
+
+        Raises
+        ------
+        ValueError
+            If the arc arrays are not all the same length, or contain
+            missing node labels
+
+        Examples
+        --------
+        >>> compact = CompactGraph.from_arcs(["A", "B", "C"],
+        ...                                  ["B", "C", "A"],
+        ...                                  [7, 3, 8],
+        ...                                  ["one", "one", "two"])
+        >>> compact.shortest_path("A")["Costs"]
+        {'A': 0.0, 'B': 7.0, 'C': 8.0}
+        """
+        from_nodes = _label_array(from_nodes)
+        to_nodes = _label_array(to_nodes)
+        costs = np.asarray(costs, dtype=float)
+        if not len(from_nodes) == len(to_nodes) == len(costs):
+            raise ValueError("Arguments `from_nodes`, `to_nodes`, and"
+                             " `costs` must all be the same length!")
+        if capacities is not None:
+            capacities = np.asarray(capacities, dtype=float)
+            if len(capacities) != len(costs):
+                raise ValueError("Argument `capacities` must be the same"
+                                 " length as `costs`!")
+            capacities = np.where(np.isnan(capacities), np.inf, capacities)
+        num_arcs = len(costs)
+        # Intern labels in order of first appearance
+        codes, labels = pd.factorize(
+            np.concatenate([from_nodes.astype(object),
+                            to_nodes.astype(object)]))
+        if (codes < 0).any():
+            raise ValueError("Arc data contains missing node labels!")
+        if nodes is not None:
+            known = set(labels.tolist())
+            extra = [node for node in nodes if node not in known]
+            labels = np.concatenate([np.asarray(labels, dtype=object),
+                                     _label_array(extra)])
+        from_ids = codes[:num_arcs].astype(np.int64)
+        to_ids = codes[num_arcs:].astype(np.int64)
+        # Expand bi-directional arcs into both directions
+        two_way = np.broadcast_to(np.asarray(directions) == "two",
+                                  (num_arcs,))
+        if two_way.any():
+            from_ids, to_ids = (np.concatenate([from_ids, to_ids[two_way]]),
+                                np.concatenate([to_ids, from_ids[two_way]]))
+            costs = np.concatenate([costs, costs[two_way]])
+            if capacities is not None:
+                capacities = np.concatenate([capacities,
+                                             capacities[two_way]])
+        return cls._from_ids(labels, from_ids, to_ids, costs, capacities)
+
+    @classmethod
+    def from_coordinates(cls, coordinates, labels=None, k=None, radius=None,
+                         metric="euclidean", direction="two",
+                         earth_radius=EARTH_RADIUS):
+        """
+        Same as :py:obj:`Graph.from_coordinates`, but builds the compact
+        arrays directly from the neighbor pairs.
+        """
+        labels = _point_labels(coordinates, labels)
+        sources, targets, distances = neighbor_pairs(
+            coordinates, k, radius, metric, direction == "two",
+            earth_radius)
+        if direction == "two":
+            sources, targets = (np.concatenate([sources, targets]),
+                                np.concatenate([targets, sources]))
+            distances = np.concatenate([distances, distances])
+        return cls._from_ids(labels, sources, targets, distances)
+
+    @classmethod
+    def _from_ids(cls, labels, from_ids, to_ids, costs, capacities=None):
+        """Deduplicate and sort interned arcs into CSR arrays"""
+        num_nodes = len(labels)
+        # Keep the first position and last cost of repeated arcs
+        keys = from_ids * num_nodes + to_ids
+        _, first = np.unique(keys, return_index=True)
+        _, last_reversed = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - last_reversed
+        order = np.argsort(first, kind="stable")
+        first, last = first[order], last[order]
+        from_ids, to_ids, costs = from_ids[first], to_ids[first], costs[last]
+        # Sort by from node (keeping insertion order within a node)
+        order = np.argsort(from_ids, kind="stable")
+        if capacities is not None:
+            capacities = capacities[last][order]
+        offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(from_ids, minlength=num_nodes),
+                  out=offsets[1:])
+        targets = to_ids[order].astype(_index_dtype(num_nodes))
+        return cls(labels, offsets, targets, costs[order], capacities)
+
+    def save(self, path):
+        """
+        Save the graph's arrays to a directory of ``.npy`` files.
+
+        Node labels are saved as a string or integer array when they are
+        all strings or all integers (otherwise they are pickled), and the
+        offsets, targets, costs, and any capacities as raw arrays, so they
+        can be memory-mapped by :py:obj:`CompactGraph.load`.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Directory to save the arrays in.  Created if it does not exist.
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {"labels": _storable_labels(self.labels),
+                  "offsets": self.offsets,
+                  "targets": self.targets,
+                  "costs": self.costs}
+        if self.capacities is not None:
+            arrays["capacities"] = self.capacities
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), array,
+                    allow_pickle=array.dtype == object)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """
+        Load a graph saved with :py:obj:`CompactGraph.save`.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Directory the arrays were saved in
+        mmap_mode : str, optional
+            Passed into :py:obj:`numpy.load`.  Use "r" to memory-map the
+            arrays read-only, so processes loading the same files share
+            one copy through the operating system's page cache instead
+            of each reading it into their own memory.  Pickled labels are
+            always read into memory.
+
+        Returns
+        -------
+        CompactGraph
+        """
+        arrays = {}
+        for name in _ARRAY_NAMES:
+            filename = os.path.join(path, f"{name}.npy")
+            try:
+                arrays[name] = np.load(filename, mmap_mode=mmap_mode)
+            except ValueError:
+                # Object arrays cannot be memory-mapped
+                arrays[name] = np.load(filename, allow_pickle=True)
+        filename = os.path.join(path, "capacities.npy")
+        if os.path.exists(filename):
+            arrays["capacities"] = np.load(filename, mmap_mode=mmap_mode)
+        return cls(**arrays)
+
+    def shortest_path(self, source, predecessors=False, method="dijkstra"):
+        """
+        Solve the shortest path tree problem.
+
+        Same as :py:obj:`Graph.shortest_path`, but solved over the
+        compact arrays.
+
+        Parameters
+        ----------
+        source
+            The source node label to use for minimizing the distance
+            to all other nodes
+        predecessors : bool, optional
+            If True, return a :py:obj:`ShortestPathTree` holding the
+            cost and predecessor arrays, which builds paths only when
+            they are asked for
+        method : str, optional
+            "dijkstra" (default) for Dijkstra's Algorithm, which requires
+            nonnegative costs, or "bellman_ford" for the label correcting
+            algorithm (see :py:obj:`ormm.network.paths.bellman_ford`),
+            which allows negative costs
+
+        Returns
+        -------
+        dictionary or ShortestPathTree
+            Contains minimum costs and best paths to achieve those
+            minimum costs, for every node reachable from `source`
+
+        Raises
+        ------
+        ValueError
+            If method "dijkstra" is used and the graph contains any
+            negative costs (arc lengths), if `source` does not exist in
+            the graph, or if `method` is not recognized
+        NegativeCycleError
+            If method "bellman_ford" is used and a negative cycle can be
+            reached from `source`.  Its `cycle` attribute lists the node
+            labels around the cycle.
+        """
+        if method == "dijkstra":
+            self._check_nonnegative()
+            source_id = self._node_id(source)
+            dist, pred = dijkstra(*self.arrays, source_id)
+        elif method == "bellman_ford":
+            source_id = self._node_id(source)
+            try:
+                dist, pred = bellman_ford(*self.arrays, source_id)
+            except NegativeCycleError as error:
+                raise self._labeled_cycle_error(error) from None
+        else:
+            raise ValueError("Argument 'method' must be either 'dijkstra'"
+                             " or 'bellman_ford'!")
+        tree = ShortestPathTree(self.labels, source_id, dist, pred,
+                                index=self.index)
+        if predecessors:
+            return tree
+        return {"Costs": tree.costs, "Paths": tree.paths()}
+
+    def shortest_paths(self, sources, predecessors=False, processes=None,
+                       chunksize=None):
+        """
+        Solve the shortest path tree problem from each of many sources,
+        spread over a pool of worker processes.
+
+        Same as :py:obj:`Graph.shortest_paths`, but solved over the
+        compact arrays.  If this graph was loaded with
+        ``CompactGraph.load(path, mmap_mode="r")``, the workers map the
+        saved files instead of each receiving a copy of the arrays.
+
+        Parameters
+        ----------
+        sources : iterable
+            Source node labels
+        predecessors : bool, optional
+            If True, return a :py:obj:`ShortestPathTree` for each source
+        processes : int, optional
+            Most worker processes to use, as in :py:obj:`dijkstra_many`.
+            Defaults to 1, solving every tree in this process.
+        chunksize : int, optional
+            Number of sources handed to a worker at a time
+
+        Returns
+        -------
+        dictionary
+            Result of :py:obj:`shortest_path` for each source
+
+        Raises
+        ------
+        ValueError
+            If the graph contains any negative costs, or a source does
+            not exist in the graph
+        """
+        self._check_nonnegative()
+        sources = list(dict.fromkeys(sources))
+        source_ids = [self._node_id(source) for source in sources]
+        dist, pred = dijkstra_many(*self.arrays, source_ids,
+                                   processes=processes, chunksize=chunksize)
+        results = {}
+        for row, (source, source_id) in enumerate(zip(sources, source_ids)):
+            tree = ShortestPathTree(self.labels, source_id, dist[row],
+                                    pred[row], index=self.index)
+            results[source] = tree if predecessors else {
+                "Costs": tree.costs, "Paths": tree.paths()}
+        return results
+
+    def update_costs(self, from_nodes, to_nodes, costs, trees=None):
+        """
+        Change the costs of existing arcs in place, and repair shortest
+        path trees solved before the change.
+
+        Each tree is repaired with :py:obj:`ormm.network.paths.repair_tree`,
+        which only solves again the part of the tree whose costs or paths
+        change, so small changes (such as live traffic updates) take a
+        fraction of the time of solving the tree again.
+
+        Parameters
+        ----------
+        from_nodes, to_nodes : array-like
+            From and to node label of each arc to change
+        costs : array-like
+            New cost of each arc
+        trees : iterable of ShortestPathTree, optional
+            Trees from :py:obj:`shortest_path` with `predecessors`, solved
+            over this graph with the old costs
+
+        Returns
+        -------
+        list of ShortestPathTree
+            Repaired copy of each of `trees`.  The trees given are not
+            changed.
+
+        Raises
+        ------
+        ValueError
+            If an arc does not exist in the graph, or if `trees` are given
+            and a new cost is negative
+        """
+        costs = np.asarray(costs, dtype=float)
+        trees = list(trees) if trees is not None else []
+        if trees and (costs < 0).any():
+            raise ValueError("Non-negative costs (arc lengths) required"
+                             " to repair shortest path trees!")
+        arcs = []
+        for from_node, to_node in zip(from_nodes, to_nodes):
+            from_id = self._node_id(from_node)
+            to_id = self._node_id(to_node, "Destination")
+            start, end = self.offsets[from_id], self.offsets[from_id + 1]
+            if not (self.targets[start:end] == to_id).any():
+                raise ValueError(f"Arc ({from_node}, {to_node}) does not"
+                                 " exist in the Graph!")
+            arcs.append((from_id, to_id))
+        for graph, ends in [(self, arcs), (self._reverse, [
+                (to_id, from_id) for from_id, to_id in arcs])]:
+            if graph is None:
+                continue
+            for (from_id, to_id), cost in zip(ends, costs.tolist()):
+                graph.costs[_arc_position(graph.offsets, graph.targets,
+                                          from_id, to_id)] = cost
+        repaired = []
+        for tree in trees:
+            dist, pred, _ = repair_tree(self.arrays, self.reverse().arrays,
+                                        tree.dist, tree.pred, arcs)
+            repaired.append(ShortestPathTree(self.labels, tree.source, dist,
+                                             pred, index=self.index))
+        return repaired
+
+    def _check_nonnegative(self):
+        """Raise a ValueError if any arc has a negative cost"""
+        if self.num_arcs and self.costs.min() < 0:
+            raise ValueError("Non-negative costs (arc lengths) required"
+                             " for Dijkstra's Algorithm for"
+                             " shortest path tree problem!  Use"
+                             " method 'bellman_ford' for negative costs.")
+
+    def _labeled_cycle_error(self, error):
+        """Copy of a NegativeCycleError with node labels in its cycle"""
+        cycle = (self.labels[error.cycle].tolist()
+                 if error.cycle is not None else None)
+        return NegativeCycleError(str(error), cycle)
+
+    def _node_id(self, node, kind="Source"):
+        """Interned id of a node label, or a ValueError if not found"""
+        if node not in self.index:
+            raise ValueError(f"{kind} Node {node} does not " +
+                             "exist in the Graph!")
+        return self.index[node]
+
+    def shortest_path_to(self, source, target, method="dijkstra",
+                         heuristic=None, coordinates=None):
+        """
+        Solve the shortest path problem from `source` to `target` only.
+
+        Unlike :py:obj:`shortest_path`, the search stops as soon as the
+        best path to `target` is known, so nodes farther away than
+        `target` are usually never reached.
+
+        Parameters
+        ----------
+        source
+            The source node label
+        target
+            The destination node label
+        method : str, optional
+            "dijkstra" (default) for Dijkstra's Algorithm with an early
+            exit, "bidirectional" to search from both `source` and
+            `target` at once, or "astar" to guide the search towards
+            `target` with `heuristic` or `coordinates`
+        heuristic : callable, optional
+            For method "astar", a function ``heuristic(node, target)``
+            of node labels giving a lower bound on the cost from `node`
+            to `target`.  It must never overestimate that cost for the
+            path to be optimal.
+        coordinates : dict, optional
+            For method "astar" without a `heuristic`, the coordinates of
+            each node, e.g. {"A": (0, 1), ...}.  The straight line
+            distance to `target` is used as the heuristic, which is only
+            valid if no arc costs less than the distance between its
+            nodes.
+
+        Returns
+        -------
+        dictionary
+            The minimum "Cost" (``inf`` if `target` cannot be reached)
+            and best "Path" (tuple of node labels, None if unreachable)
+
+        Raises
+        ------
+        ValueError
+            If the graph contains any negative costs, if `source` or
+            `target` does not exist in the graph, if `method` is not
+            recognized, or if method "astar" is given neither a
+            `heuristic` nor `coordinates`
+        """
+        self._check_nonnegative()
+        source_id = self._node_id(source)
+        target_id = self._node_id(target, "Destination")
+        if method == "dijkstra":
+            cost, path = point_to_point(*self.arrays, source_id, target_id)
+        elif method == "bidirectional":
+            cost, path = bidirectional_dijkstra(
+                self.arrays, self.reverse().arrays, source_id, target_id)
+        elif method == "astar":
+            labels = self.labels.tolist()
+            if heuristic is not None:
+                def node_heuristic(node_id):
+                    return heuristic(labels[node_id], target)
+            elif coordinates is not None:
+                target_point = np.asarray(coordinates[target], dtype=float)
+
+                def node_heuristic(node_id):
+                    point = np.asarray(coordinates[labels[node_id]],
+                                       dtype=float)
+                    return float(np.sqrt(((point - target_point)**2).sum()))
+            else:
+                raise ValueError("Method 'astar' requires either a"
+                                 " `heuristic` or `coordinates`!")
+            cost, path = point_to_point(*self.arrays, source_id, target_id,
+                                        heuristic=node_heuristic)
+        else:
+            raise ValueError("Argument 'method' must be one of 'dijkstra',"
+                             " 'bidirectional', or 'astar'!")
+        if path is not None:
+            path = tuple(self.labels[path].tolist())
+            cost = float(cost)
+        return {"Cost": cost, "Path": path}
+
+    def k_shortest_paths(self, source, target, k):
+        """
+        Find the `k` best loopless paths from `source` to `target`.
+
+        Uses Yen's Algorithm, with each spur search guided by the exact
+        costs to `target` - see
+        :py:obj:`ormm.network.paths.k_shortest_paths` for details.
+
+        Parameters
+        ----------
+        source
+            The source node label
+        target
+            The destination node label
+        k : int
+            Number of paths to find
+
+        Returns
+        -------
+        dictionary
+            The "Costs" (list) and "Paths" (list of tuples of node
+            labels) of up to `k` paths, from best to worst.  Both are
+            empty if `target` cannot be reached.
+
+        Raises
+        ------
+        ValueError
+            If the graph contains any negative costs, or if `source` or
+            `target` does not exist in the graph
+        """
+        self._check_nonnegative()
+        source_id = self._node_id(source)
+        target_id = self._node_id(target, "Destination")
+        results = k_shortest_paths(self.arrays, self.reverse().arrays,
+                                   source_id, target_id, k)
+        return {"Costs": [cost for cost, _ in results],
+                "Paths": [tuple(self.labels[path].tolist())
+                          for _, path in results]}
+
+    def all_pairs_shortest_path(self, method="auto", predecessors=False,
+                                processes=None):
+        """
+        Solve the shortest path problem between every pair of nodes.
+
+        Parameters
+        ----------
+        method : str, optional
+            "floyd_warshall" for the vectorized Floyd-Warshall algorithm,
+            which suits small, dense graphs and allows negative costs,
+            or "dijkstra" for Dijkstra's Algorithm from every node, spread
+            over a pool of processes, which suits large sparse graphs.
+            The default "auto" uses Floyd-Warshall for graphs of up to
+            300 nodes, and Dijkstra otherwise.
+        predecessors : bool, optional
+            Whether to return the predecessor matrix as well
+        processes : int, optional
+            Most worker processes for method "dijkstra".  Defaults to 1.
+
+        Returns
+        -------
+        dictionary
+            "Nodes" is the array of node labels giving the order of the
+            matrix rows and columns, and "Costs" is the n x n matrix of
+            minimum costs from row node to column node (``inf`` if
+            unreachable).  If `predecessors` is True, "Predecessors" is
+            the n x n matrix of the node id before the column node on the
+            best path from the row node (-1 if none).
+
+        Raises
+        ------
+        ValueError
+            If `method` is not recognized, or if method "dijkstra" is used
+            with negative costs
+        NegativeCycleError
+            If the graph contains a negative cycle
+        """
+        if method == "auto":
+            method = ("floyd_warshall"
+                      if self.num_nodes <= _FLOYD_WARSHALL_MAX_NODES
+                      else "dijkstra")
+        if method == "floyd_warshall":
+            try:
+                dist, pred = floyd_warshall(self.sources, self.targets,
+                                            self.costs, self.num_nodes)
+            except NegativeCycleError as error:
+                raise self._labeled_cycle_error(error) from None
+        elif method == "dijkstra":
+            self._check_nonnegative()
+            dist, pred = dijkstra_many(*self.arrays, range(self.num_nodes),
+                                       processes=processes)
+        else:
+            raise ValueError("Argument 'method' must be one of 'auto',"
+                             " 'floyd_warshall', or 'dijkstra'!")
+        analysis = {"Nodes": self.labels, "Costs": dist}
+        if predecessors:
+            analysis["Predecessors"] = pred
+        return analysis
+
+    def max_flow(self, source, sink):
+        """
+        Solve the maximum flow and minimum cut problems.
+
+        Same as :py:obj:`Graph.max_flow`, but solved over the compact
+        arrays.
+
+        Parameters
+        ----------
+        source
+            Node the flow starts at
+        sink
+            Node the flow ends at
+
+        Returns
+        -------
+        dictionary
+            "Flow" is the maximum flow from `source` to `sink`, "Flows"
+            the flow on each arc that carries any, e.g.
+            {("A", "B"): 5.0, ...}, "Cut" the arcs of a minimum cut, and
+            "SourceSide" the set of nodes on the source side of the cut
+
+        Raises
+        ------
+        ValueError
+            If `source` or `sink` does not exist in the graph, they are
+            the same node, or they are connected by a path of arcs
+            without capacities
+        """
+        source_id = self._node_id(source)
+        sink_id = self._node_id(sink, "Sink")
+        capacities = (self.capacities if self.capacities is not None
+                      else np.full(self.num_arcs, np.inf))
+        sources = self.sources
+        value, flows, source_side = max_flow(
+            self.num_nodes, sources, self.targets, capacities,
+            source_id, sink_id)
+        labels = self.labels
+
+        def arc_labels(arcs):
+            return list(zip(labels[sources[arcs]].tolist(),
+                            labels[self.targets[arcs]].tolist()))
+
+        used = np.flatnonzero(flows > 0)
+        cut = np.flatnonzero(source_side[sources] &
+                             ~source_side[self.targets])
+        return {"Flow": value,
+                "Flows": dict(zip(arc_labels(used), flows[used].tolist())),
+                "Cut": arc_labels(cut),
+                "SourceSide": set(labels[source_side].tolist())}
+
+    def solve_transshipment(self, supply):
+        """
+        Solve the minimum cost transshipment problem.
+
+        Same as :py:obj:`Graph.solve_transshipment`, but solved over the
+        compact arrays.
+
+        Parameters
+        ----------
+        supply : dict
+            Net supply of each node - positive for supply nodes and
+            negative for demand nodes, e.g. {"A": 15, "D": -15}
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the minimum total shipping cost, "Flows" the flow
+            on each arc that carries any, e.g. {("A", "B"): 15.0, ...},
+            and "FlowBalanceConstraint" the dual value of each node's
+            constraint
+
+        Raises
+        ------
+        ValueError
+            If a node in `supply` does not exist in the graph, total
+            supply does not equal total demand, or the problem is
+            infeasible or unbounded
+        """
+        supplies = np.zeros(self.num_nodes)
+        for node, amount in supply.items():
+            supplies[self._node_id(node, "Supply")] = amount
+        sources = self.sources
+        flows, potentials = network_simplex(
+            self.num_nodes, sources, self.targets, self.costs, supplies,
+            self.capacities)
+        if supply:
+            # Shift duals so the first node of `supply` has zero (they
+            #  are only unique up to a constant)
+            potentials = potentials - potentials[self.index[next(
+                iter(supply))]]
+        labels = self.labels
+        used = np.flatnonzero(flows > 0)
+        return {"OBJ": float(flows @ self.costs),
+                "Flows": dict(zip(zip(labels[sources[used]].tolist(),
+                                      labels[self.targets[used]].tolist()),
+                                  flows[used].tolist())),
+                "FlowBalanceConstraint": dict(zip(labels.tolist(),
+                                                  potentials.tolist()))}
+
+    def solve_multicommodity_flow(self, commodities, iterations=1000,
+                                  tolerance=1e-3):
+        """
+        Solve the multi-commodity flow problem by Lagrangian relaxation.
+
+        Same as :py:obj:`Graph.solve_multicommodity_flow`, but solved
+        over the compact arrays.
+
+        Parameters
+        ----------
+        commodities : dict
+            Net supply of each commodity at each node, e.g.
+            {"Bikes": {"A": 10, "C": -4, "D": -6}, ...}.  Each commodity
+            must have a single supply node.
+        iterations : int, optional
+            Most iterations to run
+        tolerance : float, optional
+            Stop once the cost is this close to the lower bound, as a
+            fraction of it, and no capacity is exceeded by more than this
+            fraction of the largest demand
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the total shipping cost, "LowerBound" a lower bound
+            on the optimal cost, "Flows" the flow of each commodity on
+            each arc that carries any, e.g.
+            {"Bikes": {("A", "B"): 10.0, ...}, ...}, "Paths" the flow of
+            each commodity sent down each path, keyed by the tuple of
+            nodes on the path, and "Violation" the most any arc's total
+            flow is over its capacity
+
+        Raises
+        ------
+        ValueError
+            If a node does not exist in the graph, a commodity does not
+            have exactly one supply node or its supply and demand do not
+            balance, an arc cost is negative, or a demand node cannot be
+            reached from its commodity's supply node
+        """
+        names, origins, destinations, demands = [], [], [], []
+        for name, supply in commodities.items():
+            supply_nodes = [node for node, amount in supply.items()
+                            if amount > 0]
+            if len(supply_nodes) != 1:
+                raise ValueError(f"Commodity {name} must have exactly " +
+                                 "one supply node!")
+            if not np.isclose(sum(supply.values()), 0):
+                raise ValueError(f"Supply and demand of Commodity {name} " +
+                                 "must be equal!")
+            origin = self._node_id(supply_nodes[0], "Supply")
+            for node, amount in supply.items():
+                if amount < 0:
+                    names.append(name)
+                    origins.append(origin)
+                    destinations.append(self._node_id(node, "Demand"))
+                    demands.append(-amount)
+        sources = self.sources
+        flows, paths, bound = solve_multicommodity_flow(
+            self.num_nodes, sources, self.targets, self.costs,
+            self.capacities, origins, destinations, demands, iterations,
+            tolerance)
+        labels = self.labels
+        commodity_paths = {name: {} for name in commodities}
+        commodity_flows = {name: defaultdict(float) for name in commodities}
+        for name, path_flows in zip(names, paths):
+            for path, flow in path_flows.items():
+                path = tuple(labels[list(path)].tolist())
+                commodity_paths[name][path] = flow
+                for arc in zip(path[:-1], path[1:]):
+                    commodity_flows[name][arc] += flow
+        violation = 0.0
+        if self.capacities is not None:
+            violation = float(np.max(flows - self.capacities, initial=0))
+        return {"OBJ": float(flows @ self.costs),
+                "LowerBound": bound,
+                "Flows": {name: dict(arc_flows)
+                          for name, arc_flows in commodity_flows.items()},
+                "Paths": commodity_paths,
+                "Violation": violation}
+
+    def minimum_spanning_tree(self, method="kruskal"):
+        """
+        Find a minimum spanning tree, treating every arc as undirected.
+
+        Same as :py:obj:`Graph.minimum_spanning_tree`, but solved over
+        the compact arrays.
+
+        Parameters
+        ----------
+        method : str, optional
+            "kruskal" for Kruskal's Algorithm, or "prim" for Prim's
+            Algorithm
+
+        Returns
+        -------
+        dictionary
+            "Cost" is the total cost of the tree, and "From", "To", and
+            "Costs" are arrays of the from node, to node, and cost of
+            each arc in the tree
+
+        Raises
+        ------
+        ValueError
+            If `method` is not recognized
+        """
+        if method == "kruskal":
+            solver = kruskal
+        elif method == "prim":
+            solver = prim
+        else:
+            raise ValueError("Argument 'method' must be either 'kruskal'"
+                             " or 'prim'!")
+        sources = self.sources
+        arcs = solver(self.num_nodes, sources, self.targets, self.costs)
+        costs = self.costs[arcs]
+        return {"Cost": float(costs.sum()),
+                "From": self.labels[sources[arcs]],
+                "To": self.labels[self.targets[arcs]],
+                "Costs": costs}
+
+    def connected_components(self, strong=False):
+        """
+        Label the connected components of the graph.
+
+        Same as :py:obj:`Graph.connected_components`, but solved over
+        the compact arrays.
+
+        Parameters
+        ----------
+        strong : bool, optional
+            Whether to find strongly connected components, following
+            arc directions, instead of ignoring them
+
+        Returns
+        -------
+        dictionary
+            "Nodes" is the array of node labels, "Components" the array
+            of each node's component number (0 to k - 1), and "Count"
+            the number of components k
+        """
+        if strong:
+            components = strongly_connected_components(self.offsets,
+                                                       self.targets)
+        else:
+            components = connected_components(self.num_nodes, self.sources,
+                                              self.targets)
+        return {"Nodes": self.labels, "Components": components,
+                "Count": int(components.max()) + 1 if len(components) else 0}
+
+    def critical_path(self):
+        """
+        Schedule the activities of a project network with the critical
+        path method (CPM).
+
+        Same as :py:obj:`Graph.critical_path`, but solved over the
+        compact arrays.
+
+        Returns
+        -------
+        dictionary
+            "Duration" of the project, arrays of the "From" and "To"
+            node, "Durations", "EarliestStart", "LatestStart", and
+            "Slack" of each activity, and the "CriticalPath" (tuple of
+            node labels)
+
+        Raises
+        ------
+        ValueError
+            If any cost is negative, or if the graph contains a cycle
+        """
+        sources = self.sources
+        duration, earliest_start, latest_start, slack, path = critical_path(
+            self.num_nodes, sources, self.targets, self.costs)
+        return {"Duration": duration,
+                "From": self.labels[sources],
+                "To": self.labels[self.targets],
+                "Durations": self.costs,
+                "EarliestStart": earliest_start,
+                "LatestStart": latest_start,
+                "Slack": slack,
+                "CriticalPath": tuple(self.labels[path].tolist())}
+
+    def pert(self, estimates, num_samples=10000, deadline=None,
+             distribution="beta", seed=None):
+        """
+        Simulate the completion time of a project network with uncertain
+        activity durations.
+
+        Same as :py:obj:`Graph.pert`, but solved over the compact arrays.
+
+        Parameters
+        ----------
+        estimates : dict
+            Three point (optimistic, most likely, pessimistic) duration
+            estimates of the activities, e.g. {("A", "B"): (2, 3, 5)}.
+            Activities left out always take their cost.
+        num_samples : int, optional
+            Number of simulated projects, 10,000 by default
+        deadline : float, optional
+            Time to find the probability of finishing the project by
+        distribution : str, optional
+            "beta" (default) or "triangular"
+        seed : int, optional
+            Seed for the random numbers, for repeatable results
+
+        Returns
+        -------
+        dictionary
+            "Mean" and "StdDev" of the project's completion time, the
+            simulated "Durations", the "Probability" of finishing by
+            `deadline` (None without one), and arrays of the "From" and
+            "To" node and "Criticality" of each activity
+
+        Raises
+        ------
+        ValueError
+            If the estimates are out of order or negative, if
+            `distribution` is not recognized, or if the graph contains
+            a cycle
+        """
+        sources = self.sources
+        from_nodes = self.labels[sources]
+        to_nodes = self.labels[self.targets]
+        costs = self.costs.tolist()
+        # Activities without estimates are fixed at their cost
+        optimistic, most_likely, pessimistic = np.array(
+            [estimates.get(arc, (cost, cost, cost)) for arc, cost in
+             zip(zip(from_nodes.tolist(), to_nodes.tolist()), costs)],
+            dtype=float).reshape(-1, 3).T
+        durations, criticality = pert(
+            self.num_nodes, sources, self.targets, optimistic, most_likely,
+            pessimistic, num_samples=num_samples,
+            distribution=distribution, seed=seed)
+        probability = (float((durations <= deadline).mean())
+                       if deadline is not None else None)
+        return {"Mean": float(durations.mean()),
+                "StdDev": float(durations.std()),
+                "Durations": durations,
+                "Probability": probability,
+                "From": from_nodes,
+                "To": to_nodes,
+                "Criticality": criticality}
+
+    def tsp(self, nodes=None, distances="shortest_paths",
+            construction="nearest", neighbors=10, time_limit=None,
+            processes=None):
+        """
+        Find a short tour through the nodes (traveling salesman
+        problem).
+
+        Same as :py:obj:`Graph.tsp`, but solved over the compact arrays.
+
+        Parameters
+        ----------
+        nodes : list, optional
+            Nodes to visit, starting and ending at the first one.  Every
+            node by default.
+        distances : str, optional
+            "shortest_paths" (default) to travel between the nodes along
+            shortest paths, or "costs" to only use the arcs between them
+        construction : str, optional
+            "nearest" (default) or "savings"
+        neighbors : int, optional
+            Number of nearest neighbors the local search tries for each
+            node, 10 by default
+        time_limit : float, optional
+            Seconds the local search may run for
+        processes : int, optional
+            Number of worker processes for the shortest paths
+
+        Returns
+        -------
+        dictionary
+            "Cost" of the tour (``inf`` if it uses an arc that does not
+            exist), and the "Tour" (tuple of node labels in the order
+            they are visited)
+
+        Raises
+        ------
+        ValueError
+            If a node does not exist in the graph, if `distances` or
+            `construction` is not recognized, or if `distances` is
+            "shortest_paths" and the graph contains negative costs
+        """
+        if nodes is None:
+            ids = np.arange(self.num_nodes)
+        else:
+            ids = np.array([self._node_id(node, "Tour")
+                            for node in dict.fromkeys(nodes)],
+                           dtype=np.int64)
+        if distances == "shortest_paths":
+            self._check_nonnegative()
+            matrix = dijkstra_many(*self.arrays, ids.tolist(),
+                                   processes=processes)[0][:, ids]
+        elif distances == "costs":
+            local = np.full(self.num_nodes, -1, dtype=np.int64)
+            local[ids] = np.arange(len(ids))
+            from_ids, to_ids = local[self.sources], local[self.targets]
+            keep = (from_ids != -1) & (to_ids != -1)
+            matrix = np.full((len(ids), len(ids)), np.inf)
+            np.minimum.at(matrix, (from_ids[keep], to_ids[keep]),
+                          self.costs[keep])
+            np.fill_diagonal(matrix, 0)
+        else:
+            raise ValueError("Argument 'distances' must be either"
+                             " 'shortest_paths' or 'costs'!")
+        missing = ~np.isfinite(matrix)
+        if missing.any():
+            # Missing arcs cost more than any tour that avoids them
+            matrix = np.where(missing,
+                              np.abs(matrix[~missing]).sum() + 1, matrix)
+        cost, tour = solve_tsp(matrix, construction=construction,
+                               neighbors=neighbors, time_limit=time_limit)
+        if missing[tour, np.roll(tour, -1)].any():
+            cost = np.inf
+        return {"Cost": cost, "Tour": tuple(self.labels[ids[tour]].tolist())}
+
+    def distance_matrix(self, sources, destinations=None, processes=None):
+        """
+        Shortest path costs from each of `sources` to each of
+        `destinations`.
+
+        Same as :py:obj:`Graph.distance_matrix`, but solved over the
+        compact arrays.
+
+        Parameters
+        ----------
+        sources : list
+            Nodes the paths start at (the rows)
+        destinations : list, optional
+            Nodes the paths end at (the columns).  Every node by default.
+        processes : int, optional
+            Number of worker processes, as in :py:obj:`shortest_paths`
+
+        Returns
+        -------
+        pandas.DataFrame
+            Minimum cost from each source to each destination, ``inf``
+            where a destination cannot be reached
+
+        Raises
+        ------
+        ValueError
+            If the graph contains any negative costs, or if a node does
+            not exist in the graph
+        """
+        self._check_nonnegative()
+        source_ids = [self._node_id(source) for source in sources]
+        if destinations is None:
+            destination_ids = np.arange(self.num_nodes)
+        else:
+            destination_ids = np.array(
+                [self._node_id(destination, "Destination")
+                 for destination in destinations], dtype=np.int64)
+        dist = dijkstra_many(*self.arrays, source_ids, processes=processes)[0]
+        return pd.DataFrame(dist[:, destination_ids],
+                            index=self.labels[source_ids],
+                            columns=self.labels[destination_ids])
+
+    def solve_p_median(self, candidates, customers, num_facilities,
+                       demand=None, distances=None, time_limit=None,
+                       processes=None):
+        """
+        Choose facilities that minimize the demand weighted distance
+        from each customer to its closest one (p-median problem).
+
+        Same as :py:obj:`Graph.solve_p_median`, but solved over the
+        compact arrays.
+
+        Parameters
+        ----------
+        candidates : list
+            Nodes facilities can be opened at
+        customers : list
+            Nodes to serve
+        num_facilities : int
+            Number of facilities to open
+        demand : dict, optional
+            Demand of each customer, 1 for customers left out
+        distances : pandas.DataFrame, optional
+            Distance matrix from :py:obj:`distance_matrix`, to skip
+            finding the shortest paths again
+        time_limit : float, optional
+            Seconds the swaps may run for
+        processes : int, optional
+            Number of worker processes for the shortest paths
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the total demand weighted distance (``inf`` if a
+            customer cannot be reached from any open facility),
+            "Facilities" the tuple of open facilities, and "Assignment"
+            a dict of the facility serving each customer
+
+        Raises
+        ------
+        ValueError
+            If a node does not exist in the graph, or if
+            `num_facilities` is not between 1 and the number of
+            candidates
+        """
+        candidates = list(dict.fromkeys(candidates))
+        customers = list(dict.fromkeys(customers))
+        if distances is None:
+            distances = self.distance_matrix(candidates, customers,
+                                             processes=processes)
+        matrix = distances.loc[candidates, customers].to_numpy(dtype=float)
+        demand = demand if demand is not None else {}
+        weights = np.array([demand.get(customer, 1)
+                            for customer in customers], dtype=float)
+        missing = ~np.isfinite(matrix)
+        if missing.any():
+            # Unreachable customers cost more than any reachable ones
+            matrix = np.where(missing,
+                              np.abs(matrix[~missing]).sum() + 1, matrix)
+        cost, facilities, assignment = solve_p_median(
+            matrix, num_facilities, weights, time_limit)
+        if missing[assignment, np.arange(len(customers))].any():
+            cost = np.inf
+        return {"OBJ": cost,
+                "Facilities": tuple(candidates[facility]
+                                    for facility in facilities.tolist()),
+                "Assignment": {customer: candidates[facility]
+                               for customer, facility in zip(
+                                   customers, assignment.tolist())}}
+
+    def assignment(self, sources, destinations):
+        """
+        Solve the assignment problem between two groups of nodes.
+
+        Same as :py:obj:`Graph.assignment`, but solved over the compact
+        arrays.
+
+        Parameters
+        ----------
+        sources : list
+            Nodes to assign from, e.g. ["W1", "W2"]
+        destinations : list
+            Nodes to assign to, e.g. ["J1", "J2", "J3"]
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the minimum total cost, and "Assignment" the
+            destination assigned to each source, e.g. {"W1": "J3", ...}
+
+        Raises
+        ------
+        ValueError
+            If a node does not exist in the graph, or the arcs between
+            the two groups leave no complete assignment
+        """
+        source_ids = [self._node_id(node) for node in sources]
+        dest_ids = [self._node_id(node, "Destination")
+                    for node in destinations]
+        row_of = np.full(self.num_nodes, -1, dtype=np.int64)
+        row_of[source_ids] = np.arange(len(source_ids))
+        col_of = np.full(self.num_nodes, -1, dtype=np.int64)
+        col_of[dest_ids] = np.arange(len(dest_ids))
+        # Pairs without an arc cannot be assigned
+        cost_matrix = np.full((len(source_ids), len(dest_ids)), np.inf)
+        rows, cols = row_of[self.sources], col_of[self.targets]
+        lanes = (rows >= 0) & (cols >= 0)
+        cost_matrix[rows[lanes], cols[lanes]] = self.costs[lanes]
+        row_ids, col_ids = linear_assignment(cost_matrix)
+        return {"OBJ": float(cost_matrix[row_ids, col_ids].sum()),
+                "Assignment": {sources[i]: destinations[j] for i, j in
+                               zip(row_ids.tolist(), col_ids.tolist())}}
@@ -0,0 +1,129 @@
+"""
+Facility location heuristics that run over a distance matrix.
+
+Candidate facilities are the rows and customers the columns of the
+distance matrix, as integer ids from 0.  Each customer is served by its
+closest open facility.
+"""
+
+import time
+
+import numpy as np
+
+# Smallest decrease in cost that counts as an improvement
+_EPSILON = 1e-9
+
+
+def _closest_two(distances, facilities):
+    """
+    Closest and second closest open facility of each customer, and
+    their distances
+    """
+    rows = distances[facilities]
+    if len(facilities) == 1:
+        closest = np.zeros(rows.shape[1], dtype=np.int64)
+        second_distance = np.full(rows.shape[1], np.inf)
+    else:
+        nearest = np.argpartition(rows, 1, axis=0)[:2]
+        nearest_distances = np.take_along_axis(rows, nearest, axis=0)
+        swap = nearest_distances[1] < nearest_distances[0]
+        closest = np.where(swap, nearest[1], nearest[0])
+        second_distance = nearest_distances.max(axis=0)
+    customers = np.arange(rows.shape[1])
+    return facilities[closest], rows[closest, customers], second_distance
+
+
+def solve_p_median(distances, p, weights=None, time_limit=None):
+    """
+    Choose `p` facilities that minimize the weighted distance from each
+    customer to its closest facility (p-median problem).
+
+    Facilities are first added greedily, each time the one that lowers
+    the cost the most.  The solution is then improved by swapping an
+    open facility for a closed one, taking the best swap each time,
+    until none lowers the cost.  Swaps are priced all at once with the
+    fast interchange bookkeeping of Whitaker, later refined by Resende
+    and Werneck: with the closest and second closest open facility of
+    each customer, the cost of every swap comes from a few passes over
+    the distance matrix instead of reassigning every customer.
+
+    Parameters
+    ----------
+    distances : array-like
+        Matrix of distances from each candidate facility (row) to each
+        customer (column).  Must be finite.
+    p : int
+        Number of facilities to open
+    weights : array-like, optional
+        Demand of each customer, multiplying its distance.  All 1 by
+        default.
+    time_limit : float, optional
+        Seconds the swaps may run for, after which the best solution
+        found so far is returned
+
+    Returns
+    -------
+    cost : float
+        Total weighted distance from the customers to their facilities
+    facilities : numpy.ndarray
+        Ids of the open facilities, in the order they were opened
+    assignment : numpy.ndarray
+        Id of the facility serving each customer
+
+    Raises
+    ------
+    ValueError
+        If `p` is not between 1 and the number of candidates
+    """
+    distances = np.asarray(distances, dtype=float)
+    num_candidates, num_customers = distances.shape
+    if not 1 <= p <= num_candidates:
+        raise ValueError("Number of facilities must be between 1 and the "
+                         "number of candidates!")
+    weights = (np.ones(num_customers) if weights is None
+               else np.asarray(weights, dtype=float))
+    deadline = (time.perf_counter() + time_limit
+                if time_limit is not None else np.inf)
+    # Greedy: open the facility that lowers the cost the most
+    weighted = distances * weights
+    buffer = np.empty_like(distances)
+    facilities = [int(weighted.sum(axis=1).argmin())]
+    served = weighted[facilities[0]].copy()
+    for _ in range(p - 1):
+        costs = np.minimum(weighted, served, out=buffer).sum(axis=1)
+        costs[facilities] = np.inf
+        facilities.append(int(costs.argmin()))
+        np.minimum(served, weighted[facilities[-1]], out=served)
+    del weighted
+    facilities = np.array(facilities, dtype=np.int64)
+    # Interchange: swap in the candidate `i` and out the facility `r`
+    #  that lower the cost the most
+    position = np.empty(num_candidates, dtype=np.int64)
+    total_distances = distances @ weights
+    while 1 < p < num_candidates and time.perf_counter() < deadline:
+        closest, closest_distance, second_distance = _closest_two(
+            distances, facilities)
+        position[facilities] = np.arange(p)
+        closest_position = position[closest]
+        # Cost of closing `r` if `i` is not opened
+        loss = np.bincount(closest_position, weights * (
+            second_distance - closest_distance), minlength=p)
+        # Saving from customers that move to `i` whichever closes, the
+        #  weighted sum of max(closest distance - d(i, j), 0)
+        np.maximum(distances, closest_distance, out=buffer)
+        gain = buffer @ weights - total_distances
+        # Part of the loss that `i` saves, by being closer than the
+        #  second closest facility to customers of `r`
+        np.subtract(second_distance, buffer, out=buffer)
+        np.maximum(buffer, 0, out=buffer)
+        served_by = np.zeros((num_customers, p))
+        served_by[np.arange(num_customers), closest_position] = weights
+        change = loss - buffer @ served_by - gain[:, np.newaxis]
+        change[facilities] = np.inf
+        candidate, out = np.unravel_index(change.argmin(), change.shape)
+        if not change[candidate, out] < -_EPSILON * max(
+                1, float((closest_distance * weights).sum())):
+            break
+        facilities[out] = candidate
+    closest, closest_distance, _ = _closest_two(distances, facilities)
+    return float((closest_distance * weights).sum()), facilities, closest
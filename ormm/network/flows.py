@@ -0,0 +1,839 @@
+"""
+Network flow solvers that run directly on NumPy arrays, without building
+a Pyomo model or calling an external solver.
+"""
+
+from collections import defaultdict
+from math import ceil, sqrt
+
+import numpy as np
+
+from ormm.network.paths import dijkstra, extract_paths
+
+# Reduced costs above this are treated as nonnegative when pricing
+_TOLERANCE = 1e-9
+
+
+def network_simplex(num_nodes, sources, targets, costs, supplies,
+                    capacities=None):
+    """
+    Solve the minimum cost flow problem with the network simplex method.
+
+    Each basis is a spanning tree of the nodes plus an artificial root.
+    The tree is stored as parent, subtree size, and depth-first thread
+    arrays, so each pivot only updates the part of the tree it changes.
+    Entering arcs are priced a block of arcs at a time with array
+    operations.  The starting basis ships every node's supply to or from
+    the artificial root at a large cost, so no starting solution is
+    needed.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources : array-like of int
+        From node id of each arc
+    targets : array-like of int
+        To node id of each arc
+    costs : array-like
+        Cost per unit of flow on each arc
+    supplies : array-like
+        Net supply of each node - positive for supply nodes, negative
+        for demand nodes.  Must sum to zero.
+    capacities : array-like, optional
+        Upper limit on the flow of each arc.  Defaults to no limit.
+
+    Returns
+    -------
+    flows : numpy.ndarray
+        Optimal flow on each arc
+    potentials : numpy.ndarray
+        Node potentials (dual values) :math:`\\pi`, such that
+        ``costs - pi[sources] + pi[targets]`` is zero for arcs strictly
+        between their bounds, nonnegative at zero flow, and nonpositive
+        at capacity
+
+    Raises
+    ------
+    ValueError
+        If the supplies do not sum to zero, if there is no feasible flow,
+        or if there is a negative cost cycle without a capacity limit
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    costs = np.asarray(costs, dtype=float)
+    supplies = np.asarray(supplies, dtype=float)
+    num_arcs = len(costs)
+    if capacities is None:
+        capacities = np.full(num_arcs, np.inf)
+    capacities = np.asarray(capacities, dtype=float)
+    if not np.isclose(supplies.sum(), 0):
+        raise ValueError("Total supply must equal total demand!")
+    root = num_nodes
+    # Large cost and capacity for the artificial arcs
+    finite_capacity = capacities[np.isfinite(capacities)].sum()
+    faux_inf = 3 * max(np.abs(costs).sum(), finite_capacity,
+                       np.abs(supplies).sum(), 1)
+    capacities = np.where(np.isfinite(capacities), capacities, faux_inf)
+    # Artificial arcs: supply nodes to root, and root to demand nodes
+    is_supply = supplies >= 0
+    node_ids = np.arange(num_nodes)
+    S = np.concatenate([sources, np.where(is_supply, node_ids, root)])
+    T = np.concatenate([targets, np.where(is_supply, root, node_ids)])
+    C = np.concatenate([costs, np.full(num_nodes, faux_inf)])
+    U = np.concatenate([capacities, np.full(num_nodes, faux_inf)])
+    x = np.concatenate([np.zeros(num_arcs), np.abs(supplies)])
+    pi = np.append(np.where(is_supply, faux_inf, -faux_inf), 0)
+    total_arcs = num_arcs + num_nodes
+    # Spanning tree: every node hangs off the root by its artificial arc
+    parent = [root] * num_nodes + [-1]
+    edge = list(range(num_arcs, total_arcs)) + [-1]
+    size = [1] * num_nodes + [num_nodes + 1]
+    next_node = list(range(1, num_nodes + 1)) + [0]
+    prev_node = [root] + list(range(num_nodes))
+    last = list(range(num_nodes)) + [num_nodes - 1]
+    S_list, T_list = S.tolist(), T.tolist()
+
+    def residual_capacity(i, p):
+        """Capacity left on arc i in the direction leaving node p"""
+        return U[i] - x[i] if S_list[i] == p else x[i]
+
+    def find_apex(p, q):
+        """Closest common ancestor of p and q in the tree"""
+        size_p, size_q = size[p], size[q]
+        while True:
+            while size_p < size_q:
+                p = parent[p]
+                size_p = size[p]
+            while size_p > size_q:
+                q = parent[q]
+                size_q = size[q]
+            if size_p == size_q:
+                if p == q:
+                    return p
+                p, q = parent[p], parent[q]
+                size_p, size_q = size[p], size[q]
+
+    def trace_path(p, w):
+        """Nodes and arcs on the tree path from p up to its ancestor w"""
+        nodes, arcs = [p], []
+        while p != w:
+            arcs.append(edge[p])
+            p = parent[p]
+            nodes.append(p)
+        return nodes, arcs
+
+    def find_cycle(i, p, q):
+        """Nodes and arcs around the cycle made by entering arc i (p, q)"""
+        w = find_apex(p, q)
+        nodes, arcs = trace_path(p, w)
+        nodes.reverse()
+        arcs.reverse()
+        if arcs != [i]:
+            arcs.append(i)
+        nodes_q, arcs_q = trace_path(q, w)
+        del nodes_q[-1]
+        return nodes + nodes_q, arcs + arcs_q
+
+    def trace_subtree(p):
+        """Nodes in the subtree rooted at p, following the thread"""
+        nodes = [p]
+        last_p = last[p]
+        while p != last_p:
+            p = next_node[p]
+            nodes.append(p)
+        return nodes
+
+    def remove_edge(s, t):
+        """Remove the tree arc between s and its child t"""
+        size_t, prev_t, last_t = size[t], prev_node[t], last[t]
+        next_last_t = next_node[last_t]
+        parent[t] = -1
+        edge[t] = -1
+        next_node[prev_t] = next_last_t
+        prev_node[next_last_t] = prev_t
+        next_node[last_t] = t
+        prev_node[t] = last_t
+        while s != -1:
+            size[s] -= size_t
+            if last[s] == last_t:
+                last[s] = prev_t
+            s = parent[s]
+
+    def make_root(q):
+        """Re-root the subtree containing q at q"""
+        ancestors = []
+        while q != -1:
+            ancestors.append(q)
+            q = parent[q]
+        ancestors.reverse()
+        for p, q in zip(ancestors, ancestors[1:]):
+            size_p, last_p = size[p], last[p]
+            prev_q, last_q = prev_node[q], last[q]
+            next_last_q = next_node[last_q]
+            parent[p] = q
+            parent[q] = -1
+            edge[p] = edge[q]
+            edge[q] = -1
+            size[p] = size_p - size[q]
+            size[q] = size_p
+            next_node[prev_q] = next_last_q
+            prev_node[next_last_q] = prev_q
+            next_node[last_q] = q
+            prev_node[q] = last_q
+            if last_p == last_q:
+                last[p] = prev_q
+                last_p = prev_q
+            prev_node[p] = last_q
+            next_node[last_q] = p
+            next_node[last_p] = q
+            prev_node[q] = last_p
+            last[q] = last_p
+
+    def add_edge(i, p, q):
+        """Add arc i to the tree, making q a child of p"""
+        last_p = last[p]
+        next_last_p = next_node[last_p]
+        size_q, last_q = size[q], last[q]
+        parent[q] = p
+        edge[q] = i
+        next_node[last_p] = q
+        prev_node[q] = last_p
+        prev_node[next_last_p] = last_q
+        next_node[last_q] = next_last_p
+        while p != -1:
+            size[p] += size_q
+            if last[p] == last_p:
+                last[p] = last_q
+            p = parent[p]
+
+    def update_potentials(i, p, q):
+        """Shift the potentials of q's subtree so arc i has zero
+        reduced cost"""
+        if q == T_list[i]:
+            d = pi[p] - C[i] - pi[q]
+        else:
+            d = pi[p] + C[i] - pi[q]
+        pi[trace_subtree(q)] += d
+
+    # Price arcs in blocks, cycling through all of them until a full
+    #  pass finds no arc with a negative reduced cost
+    block_size = int(ceil(sqrt(total_arcs)))
+    num_blocks = -(-total_arcs // block_size)
+    block_start = 0
+    blocks_without_entering = 0
+    while blocks_without_entering < num_blocks:
+        block = np.arange(block_start, block_start + block_size) % total_arcs
+        block_start = (block_start + block_size) % total_arcs
+        reduced = C[block] - pi[S[block]] + pi[T[block]]
+        reduced = np.where(x[block] == 0, reduced, -reduced)
+        best = reduced.argmin()
+        if reduced[best] >= -_TOLERANCE * max(1, abs(C[block[best]])):
+            blocks_without_entering += 1
+            continue
+        blocks_without_entering = 0
+        i = int(block[best])
+        p, q = (S_list[i], T_list[i]) if x[i] == 0 else (T_list[i],
+                                                         S_list[i])
+        cycle_nodes, cycle_arcs = find_cycle(i, p, q)
+        # Leaving arc has the least residual capacity around the cycle,
+        #  taking the last such arc to keep the tree strongly feasible
+        j, s = min(zip(reversed(cycle_arcs), reversed(cycle_nodes)),
+                   key=lambda arc_node: residual_capacity(*arc_node))
+        delta = residual_capacity(j, s)
+        t = T_list[j] if S_list[j] == s else S_list[j]
+        if delta:
+            for arc, node in zip(cycle_arcs, cycle_nodes):
+                x[arc] += delta if S_list[arc] == node else -delta
+        if i != j:
+            if parent[t] != s:
+                s, t = t, s
+            if cycle_arcs.index(i) > cycle_arcs.index(j):
+                p, q = q, p
+            remove_edge(s, t)
+            make_root(q)
+            add_edge(i, p, q)
+            update_potentials(i, p, q)
+    # No basic solution ships more than this on one arc, unless flow was
+    #  sent around a negative cycle up to the artificial capacity
+    flow_limit = finite_capacity + np.abs(supplies).sum()
+    if (x[:num_arcs] > flow_limit * (1 + _TOLERANCE)).any():
+        raise ValueError("Negative cost cycle without a capacity"
+                         " limit - the minimum cost is unbounded!")
+    if (x[num_arcs:] > _TOLERANCE).any():
+        raise ValueError("No feasible flow meets all of the supplies"
+                         " and demands!")
+    return x[:num_arcs], pi[:num_nodes] - pi[root]
+
+
+def solve_transportation(supply, demand, shipping_costs):
+    """
+    Solve the balanced transportation problem with the network simplex
+    method, without Pyomo or an external solver.
+
+    Solves the same problem as :py:obj:`transportation_model`, and
+    returns the results keyed the same way as the components of a
+    solved Pyomo instance of that model.
+
+    Parameters
+    ----------
+    supply : dict
+        dict of source nodes and their supply capacities
+        e.g. {"A": 15, "B": 35}
+    demand : dict
+        dict of destination nodes and their demand requirements
+        e.g. {"C": 20, "D": 30}
+    shipping_costs : dict or array-like
+        Cost of shipping one unit on each lane, e.g.
+        {("A", "C"): 4, ("A", "D"): 7, ...}, where lanes that are left
+        out cannot be used.  May also be a matrix with a row for each
+        source and column for each destination (in the order of `supply`
+        and `demand`), with ``inf`` or ``nan`` for lanes that cannot
+        be used.
+
+    Returns
+    -------
+    dictionary
+        "OBJ" is the minimum total shipping cost, "Flows" the amount
+        shipped on each lane, e.g. {("A", "C"): 15.0, ...}, and
+        "SupplyConstraint" and "DemandConstraint" the dual values of
+        each source's and destination's constraint
+
+    Raises
+    ------
+    ValueError
+        If total supply does not equal total demand, or the demand
+        cannot be met using the lanes given
+
+    Examples
+    --------
+    >>> results = solve_transportation({"A": 15, "B": 10},
+    ...                                {"C": 20, "D": 5},
+    ...                                {("A", "C"): 4, ("A", "D"): 7,
+    ...                                 ("B", "C"): 6, ("B", "D"): 3})
+    >>> results["OBJ"], results["Flows"][("B", "C")]
+    (105.0, 5.0)
+    """
+    source_nodes, dest_nodes = list(supply), list(demand)
+    num_sources = len(source_nodes)
+    if isinstance(shipping_costs, dict):
+        source_index = {node: i for i, node in enumerate(source_nodes)}
+        dest_index = {node: j for j, node in enumerate(dest_nodes)}
+        lanes = [(i, j) for (i, j) in shipping_costs
+                 if i in source_index and j in dest_index]
+        from_ids = np.array([source_index[i] for i, _ in lanes],
+                            dtype=np.int64)
+        to_ids = np.array([dest_index[j] for _, j in lanes], dtype=np.int64)
+        lane_costs = np.array([shipping_costs[lane] for lane in lanes],
+                              dtype=float)
+    else:
+        cost_matrix = np.asarray(shipping_costs, dtype=float)
+        from_ids, to_ids = np.nonzero(np.isfinite(cost_matrix))
+        lane_costs = cost_matrix[from_ids, to_ids]
+        lanes = [(source_nodes[i], dest_nodes[j])
+                 for i, j in zip(from_ids.tolist(), to_ids.tolist())]
+    supplies = np.concatenate([np.array(list(supply.values()), dtype=float),
+                               -np.array(list(demand.values()),
+                                         dtype=float)])
+    flows, potentials = network_simplex(
+        num_sources + len(dest_nodes), from_ids, to_ids + num_sources,
+        lane_costs, supplies)
+    # Shift duals so the first source's is zero (they are only unique
+    #  up to a constant)
+    potentials = potentials - potentials[0]
+    return {"OBJ": float(flows @ lane_costs),
+            "Flows": dict(zip(lanes, flows.tolist())),
+            "SupplyConstraint": dict(zip(source_nodes,
+                                         potentials[:num_sources].tolist())),
+            "DemandConstraint": dict(zip(
+                dest_nodes, (-potentials[num_sources:]).tolist()))}
+
+
+def solve_multicommodity_flow(num_nodes, sources, targets, costs,
+                              capacities, origins, destinations, demands,
+                              iterations=1000, tolerance=1e-3):
+    """
+    Solve the multi-commodity flow problem by Lagrangian relaxation of
+    the arc capacities.
+
+    Each commodity is an amount of flow to send from an origin node to
+    a destination node, and all commodities share the capacity of each
+    arc.  Pricing the capacities with multipliers leaves one shortest
+    path problem per commodity, so each iteration solves Dijkstra's
+    Algorithm once from each distinct origin over the costs plus the
+    prices, and sends every commodity down its cheapest path.  The
+    prices are then raised on arcs over capacity and lowered on arcs
+    under it (a subgradient step), and the flows are averaged over the
+    iterations (later ones weighted more) to converge toward the optimal
+    flows.  Nothing the size of commodities times arcs is ever built,
+    so this scales well past a single linear program.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources : array-like of int
+        From node id of each arc, with no arc repeated
+    targets : array-like of int
+        To node id of each arc
+    costs : array-like
+        Nonnegative cost per unit of flow on each arc
+    capacities : array-like or None
+        Upper limit on the total flow of each arc, ``inf`` for no limit.
+        None for no limits at all.
+    origins, destinations : array-like of int
+        Node id each commodity is sent from and to
+    demands : array-like
+        Amount of each commodity to send
+    iterations : int, optional
+        Most iterations to run
+    tolerance : float, optional
+        Stop once the cost of the averaged flows is within this fraction
+        of the lower bound, and no arc is over capacity by more than
+        this fraction of the largest demand
+
+    Returns
+    -------
+    flows : numpy.ndarray
+        Total flow of all commodities on each arc
+    paths : list of dict
+        For each commodity, the flow sent down each path used, keyed by
+        the tuple of node ids on the path
+    bound : float
+        Lower bound on the optimal cost
+
+    Raises
+    ------
+    ValueError
+        If an arc cost is negative, or if a commodity's destination
+        cannot be reached from its origin
+
+    Notes
+    -----
+    The averaged flows meet every commodity's demand exactly, but may
+    still be a little over some capacities when the iterations run out,
+    or far over them if the capacities cannot be met.
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    costs = np.asarray(costs, dtype=float)
+    num_arcs = len(costs)
+    capacities = (np.full(num_arcs, np.inf) if capacities is None
+                  else np.asarray(capacities, dtype=float))
+    origins = np.asarray(origins, dtype=np.int64)
+    destinations = np.asarray(destinations, dtype=np.int64)
+    demands = np.asarray(demands, dtype=float)
+    if num_arcs and costs.min() < 0:
+        raise ValueError("Arc costs must be nonnegative!")
+    if not len(demands):
+        return np.zeros(num_arcs), [], 0.0
+    # CSR arrays for the searches, and a sorted lookup of each arc's
+    #  position from its end nodes
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    heads = targets[order]
+    keys = sources * num_nodes + targets
+    key_order = np.argsort(keys)
+    sorted_keys = keys[key_order]
+    limited = np.isfinite(capacities)
+    limits = capacities[limited]
+    by_origin = [(origin, np.flatnonzero(origins == origin))
+                 for origin in np.unique(origins).tolist()]
+    # Steps start at about the cost of one unit of the average demand
+    mean_cost = np.abs(costs).mean() if costs.any() else 1.0
+    scale = mean_cost / max(demands.mean(), _TOLERANCE)
+    prices = np.zeros(limited.sum())
+    priced = costs.copy()
+    average = np.zeros(num_arcs)
+    total_weight = 0
+    path_weights = [defaultdict(int) for _ in demands]
+    bound = -np.inf
+    for iteration in range(iterations):
+        priced[limited] = costs[limited] + prices
+        flows = np.zeros(num_arcs)
+        value = 0.0
+        for origin, commodities in by_origin:
+            dist, pred = dijkstra(offsets, heads, priced[order], origin)
+            ends = destinations[commodities]
+            if np.isinf(dist[ends]).any():
+                raise ValueError("A commodity's destination cannot be "
+                                 "reached from its origin!")
+            value += dist[ends] @ demands[commodities]
+            for commodity, path in zip(commodities.tolist(),
+                                       extract_paths(pred, ends)):
+                arcs = key_order[np.searchsorted(
+                    sorted_keys, path[:-1] * num_nodes + path[1:])]
+                flows[arcs] += demands[commodity]
+                path_weights[commodity][tuple(path.tolist())] += \
+                    iteration + 1
+        bound = max(bound, value - prices @ limits)
+        average += (iteration + 1) * flows
+        total_weight += iteration + 1
+        mean = average / total_weight
+        excess = (mean[limited] - limits).max(initial=0)
+        if mean @ costs - bound <= tolerance * max(abs(bound), _TOLERANCE) \
+                and excess <= tolerance * demands.max():
+            break
+        step = scale / sqrt(iteration + 1)
+        prices = np.maximum(prices + step * (flows[limited] - limits), 0)
+    paths = [{path: demand * weight / total_weight
+              for path, weight in weights.items()}
+             for demand, weights in zip(demands.tolist(), path_weights)]
+    return average / total_weight, paths, float(bound)
+
+
+def _level_graph(offsets, heads, residual, source, sink):
+    """
+    Breadth-first levels of the nodes over arcs with capacity left.
+
+    Each level is expanded all at once from the CSR arrays.  Levels stop
+    at the sink's level, since arcs beyond it cannot be on a shortest
+    augmenting path.
+    """
+    level = np.full(len(offsets) - 1, -1, dtype=np.int64)
+    level[source] = 0
+    frontier = np.array([source])
+    depth = 0
+    while len(frontier) and level[sink] == -1:
+        depth += 1
+        starts, ends = offsets[frontier], offsets[frontier + 1]
+        lengths = ends - starts
+        # Positions of every arc out of the frontier
+        arcs = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + \
+            np.arange(lengths.sum())
+        arcs = arcs[residual[arcs] > 0]
+        frontier = np.unique(heads[arcs])
+        frontier = frontier[level[frontier] == -1]
+        level[frontier] = depth
+    return level
+
+
+def _admissible_arcs(tails, heads, residual, level, sink):
+    """
+    Positions of the arcs on some shortest augmenting path, in order.
+
+    These are the arcs with capacity left from one level to the next,
+    pruned back from the sink level by level, so the depth-first search
+    never walks into the parts of the level graph that miss the sink.
+    """
+    arcs = np.flatnonzero((residual > 0) & (level[tails] >= 0) &
+                          (level[heads] == level[tails] + 1))
+    arc_levels = level[tails[arcs]]
+    order = np.argsort(arc_levels, kind="stable")
+    layers = np.split(arcs[order], np.cumsum(
+        np.bincount(arc_levels, minlength=level[sink]))[:-1])
+    reaches_sink = np.zeros(len(level), dtype=bool)
+    reaches_sink[sink] = True
+    kept = []
+    for layer in reversed(layers[:level[sink]]):
+        layer = layer[reaches_sink[heads[layer]]]
+        reaches_sink[tails[layer]] = True
+        kept.append(layer)
+    return np.sort(np.concatenate(kept))
+
+
+def max_flow(num_nodes, sources, targets, capacities, source, sink):
+    """
+    Solve the maximum flow problem with Dinic's algorithm.
+
+    The residual graph is kept in CSR arrays, with each arc paired with
+    a reverse arc that starts with no capacity.  Each phase builds the
+    breadth-first level graph from `source` with array operations, keeps
+    only the arcs that lead on to `sink`, then sends a blocking flow
+    along these shortest augmenting paths, remembering the next arc to
+    try at each node so no arc is scanned twice in a phase.  There are
+    at most n phases.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources : array-like of int
+        From node id of each arc
+    targets : array-like of int
+        To node id of each arc
+    capacities : array-like
+        Upper limit on the flow of each arc, ``inf`` for no limit
+    source : int
+        Node id the flow starts at
+    sink : int
+        Node id the flow ends at
+
+    Returns
+    -------
+    value : float
+        Maximum amount of flow from `source` to `sink`
+    flows : numpy.ndarray
+        Flow on each arc
+    source_side : numpy.ndarray
+        Boolean mask of the nodes on the source side of a minimum cut.
+        The arcs from these nodes to the other nodes are the cut, and
+        their capacities add up to `value`.
+
+    Raises
+    ------
+    ValueError
+        If `source` and `sink` are the same node, if a capacity is
+        negative, or if a path without any capacity limits connects
+        `source` to `sink`
+    """
+    if source == sink:
+        raise ValueError("Source and sink must be different nodes!")
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    capacities = np.asarray(capacities, dtype=float)
+    if (capacities < 0).any():
+        raise ValueError("Arc capacities must be nonnegative!")
+    num_arcs = len(capacities)
+    # Residual arc k < m is arc k, and arc k + m is its reverse
+    all_tails = np.concatenate([sources, targets])
+    order = np.argsort(all_tails, kind="stable")
+    position = np.empty(2 * num_arcs, dtype=np.int64)
+    position[order] = np.arange(2 * num_arcs)
+    tails = all_tails[order]
+    heads = np.concatenate([targets, sources])[order]
+    residual = np.concatenate([capacities, np.zeros(num_arcs)])[order]
+    partner = position[np.where(order < num_arcs, order + num_arcs,
+                                order - num_arcs)]
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(all_tails, minlength=num_nodes), out=offsets[1:])
+    value = 0
+    while True:
+        level = _level_graph(offsets, heads, residual, source, sink)
+        if level[sink] == -1:
+            break
+        arcs = _admissible_arcs(tails, heads, residual, level, sink)
+        # Admissible arcs of each node, as positions into `arcs`
+        arc_ends = np.searchsorted(tails[arcs], np.arange(num_nodes + 1))
+        arc_ends = arc_ends.tolist()
+        next_arc = arc_ends[:-1]
+        arc_heads = heads[arcs].tolist()
+        arc_residual = residual[arcs].tolist()
+        arc_flows = [0] * len(arc_heads)
+        dead = [False] * num_nodes
+        # Depth-first search for augmenting paths, one arc at a time.
+        #  Reverse arcs go back a level, so none are admissible until
+        #  the phase ends.
+        path = []
+        node = source
+        while True:
+            if node == sink:
+                amount = min(arc_residual[i] for i in path)
+                if amount == np.inf:
+                    raise ValueError("Path without capacity limits - the"
+                                     " maximum flow is unbounded!")
+                for i in path:
+                    arc_residual[i] -= amount
+                    arc_flows[i] += amount
+                value += amount
+                # Back up to the tail of the first saturated arc
+                saturated = next(k for k, i in enumerate(path)
+                                 if arc_residual[i] <= 0)
+                del path[saturated:]
+                node = arc_heads[path[-1]] if path else source
+                continue
+            end = arc_ends[node + 1]
+            i = next_arc[node]
+            while i < end and (arc_residual[i] <= 0 or dead[arc_heads[i]]):
+                i += 1
+            next_arc[node] = i
+            if i < end:
+                path.append(i)
+                node = arc_heads[i]
+            elif node == source:
+                break
+            else:
+                # Dead end - never enter this node again in this phase
+                dead[node] = True
+                path.pop()
+                node = arc_heads[path[-1]] if path else source
+                next_arc[node] += 1
+        pushed = np.array(arc_flows, dtype=float)
+        residual[arcs] = arc_residual
+        residual[partner[arcs]] += pushed
+    # Flow on an arc is the capacity its reverse arc has gained
+    flows = residual[position[num_arcs:]]
+    return float(value), flows, level != -1
+
+
+def _reduced_row_minimums(costs, v, block_size=1024):
+    """Minimum of each row of ``costs - v``, a block of rows at a time"""
+    minimums = np.empty(len(costs))
+    for start in range(0, len(costs), block_size):
+        block = costs[start:start + block_size] - v
+        minimums[start:start + block_size] = block.min(axis=1)
+    return minimums
+
+
+def linear_assignment(cost_matrix):
+    """
+    Solve the linear assignment problem with a shortest augmenting path
+    algorithm.
+
+    Each row is assigned to a different column so that the total cost is
+    as small as possible.  For rectangular matrices, every row is
+    assigned if there are fewer rows than columns, and every column
+    otherwise.
+
+    Follows Jonker and Volgenant: column reduction, reduction transfer,
+    and one pass of augmenting row reduction find a starting assignment
+    and dual values, then each row left over is assigned by a Dijkstra
+    search for the shortest augmenting path over reduced costs.  Each
+    search step scans a whole row of the matrix with array operations,
+    and columns tied for the shortest distance are scanned together.
+    The worst case is :math:`O(n^3)` time.
+
+    Parameters
+    ----------
+    cost_matrix : array-like
+        Matrix with the cost of assigning each row to each column,
+        with ``inf`` or ``nan`` for pairs that cannot be assigned
+
+    Returns
+    -------
+    row_ids : numpy.ndarray
+        Assigned rows, in increasing order
+    col_ids : numpy.ndarray
+        Column assigned to each row in `row_ids`
+
+    Raises
+    ------
+    ValueError
+        If the forbidden pairs leave no complete assignment
+
+    Examples
+    --------
+    >>> row_ids, col_ids = linear_assignment([[4, 1, 3],
+    ...                                       [2, 0, 5],
+    ...                                       [3, 2, 2]])
+    >>> col_ids.tolist()
+    [1, 0, 2]
+    """
+    costs = np.asarray(cost_matrix, dtype=float)
+    transposed = costs.shape[0] > costs.shape[1]
+    if transposed:
+        costs = costs.T
+    costs = np.where(np.isnan(costs), np.inf, costs)
+    num_rows, num_cols = costs.shape
+    if num_rows == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    infeasible = ValueError("No assignment avoids all of the forbidden"
+                            " pairs!")
+    col4row = np.full(num_rows, -1, dtype=np.int64)
+    row4col = np.full(num_cols, -1, dtype=np.int64)
+    if num_rows == num_cols:
+        # Column reduction: each column's cheapest row takes it if free
+        v = costs.min(axis=0)
+        if np.isinf(v).any():
+            raise infeasible
+        for j, i in reversed(list(enumerate(costs.argmin(axis=0).tolist()))):
+            if col4row[i] == -1:
+                col4row[i], row4col[j] = j, i
+        # Reduction transfer: lower assigned columns' duals to the next
+        #  cheapest reduced cost of their row
+        for i in np.flatnonzero(col4row != -1).tolist():
+            j = col4row[i]
+            reduced = costs[i] - v
+            reduced[j] = np.inf
+            if num_cols > 1 and reduced.min() < np.inf:
+                v[j] -= reduced.min()
+    else:
+        # Columns left over keep zero duals, so start every dual at zero
+        v = np.zeros(num_cols)
+        for i, j in enumerate(costs.argmin(axis=1).tolist()):
+            if row4col[j] == -1 and costs[i, j] < np.inf:
+                col4row[i], row4col[j] = j, i
+    # Augmenting row reduction: free rows take their cheapest column,
+    #  lowering its dual so the row it displaces has to look elsewhere
+    free_rows = np.flatnonzero(col4row == -1).tolist()[::-1]
+    while free_rows:
+        i = free_rows.pop()
+        reduced = costs[i] - v
+        j1 = int(reduced.argmin())
+        first = reduced[j1]
+        if first == np.inf or num_cols == 1:
+            continue
+        reduced[j1] = np.inf
+        j2 = int(reduced.argmin())
+        second = reduced[j2]
+        displaced = row4col[j1]
+        if first < second < np.inf:
+            v[j1] -= second - first
+        elif first == second and displaced != -1:
+            j1, displaced = j2, row4col[j2]
+        col4row[i], row4col[j1] = j1, i
+        if displaced != -1:
+            col4row[displaced] = -1
+            if first < second < np.inf:
+                free_rows.append(displaced)
+    u = _reduced_row_minimums(costs, v)
+    if np.isinf(u).any():
+        raise infeasible
+    # Rows not at their cheapest reduced cost are solved again below
+    assigned = np.flatnonzero(col4row != -1)
+    loose = assigned[costs[assigned, col4row[assigned]] -
+                     v[col4row[assigned]] > u[assigned]]
+    row4col[col4row[loose]] = -1
+    col4row[loose] = -1
+    all_cols = np.arange(num_cols)
+    for free_row in np.flatnonzero(col4row == -1).tolist():
+        # Dijkstra search over columns, from the free row to a free column
+        shortest = np.full(num_cols, np.inf)
+        path = np.full(num_cols, -1, dtype=np.int64)
+        # Duals of solved columns are -inf, so scans skip them
+        v_search = v.copy()
+        solved_cols, solved_dists, scanned_rows = [], [], []
+        distance = 0
+        rows = np.array([free_row])
+        while True:
+            if len(rows) == 1:
+                row = rows[0]
+                reduced = costs[row] - v_search
+                reduced -= u[row] - distance
+                better = reduced < shortest
+                path[better] = row
+            else:
+                reduced = costs[rows] - v_search
+                reduced -= (u[rows] - distance)[:, None]
+                nearest = reduced.argmin(axis=0)
+                reduced = reduced[nearest, all_cols]
+                better = reduced < shortest
+                path[better] = rows[nearest[better]]
+            np.minimum(shortest, reduced, out=shortest)
+            distance = shortest[shortest.argmin()]
+            if distance == np.inf:
+                raise infeasible
+            ties = np.flatnonzero(shortest == distance)
+            free_cols = ties[row4col[ties] == -1]
+            if len(free_cols):
+                sink = free_cols[0]
+                solved_cols.append(free_cols[:1])
+                solved_dists.append(np.full(1, distance))
+                break
+            solved_cols.append(ties)
+            solved_dists.append(np.full(len(ties), distance))
+            shortest[ties] = np.inf
+            v_search[ties] = -np.inf
+            rows = row4col[ties]
+            scanned_rows.append(rows)
+        # Update the duals so reduced costs stay nonnegative, and are
+        #  zero along the augmenting path
+        solved_cols = np.concatenate(solved_cols)
+        solved_dists = np.concatenate(solved_dists)
+        u[free_row] += distance
+        if scanned_rows:
+            u[np.concatenate(scanned_rows)] += distance - solved_dists[:-1]
+        v[solved_cols] -= distance - solved_dists
+        # Flip the assignments along the path
+        j = sink
+        while True:
+            i = path[j]
+            row4col[j] = i
+            col4row[i], j = j, col4row[i]
+            if i == free_row:
+                break
+    if transposed:
+        order = np.argsort(col4row)
+        return col4row[order], order
+    return np.arange(num_rows), col4row
@@ -13,7 +13,8 @@ To do this, would:
 Other ideas to add:
   * Implement print() method on Graph object (__str__)
   * Graph() should be able to read in data file (.dat)
-    used for transportation problem
+    used for transportation problem (CSV and Parquet arc
+    files can be read with Graph.read_arcs)
     - either when transportation_problem is called, or
       in separate method to permanently add attributes
   * Graph() needs add_arcs overhaul
@@ -26,13 +27,23 @@ Other ideas to add:
       5. Data file (.dat)?
 """
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from collections.abc import Sequence
+from itertools import count, islice
+import heapq
+import os
 
 import numpy as np
 import pandas as pd
 import pyomo.environ as pyo
 
+from ormm.network.compact import _point_labels, CompactGraph
+from ormm.network.hierarchy import ContractionHierarchy
+from ormm.network.paths import repair_tree, ShortestPathTree
+from ormm.network.snapshot import GraphSnapshot
+from ormm.network.flows import solve_transportation
+from ormm.network.spatial import EARTH_RADIUS, neighbor_pairs
+
 
 def transportation_model(**kwargs):
     """
@@ -64,7 +75,11 @@ def transportation_model(**kwargs):
     Notes
     -----
     This is a bipartite network with m supply nodes and n destination nodes.
-    If not possible to ship from i to j, a large cost M should be passed.
+    The optional set `Lanes` holds the (i, j) pairs that can be shipped on,
+    and defaults to every source and destination pair.  If not possible to
+    ship from i to j, either leave (i, j) out of `Lanes` (and
+    `ShippingCosts`), or pass a large cost M.  Leaving it out keeps the
+    Flows variable for that pair out of the model.
 
     Assumes the feasibility property holds (total supply equals total demand) -
     then becomes balanced TP. You can modify data so this requirement is
@@ -89,19 +104,41 @@ def transportation_model(**kwargs):
 
         X_{i,j} \\geq 0\\text{, int} \\quad \\forall i \\in I\\text{, }j \\in J
     """
+    def _lanes_init(model):
+        """Lanes default to every source and destination pair"""
+        return model.Sources * model.Destinations
+
+    def _lanes_by_node(model):
+        """Index the lanes by source and by destination"""
+        model.lanes_from = defaultdict(list)
+        model.lanes_to = defaultdict(list)
+        for i, j in model.Lanes:
+            model.lanes_from[i].append(j)
+            model.lanes_to[j].append(i)
+
     def _obj_expression(model):
         """Objective Expression: Minimizing Shipping Costs"""
         return pyo.summation(model.ShippingCosts, model.Flows)
 
     def _supply_constraint_rule(model, i):
         """Constraints for flows from supply"""
+        if not model.lanes_from[i]:
+            return _no_lanes_constraint(model.Supply[i])
         return sum(model.Flows[i, j]
-                   for j in model.Destinations) == model.Supply[i]
+                   for j in model.lanes_from[i]) == model.Supply[i]
 
     def _demand_constraint_rule(model, j):
         """Constraints for flows from demands"""
+        if not model.lanes_to[j]:
+            return _no_lanes_constraint(model.Demand[j])
         return sum(model.Flows[i, j]
-                   for i in model.Supply) == model.Demand[j]
+                   for i in model.lanes_to[j]) == model.Demand[j]
+
+    def _no_lanes_constraint(amount):
+        """Node without lanes is only feasible if nothing is shipped"""
+        if pyo.value(amount) == 0:
+            return pyo.Constraint.Skip
+        return pyo.Constraint.Infeasible
 
     # Create the abstract model & dual suffix
     model = pyo.AbstractModel()
@@ -109,13 +146,16 @@ def transportation_model(**kwargs):
     # Define sets/params that are always used
     model.Sources = pyo.Set()
     model.Destinations = pyo.Set()
+    model.Lanes = pyo.Set(dimen=2,
+                          within=model.Sources * model.Destinations,
+                          initialize=_lanes_init)
     model.Supply = pyo.Param(model.Sources)
     model.Demand = pyo.Param(model.Destinations)
-    model.ShippingCosts = pyo.Param(model.Sources, model.Destinations)
+    model.ShippingCosts = pyo.Param(model.Lanes)
+    model.LanesByNode = pyo.BuildAction(rule=_lanes_by_node)
     # Define decision variables
     model.Flows = pyo.Var(
-        model.Sources,
-        model.Destinations,
+        model.Lanes,
         within=pyo.NonNegativeReals,
         bounds=(0, None))
     # Define objective & constraints
@@ -133,6 +173,415 @@ def transportation_model(**kwargs):
         return model
 
 
+def facility_location_model(**kwargs):
+    """
+    Factory method for the p-median and capacitated facility location
+    problems.
+
+    Facilities are opened at some of a set of candidate nodes, and each
+    customer's demand is served by the open facilities.  The objective
+    is to minimize the fixed costs of the open facilities plus the
+    demand weighted distance from each customer to the facilities that
+    serve it.  Giving `NumFacilities` opens exactly that many (the
+    p-median problem), and giving `Capacity` limits the demand each
+    facility can serve (the capacitated problem).
+
+    Parameters
+    ----------
+    **kwargs
+        Passed into Pyomo Abstract Model's `create_instance`
+        to return Pyomo Concrete Model instead.
+
+    Returns
+    -------
+    pyomo.environ.AbstractModel or pyomo.environ.ConcreteModel
+        Abstract Model with the sets, parameters, decision variables,
+        objective, and constraints for the facility location problem.
+        Returns a Concrete Model instead if any kwargs passed.
+
+    Notes
+    -----
+    The optional set `Pairs` holds the (i, j) pairs where facility i can
+    serve customer j, and defaults to every facility and customer pair.
+    Leaving out pairs that are too far apart keeps their variables and
+    constraints out of the model.  `Demand` defaults to 1, `FixedCosts`
+    to 0, and `Capacity` to no limit.  A customer's demand may be split
+    between facilities when capacities bind.
+
+    .. math::
+
+        \\text{Min} \\sum_{i \\in I}F_iY_i +
+        \\sum_{(i, j) \\in P}D_jC_{i,j}X_{i,j}
+
+        \\text{s.t. } \\sum_{i : (i, j) \\in P} X_{i,j} = 1
+        \\quad \\forall j \\in J
+
+        X_{i,j} \\leq Y_i \\quad \\forall (i, j) \\in P
+
+        \\sum_{j : (i, j) \\in P} D_jX_{i,j} \\leq K_iY_i
+        \\quad \\forall i \\in I
+
+        \\sum_{i \\in I} Y_i = p
+
+        0 \\leq X_{i,j} \\leq 1\\text{, }Y_i \\in \\{0, 1\\}
+    """
+    def _pairs_init(model):
+        """Pairs default to every facility and customer pair"""
+        return model.Facilities * model.Customers
+
+    def _pairs_by_node(model):
+        """Index the pairs by facility and by customer"""
+        model.pairs_from = defaultdict(list)
+        model.pairs_to = defaultdict(list)
+        for i, j in model.Pairs:
+            model.pairs_from[i].append(j)
+            model.pairs_to[j].append(i)
+
+    def _obj_expression(model):
+        """Objective Expression: Minimizing Fixed & Service Costs"""
+        return pyo.summation(model.FixedCosts, model.Open) + \
+            sum(model.Demand[j] * model.Distances[i, j] *
+                model.Assign[i, j] for i, j in model.Pairs)
+
+    def _serve_constraint_rule(model, j):
+        """Constraints for serving all of each customer's demand"""
+        if not model.pairs_to[j]:
+            return pyo.Constraint.Infeasible
+        return sum(model.Assign[i, j] for i in model.pairs_to[j]) == 1
+
+    def _open_constraint_rule(model, i, j):
+        """Constraints for only serving from open facilities"""
+        return model.Assign[i, j] <= model.Open[i]
+
+    def _capacity_constraint_rule(model, i):
+        """Constraints for the demand each facility can serve"""
+        if pyo.value(model.Capacity[i]) == float("inf") or \
+                not model.pairs_from[i]:
+            return pyo.Constraint.Skip
+        return sum(model.Demand[j] * model.Assign[i, j]
+                   for j in model.pairs_from[i]) <= \
+            model.Capacity[i] * model.Open[i]
+
+    def _count_constraint_rule(model):
+        """Constraint for the number of facilities to open"""
+        if model.NumFacilities.value is None:
+            return pyo.Constraint.Skip
+        return pyo.summation(model.Open) == model.NumFacilities
+
+    # Create the abstract model
+    model = pyo.AbstractModel()
+    # Define sets/params that are always used
+    model.Facilities = pyo.Set()
+    model.Customers = pyo.Set()
+    model.Pairs = pyo.Set(dimen=2,
+                          within=model.Facilities * model.Customers,
+                          initialize=_pairs_init)
+    model.Distances = pyo.Param(model.Pairs)
+    model.Demand = pyo.Param(model.Customers, default=1)
+    # Define optional params
+    model.FixedCosts = pyo.Param(model.Facilities, default=0)
+    model.Capacity = pyo.Param(model.Facilities, default=float("inf"))
+    model.NumFacilities = pyo.Param(within=pyo.Any, default=None)
+    model.PairsByNode = pyo.BuildAction(rule=_pairs_by_node)
+    # Define decision variables
+    model.Open = pyo.Var(model.Facilities, within=pyo.Binary)
+    model.Assign = pyo.Var(
+        model.Pairs,
+        within=pyo.NonNegativeReals,
+        bounds=(0, 1))
+    # Define objective & constraints
+    model.OBJ = pyo.Objective(rule=_obj_expression, sense=pyo.minimize)
+    model.ServeConstraint = pyo.Constraint(
+        model.Customers,
+        rule=_serve_constraint_rule)
+    model.OpenConstraint = pyo.Constraint(
+        model.Pairs,
+        rule=_open_constraint_rule)
+    model.CapacityConstraint = pyo.Constraint(
+        model.Facilities,
+        rule=_capacity_constraint_rule)
+    model.CountConstraint = pyo.Constraint(rule=_count_constraint_rule)
+    # Check if returning concrete or abstract model
+    if kwargs:
+        return model.create_instance(**kwargs)
+    else:
+        return model
+
+
+def transshipment_model(**kwargs):
+    """
+    Factory method for the minimum cost transshipment problem.
+
+    Flow is sent over the arcs of a network from supply nodes to demand
+    nodes, possibly passing through other nodes (such as cross-docks)
+    on the way.  The objective is to minimize the total shipping cost,
+    while each node sends out its net supply and no arc carries more
+    than its capacity.  The transportation problem is the special case
+    where every arc goes from a supply node to a demand node.
+
+    Parameters
+    ----------
+    **kwargs
+        Passed into Pyomo Abstract Model's `create_instance`
+        to return Pyomo Concrete Model instead.
+
+    Returns
+    -------
+    pyomo.environ.AbstractModel or pyomo.environ.ConcreteModel
+        Abstract Model with the sets, parameters, decision variables,
+        objective, and constraints for the transshipment problem.
+        Returns a Concrete Model instead if any kwargs passed.
+
+    Notes
+    -----
+    `Supply` is the net supply of each node - positive for supply nodes,
+    negative for demand nodes, and 0 (the default) for nodes that only
+    pass flow along.  Total supply must equal total demand.  `Capacity`
+    defaults to no limit.  Each node's constraint only sums over the
+    arcs into and out of it, so the model stays as sparse as the
+    network.
+
+    .. math::
+
+        \\text{Min} \\sum_{(i, j) \\in A}C_{i,j}X_{i,j}
+
+        \\text{s.t. } \\sum_{j : (i, j) \\in A} X_{i,j} -
+        \\sum_{j : (j, i) \\in A} X_{j,i} = B_i
+        \\quad \\forall i \\in N
+
+        0 \\leq X_{i,j} \\leq U_{i,j} \\quad \\forall (i, j) \\in A
+    """
+    def _arcs_by_node(model):
+        """Index the arcs by the node they leave and enter"""
+        model.arcs_from = defaultdict(list)
+        model.arcs_to = defaultdict(list)
+        for i, j in model.Arcs:
+            model.arcs_from[i].append(j)
+            model.arcs_to[j].append(i)
+
+    def _flow_bounds(model, i, j):
+        """Flows are between 0 and the arc's capacity"""
+        capacity = pyo.value(model.Capacity[i, j])
+        return (0, capacity if capacity != float("inf") else None)
+
+    def _obj_expression(model):
+        """Objective Expression: Minimizing Shipping Costs"""
+        return pyo.summation(model.Costs, model.Flows)
+
+    def _flow_balance_constraint_rule(model, i):
+        """Constraints for each node sending out its net supply"""
+        if not model.arcs_from[i] and not model.arcs_to[i]:
+            return (pyo.Constraint.Skip if pyo.value(model.Supply[i]) == 0
+                    else pyo.Constraint.Infeasible)
+        return sum(model.Flows[i, j] for j in model.arcs_from[i]) - \
+            sum(model.Flows[j, i] for j in model.arcs_to[i]) == \
+            model.Supply[i]
+
+    # Create the abstract model
+    model = pyo.AbstractModel()
+    # Define sets/params that are always used
+    model.Nodes = pyo.Set()
+    model.Arcs = pyo.Set(dimen=2, within=model.Nodes * model.Nodes)
+    model.Costs = pyo.Param(model.Arcs)
+    # Define optional params
+    model.Supply = pyo.Param(model.Nodes, default=0)
+    model.Capacity = pyo.Param(model.Arcs, default=float("inf"))
+    model.ArcsByNode = pyo.BuildAction(rule=_arcs_by_node)
+    # Define decision variables
+    model.Flows = pyo.Var(
+        model.Arcs,
+        within=pyo.NonNegativeReals,
+        bounds=_flow_bounds)
+    # Define objective & constraints
+    model.OBJ = pyo.Objective(rule=_obj_expression, sense=pyo.minimize)
+    model.FlowBalanceConstraint = pyo.Constraint(
+        model.Nodes,
+        rule=_flow_balance_constraint_rule)
+    # Check if returning concrete or abstract model
+    if kwargs:
+        return model.create_instance(**kwargs)
+    else:
+        return model
+
+
+def multicommodity_flow_model(**kwargs):
+    """
+    Factory method for the minimum cost multi-commodity flow problem.
+
+    Several commodities (such as product families) are each sent over
+    the arcs of a network from their own supply nodes to their own
+    demand nodes, as in :py:obj:`transshipment_model`, but share the
+    capacity of each arc.  The objective is to minimize the total
+    shipping cost of all commodities.
+
+    Parameters
+    ----------
+    **kwargs
+        Passed into Pyomo Abstract Model's `create_instance`
+        to return Pyomo Concrete Model instead.
+
+    Returns
+    -------
+    pyomo.environ.AbstractModel or pyomo.environ.ConcreteModel
+        Abstract Model with the sets, parameters, decision variables,
+        objective, and constraints for the multi-commodity flow problem.
+        Returns a Concrete Model instead if any kwargs passed.
+
+    Notes
+    -----
+    `Supply` is the net supply of each commodity at each node, and
+    defaults to 0.  Each commodity's total supply must equal its total
+    demand.  `Capacity` limits the total flow of all commodities on an
+    arc, and defaults to no limit.  The model has a variable for every
+    commodity and arc, so for large networks with many commodities,
+    :py:meth:`Graph.solve_multicommodity_flow` is much faster.
+
+    .. math::
+
+        \\text{Min} \\sum_{k \\in K}\\sum_{(i, j) \\in A}C_{i,j}X_{k,i,j}
+
+        \\text{s.t. } \\sum_{j : (i, j) \\in A} X_{k,i,j} -
+        \\sum_{j : (j, i) \\in A} X_{k,j,i} = B_{k,i}
+        \\quad \\forall k \\in K, i \\in N
+
+        \\sum_{k \\in K} X_{k,i,j} \\leq U_{i,j}
+        \\quad \\forall (i, j) \\in A
+
+        X_{k,i,j} \\geq 0 \\quad \\forall k \\in K, (i, j) \\in A
+    """
+    def _arcs_by_node(model):
+        """Index the arcs by the node they leave and enter"""
+        model.arcs_from = defaultdict(list)
+        model.arcs_to = defaultdict(list)
+        for i, j in model.Arcs:
+            model.arcs_from[i].append(j)
+            model.arcs_to[j].append(i)
+
+    def _obj_expression(model):
+        """Objective Expression: Minimizing Shipping Costs"""
+        return sum(model.Costs[i, j] * model.Flows[k, i, j]
+                   for k in model.Commodities for i, j in model.Arcs)
+
+    def _flow_balance_constraint_rule(model, k, i):
+        """Constraints for each node sending out its net supply"""
+        if not model.arcs_from[i] and not model.arcs_to[i]:
+            return (pyo.Constraint.Skip
+                    if pyo.value(model.Supply[k, i]) == 0
+                    else pyo.Constraint.Infeasible)
+        return sum(model.Flows[k, i, j] for j in model.arcs_from[i]) - \
+            sum(model.Flows[k, j, i] for j in model.arcs_to[i]) == \
+            model.Supply[k, i]
+
+    def _bundle_constraint_rule(model, i, j):
+        """Constraints for the total flow on each arc"""
+        if pyo.value(model.Capacity[i, j]) == float("inf"):
+            return pyo.Constraint.Skip
+        return sum(model.Flows[k, i, j] for k in model.Commodities) <= \
+            model.Capacity[i, j]
+
+    # Create the abstract model
+    model = pyo.AbstractModel()
+    # Define sets/params that are always used
+    model.Commodities = pyo.Set()
+    model.Nodes = pyo.Set()
+    model.Arcs = pyo.Set(dimen=2, within=model.Nodes * model.Nodes)
+    model.Costs = pyo.Param(model.Arcs)
+    # Define optional params
+    model.Supply = pyo.Param(model.Commodities, model.Nodes, default=0)
+    model.Capacity = pyo.Param(model.Arcs, default=float("inf"))
+    model.ArcsByNode = pyo.BuildAction(rule=_arcs_by_node)
+    # Define decision variables
+    model.Flows = pyo.Var(
+        model.Commodities, model.Arcs,
+        within=pyo.NonNegativeReals)
+    # Define objective & constraints
+    model.OBJ = pyo.Objective(rule=_obj_expression, sense=pyo.minimize)
+    model.FlowBalanceConstraint = pyo.Constraint(
+        model.Commodities, model.Nodes,
+        rule=_flow_balance_constraint_rule)
+    model.BundleConstraint = pyo.Constraint(
+        model.Arcs,
+        rule=_bundle_constraint_rule)
+    # Check if returning concrete or abstract model
+    if kwargs:
+        return model.create_instance(**kwargs)
+    else:
+        return model
+
+
+# Column names recognized for arc data, plus lowercase & uppercase versions
+_FROM_NAMES = ["From", "FromNode", "From_Node", "From_node", "From Node"]
+_TO_NAMES = ["To", "ToNode", "To_Node", "To_node", "To Node"]
+_COST_NAMES = ["Cost", "ShippingCost", "Shipping_Cost", "Shipping_cost",
+               "Shipping Cost"]
+_DIRECTION_NAMES = ["Direction", "direction"]
+_CAPACITY_NAMES = ["Capacity", "Cap", "Upper_Bound", "UpperBound",
+                   "Upper Bound"]
+
+
+def _name_choices(names):
+    """Set of names, along with their lowercase & uppercase versions"""
+    return set(names) | {name.lower() for name in names} | {
+        name.upper() for name in names}
+
+
+def _arc_columns(arc_data):
+    """
+    Find the from node, to node, cost, direction, and capacity columns of
+    arc data.
+
+    Columns are matched by name (e.g. "From", "To_Node", "shipping cost",
+    "Direction", "Capacity"), or else read in order if there are no
+    matching names.  In order, the fifth column is only read as the
+    capacity when there are exactly five columns.
+
+    Parameters
+    ----------
+    arc_data : pandas.DataFrame
+        Arc data with three or more columns
+
+    Returns
+    -------
+    tuple of pandas.Series
+        From node, to node, cost, direction, and capacity columns.
+        Direction is None if the data has no direction column.  Any
+        value other than "two", including a missing value, is
+        one-directional.  Capacity is None if the data has no capacity
+        column.
+
+    Raises
+    ------
+    ValueError
+        If `arc_data` does not have enough columns to support
+        the requirements (from_node, to_node, cost)
+    """
+    matches = [[col for col in arc_data.columns
+                if col in _name_choices(names)]
+               for names in [_FROM_NAMES, _TO_NAMES, _COST_NAMES]]
+    if all(matches):
+        columns = [arc_data[col_matches[0]] for col_matches in matches]
+        direction_matches = [col for col in arc_data.columns
+                             if col in _DIRECTION_NAMES]
+        columns.append(arc_data[direction_matches[0]]
+                       if direction_matches else None)
+        capacity_matches = [col for col in arc_data.columns
+                            if col in _name_choices(_CAPACITY_NAMES)]
+        columns.append(arc_data[capacity_matches[0]]
+                       if capacity_matches else None)
+    else:
+        num_cols = arc_data.shape[1]
+        if num_cols < 3:
+            raise ValueError("Not enough columns in `arcs` to support"
+                             " required arguments (`From`, `To`,"
+                             " `Cost`)")
+        columns = [arc_data.iloc[:, i] for i in range(3)]
+        columns.append(arc_data.iloc[:, 3] if num_cols >= 4 else None)
+        # Only exactly five columns has a capacity - later columns of
+        #  wider data are ignored, as they always were
+        columns.append(arc_data.iloc[:, 4] if num_cols == 5 else None)
+    return tuple(columns)
+
+
 class Graph():
     """
     Fully connected network of nodes via arcs with costs.
@@ -151,11 +600,31 @@ class Graph():
     nodes : :py:obj:`set`, optional
         A set of all unique nodes in the graph.
         e.g. {"A", "B", "C", ...}
+    cache_size : int, optional
+        Number of :py:obj:`shortest_path` results to keep, so repeated
+        calls for the same source are answered without solving again.
+        The least recently used results are dropped first, and all are
+        dropped when arcs are added.  Defaults to 0 (no caching).
+    capacities : :py:obj:`dict`, optional
+        The most flow that can travel from one node to another.  Arcs
+        left out have no limit.
+        e.g. {('A', 'B'): 10, ('A', 'C'): 25, ...}
     """
-    def __init__(self, arcs=None, costs=None, nodes=None):
+    def __init__(self, arcs=None, costs=None, nodes=None, cache_size=0,
+                 capacities=None):
         self.arcs = arcs if arcs is not None else defaultdict(list)
         self.costs = costs if costs is not None else {}
         self.nodes = nodes if nodes is not None else set()
+        self.capacities = capacities if capacities is not None else {}
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._path_cache = OrderedDict()
+        self._compact = None
+        self._compact_signature = None
+        self._compact_shared = False
+        self._path_trees = {}
+        self._hierarchy = None
 
     def __repr__(self):
         """
@@ -174,6 +643,13 @@ class Graph():
 
     def add_arcs(self, arc_data):
         """
+        Add arcs to the graph, overwriting the cost of existing arcs.
+
+        All input types are converted to columns and loaded at once, so
+        large tables do not have to be added one arc at a time.
+        Bi-directional arcs are added in both directions, and arcs given
+        more than once keep their last cost.
+
         Parameters
         ----------
         arc_data
@@ -182,7 +658,11 @@ class Graph():
             cost ("Cost), and
             optionally direction ("Direction") -
             whether the arc is one-directional
-            ("one") or bi-directional ("two").
+            ("one") or bi-directional ("two"), "two" for rows of a list
+            that leave it out - and
+            capacity ("Capacity"), the most flow the arc can carry.
+            Missing capacities mean no limit.  Without column names,
+            capacity is read only from data with exactly five columns.
 
         Raises
         ------
@@ -219,170 +699,1201 @@ class Graph():
         >>> arcs_data_df = pd.DataFrame(arcs_data)
         >>> graph = Graph().add_arcs(arcs_data_df)
         """
-        if isinstance(arc_data, (Sequence, np.ndarray)):
-            for arc in arc_data:
-                self._add_arc(*arc)
-        elif isinstance(arc_data, (pd.DataFrame, dict)):
-            if isinstance(arc_data, dict):
-                arc_data = pd.DataFrame(arc_data)
-            # Create possible keywords
-            from_choices = pd.Series(["From", "FromNode", "From_Node",
-                                      "From_node", "From Node"])
-            to_choices = pd.Series(["To", "ToNode", "To_Node", "To_node",
-                                    "To Node"])
-            cost_choices = pd.Series(["Cost", "ShippingCost", "Shipping_Cost",
-                                      "Shipping_cost", "Shipping Cost"])
-            # Add lowercase & uppercase options to choices
-            from_choices = from_choices.append(
-                from_choices.str.lower(), ignore_index=True).append(
-                    from_choices.str.upper(), ignore_index=True)
-            to_choices = to_choices.append(
-                to_choices.str.lower(), ignore_index=True).append(
-                    to_choices.str.upper(), ignore_index=True)
-            cost_choices = cost_choices.append(
-                cost_choices.str.lower(), ignore_index=True).append(
-                    cost_choices.str.upper(), ignore_index=True)
-            # Get lists of matches in column names
-            from_matches = [col for col in arc_data.columns
-                            if col in set(from_choices)]
-            to_matches = [col for col in arc_data.columns
-                          if col in set(to_choices)]
-            cost_matches = [col for col in arc_data.columns
-                            if col in set(cost_choices)]
-            if from_matches and to_matches and cost_matches:
-                direction_choices = pd.Series(["Direction", "direction"])
-                direction_matches = [col for col in arc_data.columns
-                                     if col in set(direction_choices)]
-                if direction_matches:
-                    key_cols = {"From": from_matches[0],
-                                "To": to_matches[0],
-                                "Cost": cost_matches[0],
-                                "Direction": direction_matches[0]}
-                    for _, row in arc_data.iterrows():
-                        self._add_arc(row[key_cols["From"]],
-                                      row[key_cols["To"]],
-                                      row[key_cols["Cost"]],
-                                      row[key_cols["Direction"]])
-                else:
-                    key_cols = {"From": from_matches[0],
-                                "To": to_matches[0],
-                                "Cost": cost_matches[0]}
-                    for _, row in arc_data.iterrows():
-                        self._add_arc(row[key_cols["From"]],
-                                      row[key_cols["To"]],
-                                      row[key_cols["Cost"]])
-            else:
-                num_cols = arc_data.shape[1]
-                if num_cols == 3:
-                    for _, row in arc_data.iterrows():
-                        self._add_arc(row[0], row[1], row[2])
-                elif num_cols >= 4:
-                    for _, row in arc_data.iterrows():
-                        self._add_arc(row[0], row[1], row[2], row[3])
-                else:
-                    raise ValueError("Not enough columns in `arcs` to support"
-                                     " required arguments (`From`, `To`,"
-                                     " `Cost`)")
-        else:
+        if isinstance(arc_data, dict):
+            arc_data = pd.DataFrame(arc_data)
+        elif isinstance(arc_data, (Sequence, np.ndarray)):
+            if len(arc_data) == 0:
+                return
+            rows = list(arc_data)
+            arc_data = pd.DataFrame(rows)
+            if arc_data.shape[1] > 3:
+                # Rows without a direction are bi-directional, as when
+                #  added one by one - only a given NaN or None is not
+                short = np.fromiter((len(row) < 4 for row in rows),
+                                    dtype=bool, count=len(rows))
+                arc_data.loc[short, 3] = "two"
+        elif not isinstance(arc_data, pd.DataFrame):
             raise TypeError("Argument 'arcs' must be an iterable of"
                             " iterables!")
+        self._add_arcs_bulk(*_arc_columns(arc_data))
+
+    def read_arcs(self, filepath, file_type=None, chunksize=100_000,
+                  **kwargs):
+        """
+        Add arcs to the graph from a CSV or Parquet file, in chunks.
+
+        The file is read `chunksize` rows at a time, and each chunk is
+        added to the graph before the next one is read, so the whole
+        table is never held in memory at once.  Columns are found the
+        same way as in :py:obj:`add_arcs` - by name, or else in order.
+
+        Parameters
+        ----------
+        filepath : str or path-like
+            Path to the arc data file
+        file_type : str, optional
+            Either "csv" or "parquet".  If not given, files ending in
+            ".parquet" or ".pq" are read as Parquet, and all others as CSV.
+        chunksize : int, optional
+            Number of rows to read and add at a time
+        **kwargs
+            Passed into :py:obj:`pandas.read_csv` for CSV files, or
+            :py:obj:`pyarrow.parquet.ParquetFile.iter_batches` for
+            Parquet files
+
+        Raises
+        ------
+        ValueError
+            If `file_type` is not "csv" or "parquet", or the file does not
+            have enough columns to support the requirements
+            (from_node, to_node, cost)
+        ImportError
+            If reading a Parquet file and pyarrow is not installed
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.read_arcs("arcs.csv", chunksize=500_000)  # doctest: +SKIP
+        """
+        if file_type is None:
+            suffix = os.path.splitext(str(filepath))[1].lower()
+            file_type = "parquet" if suffix in {".parquet", ".pq"} else "csv"
+        if file_type == "csv":
+            chunks = pd.read_csv(filepath, chunksize=chunksize, **kwargs)
+        elif file_type == "parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as error:
+                raise ImportError("Reading Parquet files requires"
+                                  " pyarrow to be installed!") from error
+            chunks = (batch.to_pandas() for batch in
+                      pq.ParquetFile(filepath).iter_batches(
+                          batch_size=chunksize, **kwargs))
+        else:
+            raise ValueError("Argument 'file_type' must be either"
+                             " 'csv' or 'parquet'!")
+        for chunk in chunks:
+            self._add_arcs_bulk(*_arc_columns(chunk))
+
+    def update_costs(self, arc_data):
+        """
+        Change the costs of existing arcs, keeping cached shortest path
+        results up to date.
+
+        Unlike :py:obj:`add_arcs`, which drops every cached result, the
+        results cached by :py:obj:`shortest_path` are repaired (see
+        :py:obj:`CompactGraph.update_costs`), only solving again the
+        nodes whose costs or paths change.  The cost and predecessor
+        arrays of each cached result are kept between calls, so only the
+        entries of changed nodes are updated.  The costs of the copy kept
+        by :py:obj:`to_compact` are changed in place rather than rebuilt.
+
+        Parameters
+        ----------
+        arc_data
+            Arcs and their new costs, in any of the forms accepted by
+            :py:obj:`add_arcs`.  Bi-directional arcs change the cost of
+            both directions.
+
+        Raises
+        ------
+        ValueError
+            If an arc does not exist in the graph, or `arc_data` does not
+            have enough columns
+
+        Examples
+        --------
+        >>> graph = Graph(cache_size=10)
+        >>> graph.add_arcs([["A", "B", 7, "one"], ["B", "C", 3, "one"],
+        ...                 ["A", "C", 12, "one"]])
+        >>> graph.shortest_path("A")["Costs"]
+        {'A': 0, 'B': 7, 'C': 10}
+        >>> graph.update_costs([["B", "C", 6, "one"]])
+        >>> graph.shortest_path("A")["Costs"]
+        {'A': 0, 'B': 7, 'C': 12}
+        >>> graph.shortest_path("A")["Paths"]["C"]
+        ('A', 'C')
+        """
+        if isinstance(arc_data, (dict, Sequence, np.ndarray)):
+            arc_data = pd.DataFrame(arc_data if isinstance(arc_data, dict)
+                                    else list(arc_data))
+        from_nodes, to_nodes, costs, directions, _ = _arc_columns(arc_data)
+        if directions is not None:
+            two_way = (directions == "two").to_numpy()
+        else:
+            two_way = np.ones(len(costs), dtype=bool)
+        from_nodes, to_nodes = (
+            np.concatenate([from_nodes.to_numpy(dtype=object),
+                            to_nodes.to_numpy(dtype=object)[two_way]]),
+            np.concatenate([to_nodes.to_numpy(dtype=object),
+                            from_nodes.to_numpy(dtype=object)[two_way]]))
+        costs = np.concatenate([costs.to_numpy(),
+                                costs.to_numpy()[two_way]]).tolist()
+        arcs = list(zip(from_nodes.tolist(), to_nodes.tolist()))
+        for from_node, to_node in arcs:
+            if (from_node, to_node) not in self.costs:
+                raise ValueError(f"Arc ({from_node}, {to_node}) does not"
+                                 " exist in the Graph!")
+        if self._compact is not None and \
+                self._compact_signature != self._signature():
+            # Changed directly since the compact copy was made
+            self.clear_cache()
+        self.costs.update(zip(arcs, costs))
+        self._hierarchy = None
+        if min(costs, default=0) < 0:
+            self.clear_cache()
+            return
+        if self._compact is None and not self._path_cache:
+            return
+        compact = (self._compact if self._compact is not None
+                   else self.to_compact())
+        if self._compact_shared:
+            # Snapshots share the costs array, so change a copy
+            compact.costs = compact.costs.copy()
+            self._compact_shared = False
+        compact.update_costs(from_nodes, to_nodes, costs)
+        arc_ids = [(compact.index[from_node], compact.index[to_node])
+                   for from_node, to_node in arcs]
+        trees = {}
+        for source, analysis in list(self._path_cache.items()):
+            tree = self._path_trees.get(source)
+            if tree is None:
+                tree = self._path_tree(compact, source, analysis)
+            dist, pred, changed = repair_tree(
+                compact.arrays, compact.reverse().arrays, tree.dist,
+                tree.pred, arc_ids)
+            trees[source] = ShortestPathTree(compact.labels, tree.source,
+                                             dist, pred, compact.index)
+            if not changed:
+                continue
+            # Change copies, so results returned before are left alone
+            min_costs = dict(analysis["Costs"])
+            best_paths = dict(analysis["Paths"])
+            # Each node solved again comes after the node before it on
+            #  its path, so that node's cost and path are already new
+            for node_id in changed:
+                node = compact.labels[node_id]
+                if pred[node_id] == -1:
+                    min_costs.pop(node, None)
+                    best_paths.pop(node, None)
+                    continue
+                parent = compact.labels[pred[node_id]]
+                min_costs[node] = (min_costs[parent]
+                                   + self.costs[(parent, node)])
+                best_paths[node] = best_paths[parent] + (node,)
+            self._path_cache[source] = {"Costs": min_costs,
+                                        "Paths": best_paths}
+        self._path_trees = trees
+
+    def _path_tree(self, compact, source, analysis):
+        """
+        Cost and predecessor arrays of a cached :py:obj:`shortest_path`
+        result, over the ids of `compact`
+        """
+        min_costs, best_paths = analysis["Costs"], analysis["Paths"]
+        dist = np.full(compact.num_nodes, np.inf)
+        pred = np.full(compact.num_nodes, -1, dtype=np.int64)
+        dist[[compact.index[node] for node in min_costs]] = list(
+            min_costs.values())
+        for node, path in best_paths.items():
+            if len(path) > 1:
+                pred[compact.index[node]] = compact.index[path[-2]]
+        return ShortestPathTree(compact.labels, compact.index[source], dist,
+                                pred, compact.index)
 
-    def _add_arc(self, from_node, to_node, cost, direction="two"):
-        # Check if to_node in from_node's list in self.arcs dict
-        if from_node not in self.arcs or to_node not in self.arcs[from_node]:
+    def _add_arc(self, from_node, to_node, cost, direction="two",
+                 capacity=None):
+        self.clear_cache()
+        # Arc already exists if it has a cost - avoids searching the list
+        if (from_node, to_node) not in self.costs:
             self.arcs[from_node].append(to_node)
 
         # Add new cost, or overwrite old cost
         self.costs[(from_node, to_node)] = cost
+        if capacity is not None:
+            self.capacities[(from_node, to_node)] = capacity
 
         # Do same thing as above in reverse if bidirectional arc
         if direction == "two":
-            if to_node not in self.arcs and (
-                    from_node not in self.arcs[to_node]):
+            if (to_node, from_node) not in self.costs:
                 self.arcs[to_node].append(from_node)
             self.costs[(to_node, from_node)] = cost
+            if capacity is not None:
+                self.capacities[(to_node, from_node)] = capacity
 
         # Add from_node and to_node to nodes set if don't exist
         self.nodes.update([from_node, to_node])
 
-    def shortest_path(self, source):
+    def _add_arcs_bulk(self, from_nodes, to_nodes, costs, directions=None,
+                       capacities=None):
         """
-        Solve the shortest path tree problem with Dijkstra's Algorithm.
-        This requires nonnegative costs/arc lengths to get an optimal solution.
+        Add many arcs at once with column operations.
+
+        Gives the same result as calling :py:obj:`_add_arc` on each arc
+        in order, but expands bi-directional arcs and finds new arcs
+        on whole arrays instead of one arc at a time.
 
         Parameters
         ----------
-        source
-            The source node to use for minimizing the distance to all
-            other nodes
+        from_nodes, to_nodes, costs : array-like
+            From node, to node, and cost of each arc
+        directions : array-like, optional
+            "two" for bi-directional arcs; any other value is
+            one-directional.  If not given, all arcs are bi-directional.
+        capacities : array-like, optional
+            Capacity of each arc, with missing values for no limit.
+            If not given, existing capacities are kept.
+        """
+        self.clear_cache()
+        from_nodes = np.asarray(from_nodes, dtype=object)
+        to_nodes = np.asarray(to_nodes, dtype=object)
+        costs = np.asarray(costs)
+        if directions is None:
+            two_way = np.ones(len(costs), dtype=bool)
+        else:
+            two_way = np.asarray(directions, dtype=object) == "two"
+        # Interleave each arc with its reverse, dropping reverses of
+        #  one-directional arcs, so order matches adding arcs one by one
+        keep = np.column_stack([np.ones(len(costs), dtype=bool),
+                                two_way]).ravel()
+        all_from = np.column_stack([from_nodes, to_nodes]).ravel()[keep]
+        all_to = np.column_stack([to_nodes, from_nodes]).ravel()[keep]
+        all_costs = np.repeat(costs, 2)[keep].tolist()
+        arc_tuples = list(zip(all_from.tolist(), all_to.tolist()))
+        # Later costs overwrite earlier costs of the same arc, and arcs
+        #  without a cost yet are added at the end of the costs dict
+        num_old_arcs = len(self.costs)
+        self.costs.update(zip(arc_tuples, all_costs))
+        if capacities is not None:
+            all_capacities = np.repeat(
+                np.asarray(capacities, dtype=float), 2)[keep]
+            all_capacities[np.isnan(all_capacities)] = np.inf
+            self.capacities.update(zip(arc_tuples, all_capacities.tolist()))
+        new_arcs = pd.DataFrame(list(islice(self.costs, num_old_arcs, None)),
+                                columns=["From", "To"])
+        # Group the new arcs by from node, keeping their order
+        from_codes, from_labels = pd.factorize(new_arcs["From"])
+        order = np.argsort(from_codes, kind="stable")
+        groups = np.split(new_arcs["To"].to_numpy()[order],
+                          np.cumsum(np.bincount(from_codes))[:-1])
+        for from_node, to_list in zip(from_labels.tolist(), groups):
+            self.arcs[from_node].extend(to_list.tolist())
+        self.nodes.update(from_nodes.tolist())
+        self.nodes.update(to_nodes.tolist())
+
+    def cache_info(self):
+        """
+        Return statistics of the :py:obj:`shortest_path` result cache.
 
         Returns
         -------
         dictionary
-            Contains minimum costs and best paths
-            to achieve those minimum costs
+            Number of cache "Hits" and "Misses" so far, the number of
+            results currently cached ("Size"), and "MaxSize"
+            (`cache_size`)
+        """
+        return {"Hits": self.cache_hits, "Misses": self.cache_misses,
+                "Size": len(self._path_cache), "MaxSize": self.cache_size}
 
-        Raises
-        ------
-        ValueError
-            If self.costs contains any negative costs (arc lengths)
+    def clear_cache(self):
         """
-        if min(self.costs.values()) < 0:
-            raise ValueError("Non-negative costs (arc lengths) required"
-                             " for Dijkstra's Algorithm for"
-                             " shortest path tree problem!")
-        solved_nodes = {source}
-        min_costs = {source: 0}
-        best_paths = {source: (source,)}
-        while solved_nodes != self.nodes:
-            # Find best arc that passes from solved node to unsolved
-            # Filter self.arcs to include only arcs from solved nodes
-            valid_arcs = {node: self.arcs[node]
-                          for node in solved_nodes if self.arcs[node]}
-            # Change valid_arcs from dict of lists to list of tuples
-            #  And take out arcs that go to solved_nodes
-            arc_tuples = [(key, *dest) for key, value in valid_arcs.items()
-                          for dest in value]
-            arc_tuples = [(start, end) for (start, end) in arc_tuples
-                          if end not in solved_nodes]
-            # Retrieve costs for arc_tuples
-            costs = {node: self.costs[node] for node in arc_tuples}
-            total_costs = {(from_node, to_node):
-                           min_costs[from_node] + costs[(from_node, to_node)]
-                           for (from_node, to_node) in arc_tuples}
-            best_add = min(total_costs, key=total_costs.get)
-            best_cost = total_costs[best_add]
-            new_solved_node = best_add[1]
-            solved_nodes.add(new_solved_node)
-            min_costs[new_solved_node] = best_cost
-            best_paths[new_solved_node] = \
-                best_paths[best_add[0]] + (new_solved_node,)
-        return {"Costs": min_costs, "Paths": best_paths}
+        Drop all cached :py:obj:`shortest_path` results, along with the
+        compact copy kept by :py:obj:`to_compact` and the index kept by
+        :py:obj:`contraction_hierarchy`.
 
-    def transportation(self, supply, demand):
+        Called automatically when arcs are added through this class's
+        methods, or when :py:obj:`to_compact` finds that nodes or arcs
+        were added to or removed from `nodes`, `arcs`, `costs`, or
+        `capacities` directly.  Call it yourself after changing costs or
+        capacities of existing arcs directly, or after replacing an
+        existing arc's to node in `arcs`.
         """
-        Return Concrete Model for Balanced Transportation Problem.
+        self._path_cache.clear()
+        self._path_trees.clear()
+        self._compact = None
+        self._compact_signature = None
+        self._compact_shared = False
+        self._hierarchy = None
 
-        This calls :py:obj:`transportation_model()` for this Graph
-        object and the arguments of this method.  For more details
-        on the model, see the network module function's docstring.
+    def _signature(self):
+        """
+        Identity and size of the nodes, arcs, costs, and capacities, to
+        notice nodes and arcs added or removed directly without reading
+        the whole graph
+        """
+        return tuple((id(data), len(data)) for data in
+                     [self.nodes, self.arcs, self.costs, self.capacities])
+
+    def to_compact(self):
+        """
+        Return a compact, array-backed copy of this graph.
+
+        Node labels are interned to integer ids, and the arcs and costs
+        are stored in CSR style NumPy arrays.  Later changes to this
+        graph are not reflected in the copy.
+
+        The copy is kept and returned again by later calls, so methods
+        that solve over the compact form do not rebuild it every time.
+        Adding arcs or changing costs through this class's methods
+        replaces or updates the copy.  Each call also checks the number
+        of nodes, arcs, costs, and capacities, and builds a new copy
+        (dropping all cached results, as :py:obj:`clear_cache` does) if
+        any were added or removed directly.  Changing the cost or
+        capacity of an existing arc directly is not noticed - call
+        :py:obj:`clear_cache` afterwards, or use :py:obj:`update_costs`.
+
+        Returns
+        -------
+        CompactGraph
+        """
+        signature = self._signature()
+        if self._compact is not None and \
+                signature != self._compact_signature:
+            self.clear_cache()
+        if self._compact is None:
+            self._compact = CompactGraph.from_graph(self)
+            self._compact_signature = signature
+        return self._compact
+
+    def snapshot(self, hierarchy=False):
+        """
+        Return a read-only, array-backed snapshot of this graph, which
+        many threads can query at once without locks.
+
+        The snapshot shares the arrays of :py:obj:`to_compact`, so taking
+        one after the graph changes costs about the same as building the
+        compact copy, and taking another before it changes again is
+        nearly free.  Later changes to this graph are not reflected in
+        the snapshot, so a thread changing the graph can keep taking new
+        snapshots while other threads query the last one.
 
         Parameters
         ----------
-        supply: dict
-            dict of source nodes and their supply capacities
-            e.g. {"A": 15, "B": 35}
-        demand: dict
-            dict of destination nodes and their demand requirements
-            e.g. {"C": 20, "D": 30}
+        hierarchy : bool, optional
+            If True, include the index from
+            :py:obj:`contraction_hierarchy`, so the snapshot can answer
+            :py:obj:`GraphSnapshot.shortest_path_to` with method
+            "hierarchy"
+
+        Returns
+        -------
+        GraphSnapshot
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 7, "one"], ["B", "C", 3, "one"]])
+        >>> snapshot = graph.snapshot()
+        >>> graph.add_arcs([["A", "C", 5, "one"]])
+        >>> snapshot.shortest_path_to("A", "C")
+        {'Cost': 10.0, 'Path': ('A', 'B', 'C')}
+        >>> graph.snapshot().shortest_path_to("A", "C")
+        {'Cost': 5.0, 'Path': ('A', 'C')}
+        """
+        compact = self.to_compact()
+        self._compact_shared = True
+        return GraphSnapshot.from_compact(
+            compact,
+            self.contraction_hierarchy() if hierarchy else None)
+
+    def contraction_hierarchy(self, path=None):
+        """
+        Build a contraction hierarchy index for fast repeated
+        point-to-point queries.
+
+        Preprocessing takes a while - about 18 seconds for a 20,000
+        node grid (see :py:obj:`ormm.network.hierarchy.contract`) -
+        but afterwards :py:obj:`shortest_path_to` with method
+        "hierarchy" only searches a small part of the graph for each
+        query.  The index is kept
+        and returned again by later calls until the graph changes, as
+        the copy kept by :py:obj:`to_compact` is.
+
+        Parameters
+        ----------
+        path : str or path-like, optional
+            Directory to save the index in, so it can be reloaded with
+            :py:obj:`ContractionHierarchy.load` instead of rebuilt
+
+        Returns
+        -------
+        ContractionHierarchy
 
         Raises
         ------
         ValueError
-            A source or destination node given does not exist in
-            the graph object
+            If the graph contains any negative costs
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 7, "one"], ["B", "C", 3, "one"],
+        ...                 ["A", "C", 12, "one"]])
+        >>> graph.contraction_hierarchy().shortest_path_to("A", "C")
+        {'Cost': 10.0, 'Path': ('A', 'B', 'C')}
         """
-        # Data that needs to be used for concrete model
+        compact = self.to_compact()
+        if self._hierarchy is None:
+            self._hierarchy = ContractionHierarchy.from_compact(compact)
+        if path is not None:
+            self._hierarchy.save(path)
+        return self._hierarchy
+
+    @classmethod
+    def from_coordinates(cls, coordinates, labels=None, k=None, radius=None,
+                         metric="euclidean", direction="two",
+                         earth_radius=EARTH_RADIUS, **kwargs):
+        """
+        Build a graph whose nodes are points and whose arcs join each
+        point to its nearest neighbors, costing the distance between
+        them.
+
+        Neighbors are found with a grid index over the points, so only
+        nearby points are compared instead of every pair, and the arcs
+        are loaded all at once, the same as :py:obj:`add_arcs`.
+
+        Parameters
+        ----------
+        coordinates : array-like
+            Coordinates of each point, one row per point, such as an
+            (n, 2) array or a DataFrame of x and y columns.  For
+            "haversine", each row is a (latitude, longitude) in degrees.
+        labels : array-like, optional
+            Node label of each point.  Defaults to the index of a
+            DataFrame, or else 0 through n - 1.
+        k : int, optional
+            Number of nearest neighbors to join each point to
+        radius : float, optional
+            Join every pair of points within this distance.  With `k`,
+            each point is joined to its k nearest neighbors within
+            `radius`.
+        metric : str, optional
+            Distance between points - "euclidean" (default),
+            "manhattan", or "haversine" for the great circle distance
+            between points on the Earth
+        direction : str, optional
+            "two" (default) for bi-directional arcs, so two points are
+            joined if either is a neighbor of the other, or "one" for
+            arcs only from each point to its own neighbors
+        earth_radius : float, optional
+            Radius of the Earth for "haversine" costs, in kilometers by
+            default.  `radius` is in the same units.
+        **kwargs
+            Passed into the Graph constructor, such as `cache_size`
+
+        Returns
+        -------
+        Graph
+
+        Raises
+        ------
+        ValueError
+            If neither `k` nor `radius` is given, if either is negative,
+            if `metric` is not recognized, or if `labels` are not unique
+            or not one per point
+
+        Examples
+        --------
+        >>> points = [[0, 0], [1, 0], [0, 2], [3, 4]]
+        >>> graph = Graph.from_coordinates(points, labels=list("ABCD"), k=1,
+        ...                                metric="manhattan")
+        >>> graph.arcs["C"]
+        ['A', 'D']
+        >>> graph.shortest_path("D")["Costs"]
+        {'D': 0, 'C': 5.0, 'A': 7.0, 'B': 8.0}
+        """
+        labels = _point_labels(coordinates, labels)
+        sources, targets, distances = neighbor_pairs(
+            coordinates, k, radius, metric, direction == "two",
+            earth_radius)
+        directions = None
+        if direction != "two":
+            directions = np.full(len(distances), direction, dtype=object)
+        graph = cls(**kwargs)
+        graph._add_arcs_bulk(labels[sources], labels[targets], distances,
+                             directions)
+        graph.nodes.update(labels.tolist())
+        return graph
+
+    @classmethod
+    def from_compact(cls, compact):
+        """
+        Build a Graph from a :py:obj:`CompactGraph`.
+
+        Parameters
+        ----------
+        compact : CompactGraph
+            Compact graph to copy the nodes, arcs, costs, and capacities
+            from
+
+        Returns
+        -------
+        Graph
+        """
+        labels = compact.labels.tolist()
+        from_labels = compact.labels[compact.sources].tolist()
+        to_labels = compact.labels[compact.targets].tolist()
+        offsets = compact.offsets.tolist()
+        arcs = defaultdict(list)
+        for node_id, label in enumerate(labels):
+            if offsets[node_id + 1] > offsets[node_id]:
+                arcs[label] = to_labels[offsets[node_id]:offsets[node_id + 1]]
+        costs = dict(zip(zip(from_labels, to_labels), compact.costs.tolist()))
+        capacities = None
+        if compact.capacities is not None:
+            capacities = dict(zip(zip(from_labels, to_labels),
+                                  compact.capacities.tolist()))
+        return cls(arcs, costs, set(labels), capacities=capacities)
+
+    def save(self, path):
+        """
+        Save the graph to a directory of binary ``.npy`` files.
+
+        The graph is saved as a :py:obj:`CompactGraph` (see
+        :py:obj:`CompactGraph.save`), so costs are stored as floats.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Directory to save the graph in
+        """
+        self.to_compact().save(path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a graph saved with :py:obj:`Graph.save`.
+
+        To share one memory-mapped copy of a saved graph between worker
+        processes, use ``CompactGraph.load(path, mmap_mode="r")`` instead.
+
+        Parameters
+        ----------
+        path : str or path-like
+            Directory the graph was saved in
+
+        Returns
+        -------
+        Graph
+        """
+        return cls.from_compact(CompactGraph.load(path))
+
+    def shortest_path(self, source, predecessors=False, method="dijkstra"):
+        """
+        Solve the shortest path tree problem with Dijkstra's Algorithm.
+        This requires nonnegative costs/arc lengths to get an optimal solution.
+        For negative costs, use method "bellman_ford" instead.
+
+        Unsolved nodes are kept in a binary heap keyed by their tentative
+        cost, so each solve takes :math:`O((V + E) \\log V)` time.
+
+        Parameters
+        ----------
+        source
+            The source node to use for minimizing the distance to all
+            other nodes
+        predecessors : bool, optional
+            If True, solve over the compact form of the graph and return
+            a :py:obj:`ShortestPathTree` of cost and predecessor arrays
+            instead.  Paths are then only built when asked for, which
+            saves storing a copy of every path on large graphs.
+        method : str, optional
+            "dijkstra" (default), or "bellman_ford" to solve over the
+            compact form of the graph with a label correcting algorithm
+            that allows negative costs and detects negative cycles
+
+        Returns
+        -------
+        dictionary or ShortestPathTree
+            Contains minimum costs and best paths
+            to achieve those minimum costs.  Nodes that cannot be
+            reached from `source` are left out of both.  If the graph
+            has a `cache_size`, cached results are shared between calls
+            and should not be modified.
+
+        Raises
+        ------
+        ValueError
+            If self.costs contains any negative costs (arc lengths) and
+            `method` is "dijkstra", if `source` does not exist in the
+            graph, or if `method` is not recognized
+        NegativeCycleError
+            If `method` is "bellman_ford" and a negative cycle can be
+            reached from `source`
+        """
+        if source not in self.nodes:
+            raise ValueError(f"Source Node {source} does not " +
+                             "exist in the Graph!")
+        if predecessors or method != "dijkstra":
+            return self.to_compact().shortest_path(
+                source, predecessors=predecessors, method=method)
+        if self.cache_size:
+            if source in self._path_cache:
+                self.cache_hits += 1
+                self._path_cache.move_to_end(source)
+                return self._path_cache[source]
+            self.cache_misses += 1
+        if self.costs and min(self.costs.values()) < 0:
+            raise ValueError("Non-negative costs (arc lengths) required"
+                             " for Dijkstra's Algorithm for"
+                             " shortest path tree problem!  Use"
+                             " method 'bellman_ford' for negative costs.")
+        min_costs = {}
+        best_paths = {}
+        # Tentative costs of unsolved nodes, and a heap of
+        #  (cost, tie_breaker, node, parent) entries.  A node may be
+        #  pushed more than once - outdated entries are skipped when popped
+        tentative_costs = {source: 0}
+        tie_breaker = count()
+        heap = [(0, next(tie_breaker), source, None)]
+        while heap:
+            cost, _, node, parent = heapq.heappop(heap)
+            if node in min_costs:
+                continue
+            min_costs[node] = cost
+            best_paths[node] = (best_paths[parent] + (node,)
+                                if node != source else (node,))
+            for to_node in self.arcs.get(node, ()):
+                if to_node in min_costs:
+                    continue
+                new_cost = cost + self.costs[(node, to_node)]
+                if new_cost < tentative_costs.get(to_node, float("inf")):
+                    tentative_costs[to_node] = new_cost
+                    heapq.heappush(heap, (new_cost, next(tie_breaker),
+                                          to_node, node))
+        analysis = {"Costs": min_costs, "Paths": best_paths}
+        if self.cache_size:
+            self._path_cache[source] = analysis
+            if len(self._path_cache) > self.cache_size:
+                dropped, _ = self._path_cache.popitem(last=False)
+                self._path_trees.pop(dropped, None)
+        return analysis
+
+    def shortest_paths(self, sources, predecessors=False, processes=None,
+                       chunksize=None):
+        """
+        Solve the shortest path tree problem from each of many sources,
+        spread over a pool of worker processes.
+
+        Gives the same results as calling :py:obj:`shortest_path` for
+        each source.  The graph is sent to each worker once as the
+        arrays of :py:obj:`to_compact`, not as dicts of lists, and the
+        sources are then handed out `chunksize` at a time.  To share one
+        memory-mapped copy between the workers instead, save the graph
+        with :py:obj:`save` and use ``CompactGraph.load(path,
+        mmap_mode="r").shortest_paths(...)``.
+
+        Parameters
+        ----------
+        sources : iterable
+            Source nodes, e.g. every warehouse
+        predecessors : bool, optional
+            If True, return a :py:obj:`ShortestPathTree` for each source,
+            which builds paths only when they are asked for
+        processes : int, optional
+            Most worker processes to use.  Defaults to 1, solving every
+            tree in this process.  Fewer workers are started when there
+            are too few sources to share out, and scripts using more than
+            one must guard their code with
+            ``if __name__ == "__main__":``, as worker processes may import
+            the script again when they start.
+        chunksize : int, optional
+            Number of sources handed to a worker at a time.  Defaults to
+            about four chunks per worker.
+
+        Returns
+        -------
+        dictionary
+            Result of :py:obj:`shortest_path` for each source,
+            e.g. {"A": {"Costs": {...}, "Paths": {...}}, ...}
+
+        Raises
+        ------
+        ValueError
+            If the graph contains any negative costs, or a source does
+            not exist in the graph
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 7, "one"], ["B", "C", 3, "one"]])
+        >>> results = graph.shortest_paths(["A", "B"], processes=1)
+        >>> results["B"]["Costs"]
+        {'B': 0.0, 'C': 3.0}
+        """
+        return self.to_compact().shortest_paths(
+            sources, predecessors=predecessors, processes=processes,
+            chunksize=chunksize)
+
+    def shortest_path_to(self, source, target, method="dijkstra",
+                         heuristic=None, coordinates=None):
+        """
+        Solve the shortest path problem from `source` to `target` only.
+
+        The search stops as soon as the best path to `target` is known,
+        instead of solving the whole shortest path tree.  Solved over the
+        compact form of this graph - see
+        :py:obj:`CompactGraph.shortest_path_to` for details - or, with
+        method "hierarchy", over the index built (once) by
+        :py:obj:`contraction_hierarchy`.
+
+        Parameters
+        ----------
+        source
+            The source node
+        target
+            The destination node
+        method : str, optional
+            "dijkstra" (default), "bidirectional", "astar", or
+            "hierarchy"
+        heuristic : callable, optional
+            For method "astar", a function ``heuristic(node, target)``
+            giving a lower bound on the cost from `node` to `target`
+        coordinates : dict, optional
+            For method "astar" without a `heuristic`, the coordinates of
+            each node, used for a straight line distance heuristic
+
+        Returns
+        -------
+        dictionary
+            The minimum "Cost" and best "Path" from `source` to `target`
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 7, "one"], ["B", "C", 3, "one"],
+        ...                 ["A", "C", 12, "one"]])
+        >>> graph.shortest_path_to("A", "C", method="bidirectional")
+        {'Cost': 10.0, 'Path': ('A', 'B', 'C')}
+        """
+        if method == "hierarchy":
+            return self.contraction_hierarchy().shortest_path_to(source,
+                                                                 target)
+        return self.to_compact().shortest_path_to(
+            source, target, method=method, heuristic=heuristic,
+            coordinates=coordinates)
+
+    def k_shortest_paths(self, source, target, k):
+        """
+        Find the `k` best loopless paths from `source` to `target`, for
+        example to offer alternative routes.
+
+        Solved over the compact form of this graph - see
+        :py:obj:`CompactGraph.k_shortest_paths` for details.
+
+        Parameters
+        ----------
+        source
+            The source node
+        target
+            The destination node
+        k : int
+            Number of paths to find
+
+        Returns
+        -------
+        dictionary
+            The "Costs" and "Paths" of up to `k` paths, from best to worst
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 7, "one"], ["B", "C", 3, "one"],
+        ...                 ["A", "C", 12, "one"]])
+        >>> graph.k_shortest_paths("A", "C", 3)
+        {'Costs': [10.0, 12.0], 'Paths': [('A', 'B', 'C'), ('A', 'C')]}
+        """
+        return self.to_compact().k_shortest_paths(source, target, k)
+
+    def all_pairs_shortest_path(self, method="auto", predecessors=False,
+                                processes=None):
+        """
+        Solve the shortest path problem between every pair of nodes.
+
+        Solved over the compact form of this graph - see
+        :py:obj:`CompactGraph.all_pairs_shortest_path` for details.
+
+        Parameters
+        ----------
+        method : str, optional
+            "floyd_warshall", "dijkstra", or "auto" (default) to choose
+            by the size of the graph
+        predecessors : bool, optional
+            Whether to return the predecessor matrix as well
+        processes : int, optional
+            Number of worker processes for method "dijkstra"
+
+        Returns
+        -------
+        dictionary
+            "Nodes" (order of the matrix rows and columns), "Costs"
+            (n x n matrix of minimum costs), and optionally
+            "Predecessors" (n x n matrix of predecessor node ids)
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 7, "one"], ["B", "C", 3, "two"]])
+        >>> graph.all_pairs_shortest_path()["Costs"]
+        array([[ 0.,  7., 10.],
+               [inf,  0.,  3.],
+               [inf,  3.,  0.]])
+        """
+        return self.to_compact().all_pairs_shortest_path(
+            method=method, predecessors=predecessors, processes=processes)
+
+    def minimum_spanning_tree(self, method="kruskal"):
+        """
+        Find a minimum spanning tree, treating every arc as undirected.
+
+        A minimum spanning tree joins all of the nodes with the least
+        total arc cost.  If the graph is not connected, the result is a
+        minimum spanning forest, with one tree for each of the graph's
+        connected components.  Negative costs are allowed.
+
+        Parameters
+        ----------
+        method : str, optional
+            "kruskal" for Kruskal's Algorithm with a union-find structure
+            (the default), or "prim" for Prim's Algorithm with a
+            binary heap
+
+        Returns
+        -------
+        dictionary
+            "Cost" is the total cost of the tree, and "From", "To", and
+            "Costs" are arrays of the from node, to node, and cost of
+            each arc in the tree
+
+        Raises
+        ------
+        ValueError
+            If `method` is not recognized
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 7, "two"], ["B", "C", 3, "two"],
+        ...                 ["A", "C", 5, "two"]])
+        >>> tree = graph.minimum_spanning_tree()
+        >>> tree["Cost"], list(zip(tree["From"], tree["To"]))
+        (8.0, [('B', 'C'), ('A', 'C')])
+        """
+        return self.to_compact().minimum_spanning_tree(method)
+
+    def connected_components(self, strong=False):
+        """
+        Label the connected components of the graph.
+
+        By default arc directions are ignored, so two nodes are in the
+        same component if any chain of arcs joins them.  With `strong`,
+        two nodes are in the same component only if each can be reached
+        from the other.
+
+        Parameters
+        ----------
+        strong : bool, optional
+            Whether to find strongly connected components (with
+            Tarjan's Algorithm) instead of ignoring arc directions
+
+        Returns
+        -------
+        dictionary
+            "Nodes" is the array of node labels, "Components" the array
+            of each node's component number (0 to k - 1), and "Count"
+            the number of components k
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 1, "one"], ["C", "D", 1, "one"]])
+        >>> graph.connected_components()["Count"]
+        2
+        >>> graph.connected_components(strong=True)["Count"]
+        4
+        """
+        return self.to_compact().connected_components(strong)
+
+    def critical_path(self):
+        """
+        Schedule the activities of a project network with the critical
+        path method (CPM).
+
+        The graph is read as an activity-on-arc network: each arc is an
+        activity whose cost is its duration, and each node is an event
+        that happens once every activity into it is finished.  A
+        forward and a backward pass over the nodes in topological
+        order find each activity's earliest and latest start, in time
+        linear in the size of the network.  Activities with no slack
+        are critical - delaying any of them delays the whole project.
+
+        Returns
+        -------
+        dictionary
+            "Duration" of the project, arrays of the "From" and "To"
+            node, "Durations", "EarliestStart", "LatestStart", and
+            "Slack" of each activity, and the "CriticalPath" (tuple of
+            node labels).  Finish times are the start times plus the
+            durations.
+
+        Raises
+        ------
+        ValueError
+            If any cost is negative, or if the graph contains a cycle
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([[1, 2, 3, "one"], [1, 3, 2, "one"],
+        ...                 [2, 4, 4, "one"], [3, 4, 6, "one"],
+        ...                 [4, 5, 1, "one"]])
+        >>> schedule = graph.critical_path()
+        >>> schedule["Duration"], schedule["CriticalPath"]
+        (9.0, (1, 3, 4, 5))
+        """
+        return self.to_compact().critical_path()
+
+    def pert(self, estimates, num_samples=10000, deadline=None,
+             distribution="beta", seed=None):
+        """
+        Simulate the completion time of a project network with uncertain
+        activity durations (PERT).
+
+        The network is read as in :py:obj:`critical_path`.  Each
+        activity's duration is drawn from a distribution over its three
+        point estimate, and the project is scheduled for every sample.
+        The samples are scheduled in batches with array operations, so
+        networks of thousands of activities can be simulated many
+        thousands of times.
+
+        Parameters
+        ----------
+        estimates : dict
+            Three point (optimistic, most likely, pessimistic) duration
+            estimates of the activities, e.g. {(1, 2): (2, 3, 5)}.
+            Activities left out always take their cost.
+        num_samples : int, optional
+            Number of simulated projects, 10,000 by default
+        deadline : float, optional
+            Time to find the probability of finishing the project by
+        distribution : str, optional
+            "beta" (default) for the PERT beta distribution, with mean
+            (a + 4m + b) / 6, or "triangular"
+        seed : int, optional
+            Seed for the random numbers, for repeatable results
+
+        Returns
+        -------
+        dictionary
+            "Mean" and "StdDev" of the project's completion time, the
+            simulated "Durations", the "Probability" of finishing by
+            `deadline` (None without one), and arrays of the "From" and
+            "To" node and "Criticality" of each activity - the fraction
+            of simulated projects it was critical in
+
+        Raises
+        ------
+        ValueError
+            If the estimates are out of order or negative, if
+            `distribution` is not recognized, or if the graph contains
+            a cycle
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([[1, 2, 3, "one"], [1, 3, 2, "one"],
+        ...                 [2, 4, 4, "one"], [3, 4, 6, "one"],
+        ...                 [4, 5, 1, "one"]])
+        >>> results = graph.pert({(1, 2): (2, 3, 4), (3, 4): (5, 6, 7)},
+        ...                      deadline=10, seed=0)
+        >>> results["Probability"]
+        1.0
+        """
+        return self.to_compact().pert(
+            estimates, num_samples=num_samples, deadline=deadline,
+            distribution=distribution, seed=seed)
+
+    def max_flow(self, source, sink):
+        """
+        Solve the maximum flow and minimum cut problems with Dinic's
+        Algorithm.
+
+        Finds the most flow that can be sent from `source` to `sink`
+        without going over any arc's capacity, along with a minimum cut -
+        a set of arcs with the least total capacity that separates
+        `sink` from `source`.  Arcs without a capacity have no limit.
+        The residual graph is kept in NumPy arrays (see
+        :py:obj:`to_compact`), so no Pyomo model is built.
+
+        Parameters
+        ----------
+        source
+            Node the flow starts at
+        sink
+            Node the flow ends at
+
+        Returns
+        -------
+        dictionary
+            "Flow" is the maximum flow from `source` to `sink`, "Flows"
+            the flow on each arc that carries any, e.g.
+            {("A", "B"): 5.0, ...}, "Cut" the arcs of a minimum cut, and
+            "SourceSide" the set of nodes on the source side of the cut
+
+        Raises
+        ------
+        ValueError
+            If `source` or `sink` does not exist in the graph, they are
+            the same node, or they are connected by a path of arcs
+            without capacities
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs({"From": ["A", "A", "B", "C"],
+        ...                 "To": ["B", "C", "D", "D"],
+        ...                 "Cost": [1, 1, 1, 1],
+        ...                 "Direction": ["one", "one", "one", "one"],
+        ...                 "Capacity": [4, 2, 3, 5]})
+        >>> results = graph.max_flow("A", "D")
+        >>> results["Flow"], results["Cut"]
+        (5.0, [('A', 'C'), ('B', 'D')])
+        """
+        return self.to_compact().max_flow(source, sink)
+
+    def tsp(self, nodes=None, distances="shortest_paths",
+            construction="nearest", neighbors=10, time_limit=None,
+            processes=None):
+        """
+        Find a short tour through the nodes (traveling salesman
+        problem).
+
+        A tour is first built with the nearest neighbor or the
+        Clarke-Wright savings heuristic, then improved with 2-opt and
+        Or-opt moves until none shorten it (or `time_limit` runs out).
+        The moves only try to connect each node to its nearest
+        neighbors, which keeps them fast on thousands of nodes.  The
+        tour is usually within a few percent of the shortest, but is not
+        guaranteed to be the shortest.  2-opt moves are only used when
+        the distances are the same in both directions.
+
+        Parameters
+        ----------
+        nodes : list, optional
+            Nodes to visit, e.g. depots and customers, starting and
+            ending at the first one.  Every node by default.
+        distances : str, optional
+            "shortest_paths" (default) to travel between the nodes along
+            shortest paths through the graph, or "costs" to only use the
+            arcs between them
+        construction : str, optional
+            "nearest" (default) to start from the nearest neighbor tour,
+            or "savings" for the Clarke-Wright savings heuristic
+        neighbors : int, optional
+            Number of nearest neighbors the local search tries for each
+            node, 10 by default
+        time_limit : float, optional
+            Seconds the local search may run for, after which the best
+            tour found so far is returned
+        processes : int, optional
+            Number of worker processes for the shortest paths, as in
+            :py:obj:`shortest_paths`
+
+        Returns
+        -------
+        dictionary
+            "Cost" of the tour (``inf`` if it uses an arc that does not
+            exist), and the "Tour" (tuple of nodes in the order they are
+            visited, without returning to the first)
+
+        Raises
+        ------
+        ValueError
+            If a node does not exist in the graph, if `distances` or
+            `construction` is not recognized, or if `distances` is
+            "shortest_paths" and the graph contains negative costs
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 1, "two"], ["B", "C", 1, "two"],
+        ...                 ["C", "D", 1, "two"], ["D", "A", 1, "two"],
+        ...                 ["A", "C", 3, "two"], ["B", "D", 3, "two"]])
+        >>> graph.tsp(processes=1)
+        {'Cost': 4.0, 'Tour': ('A', 'B', 'C', 'D')}
+        """
+        return self.to_compact().tsp(
+            nodes=nodes, distances=distances, construction=construction,
+            neighbors=neighbors, time_limit=time_limit, processes=processes)
+
+    def assignment(self, sources, destinations):
+        """
+        Solve the assignment problem between two groups of nodes.
+
+        Each source node is assigned to a different destination node
+        over the arc between them, so that the total arc cost is as small
+        as possible.  This is the special case of the transportation
+        problem where every supply and demand is 1, and is solved with a
+        shortest augmenting path algorithm (see
+        :py:obj:`linear_assignment`) instead of a Pyomo model.
+
+        If the groups are different sizes, every node in the smaller
+        group is assigned.  Pairs without an arc cannot be assigned.
+
+        Parameters
+        ----------
+        sources : list
+            Nodes to assign from, e.g. ["W1", "W2"]
+        destinations : list
+            Nodes to assign to, e.g. ["J1", "J2", "J3"]
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the minimum total cost, and "Assignment" the
+            destination assigned to each source, e.g. {"W1": "J3", ...}
+
+        Raises
+        ------
+        ValueError
+            If a node does not exist in the graph, or the arcs between
+            the two groups leave no complete assignment
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["W1", "J1", 4, "one"], ["W1", "J2", 1, "one"],
+        ...                 ["W2", "J1", 2, "one"], ["W2", "J2", 3, "one"]])
+        >>> graph.assignment(["W1", "W2"], ["J1", "J2"])
+        {'OBJ': 3.0, 'Assignment': {'W1': 'J2', 'W2': 'J1'}}
+        """
+        return self.to_compact().assignment(list(sources),
+                                            list(destinations))
+
+    def transportation(self, supply, demand):
+        """
+        Return Concrete Model for Balanced Transportation Problem.
+
+        This calls :py:obj:`transportation_model()` for this Graph
+        object and the arguments of this method.  For more details
+        on the model, see the network module function's docstring.
+
+        Parameters
+        ----------
+        supply: dict
+            dict of source nodes and their supply capacities
+            e.g. {"A": 15, "B": 35}
+        demand: dict
+            dict of destination nodes and their demand requirements
+            e.g. {"C": 20, "D": 30}
+
+        Raises
+        ------
+        ValueError
+            A source or destination node given does not exist in
+            the graph object
+        """
+        # Data that needs to be used for concrete model
         for source in supply.keys():
             if source not in self.nodes:
                 raise ValueError(f"Source Node {source} does not " +
@@ -391,10 +1902,422 @@ class Graph():
             if dest not in self.nodes:
                 raise ValueError(f"Destination Node {dest} does not " +
                                  "exist in the Graph!")
+        # Only the arcs from a source to a destination are lanes
+        shipping_costs = self._lane_costs(supply, demand)
         transp_data = {None: {"Sources": supply.keys(),
                               "Destinations": demand.keys(),
+                              "Lanes": list(shipping_costs),
                               "Supply": supply,
                               "Demand": demand,
-                              "ShippingCosts": dict(self.costs)}}
+                              "ShippingCosts": shipping_costs}}
         instance = transportation_model(data=transp_data)
         return instance
+
+    def solve_transportation(self, supply, demand):
+        """
+        Solve the Balanced Transportation Problem without an external solver.
+
+        This calls :py:obj:`solve_transportation()` for this Graph
+        object, using the arcs from each source node to each
+        destination node as the shipping lanes.  Unlike
+        :py:meth:`transportation`, no Pyomo model is built.
+
+        Parameters
+        ----------
+        supply: dict
+            dict of source nodes and their supply capacities
+            e.g. {"A": 15, "B": 35}
+        demand: dict
+            dict of destination nodes and their demand requirements
+            e.g. {"C": 20, "D": 30}
+
+        Returns
+        -------
+        dictionary
+            "OBJ", "Flows", "SupplyConstraint", and "DemandConstraint",
+            as described in :py:obj:`solve_transportation()`
+
+        Raises
+        ------
+        ValueError
+            A source or destination node given does not exist in
+            the graph object, or the problem is infeasible
+        """
+        for source in supply.keys():
+            if source not in self.nodes:
+                raise ValueError(f"Source Node {source} does not " +
+                                 "exist in the Graph!")
+        for dest in demand.keys():
+            if dest not in self.nodes:
+                raise ValueError(f"Destination Node {dest} does not " +
+                                 "exist in the Graph!")
+        return solve_transportation(supply, demand,
+                                    self._lane_costs(supply, demand))
+
+    def transshipment(self, supply):
+        """
+        Return Concrete Model for the Minimum Cost Transshipment Problem.
+
+        This calls :py:obj:`transshipment_model()` with every node and
+        arc of this Graph object, along with their costs and
+        capacities.  For more details on the model, see the network
+        module function's docstring.
+
+        Parameters
+        ----------
+        supply : dict
+            Net supply of each node - positive for supply nodes and
+            negative for demand nodes, e.g. {"A": 15, "D": -15}.  Nodes
+            left out only pass flow along.
+
+        Raises
+        ------
+        ValueError
+            A node given does not exist in the graph object
+        """
+        for node in supply.keys():
+            if node not in self.nodes:
+                raise ValueError(f"Supply Node {node} does not " +
+                                 "exist in the Graph!")
+        transshipment_data = {None: {"Nodes": self._ordered_nodes(),
+                                     "Arcs": list(self.costs),
+                                     "Supply": supply,
+                                     "Costs": self.costs,
+                                     "Capacity": self.capacities}}
+        instance = transshipment_model(data=transshipment_data)
+        return instance
+
+    def solve_transshipment(self, supply):
+        """
+        Solve the Minimum Cost Transshipment Problem without an external
+        solver.
+
+        Solves the same problem as :py:meth:`transshipment` with the
+        network simplex method (see :py:obj:`network_simplex()`) over
+        the compact form of this graph, so no Pyomo model is built.
+        Arcs without a capacity have no limit.
+
+        Parameters
+        ----------
+        supply : dict
+            Net supply of each node - positive for supply nodes and
+            negative for demand nodes, e.g. {"A": 15, "D": -15}.  Nodes
+            left out only pass flow along.
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the minimum total shipping cost, "Flows" the flow
+            on each arc that carries any, e.g. {("A", "B"): 15.0, ...},
+            and "FlowBalanceConstraint" the dual value of each node's
+            constraint (shifted so the first node of `supply` has zero)
+
+        Raises
+        ------
+        ValueError
+            A node given does not exist in the graph object, total
+            supply does not equal total demand, or the problem is
+            infeasible or unbounded
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs({"From": ["A", "B", "A", "C"],
+        ...                 "To": ["B", "D", "C", "D"],
+        ...                 "Cost": [1, 1, 2, 2],
+        ...                 "Direction": ["one", "one", "one", "one"],
+        ...                 "Capacity": [10, 20, 20, 20]})
+        >>> results = graph.solve_transshipment({"A": 15, "D": -15})
+        >>> results["OBJ"], results["Flows"][("A", "C")]
+        (40.0, 5.0)
+        """
+        return self.to_compact().solve_transshipment(supply)
+
+    def multicommodity_flow(self, commodities):
+        """
+        Return Concrete Model for the Minimum Cost Multi-Commodity Flow
+        Problem.
+
+        This calls :py:obj:`multicommodity_flow_model()` with every node
+        and arc of this Graph object, along with their costs and
+        capacities.  For more details on the model, see the network
+        module function's docstring.
+
+        Parameters
+        ----------
+        commodities : dict
+            Net supply of each commodity at each node, e.g.
+            {"Bikes": {"A": 10, "D": -10}, "Parts": {"B": 5, "D": -5}}
+
+        Raises
+        ------
+        ValueError
+            A node given does not exist in the graph object
+        """
+        supply = {}
+        for commodity, commodity_supply in commodities.items():
+            for node, amount in commodity_supply.items():
+                if node not in self.nodes:
+                    raise ValueError(f"Supply Node {node} does not " +
+                                     "exist in the Graph!")
+                supply[(commodity, node)] = amount
+        commodity_data = {None: {"Commodities": list(commodities),
+                                 "Nodes": self._ordered_nodes(),
+                                 "Arcs": list(self.costs),
+                                 "Supply": supply,
+                                 "Costs": self.costs,
+                                 "Capacity": self.capacities}}
+        instance = multicommodity_flow_model(data=commodity_data)
+        return instance
+
+    def solve_multicommodity_flow(self, commodities, iterations=1000,
+                                  tolerance=1e-3):
+        """
+        Solve the Minimum Cost Multi-Commodity Flow Problem by
+        decomposing it into shortest path problems.
+
+        Solves the same problem as :py:meth:`multicommodity_flow`
+        without building the model, whose size grows with commodities
+        times arcs.  The shared arc capacities are relaxed with prices
+        (Lagrangian relaxation), which leaves a shortest path problem
+        for each commodity: every iteration solves Dijkstra's Algorithm
+        once from each supply node over the compact form of this graph,
+        then raises the prices of arcs over capacity and lowers the rest.
+        See :py:obj:`solve_multicommodity_flow()` for the details.
+
+        The flows returned are averaged over the iterations, so they are
+        close to optimal rather than exactly optimal.  "LowerBound"
+        bounds how far from optimal they can be, and "Violation" shows
+        how far over capacity they still are.
+
+        Parameters
+        ----------
+        commodities : dict
+            Net supply of each commodity at each node, e.g.
+            {"Bikes": {"A": 10, "C": -4, "D": -6}, ...}.  Each commodity
+            must have a single supply node, and any number of demand
+            nodes.
+        iterations : int, optional
+            Most iterations to run
+        tolerance : float, optional
+            Stop once the cost is this close to the lower bound, as a
+            fraction of it, and no capacity is exceeded by more than this
+            fraction of the largest demand
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the total shipping cost, "LowerBound" a lower bound
+            on the optimal cost, "Flows" the flow of each commodity on
+            each arc that carries any, e.g.
+            {"Bikes": {("A", "B"): 10.0, ...}, ...}, "Paths" the flow of
+            each commodity sent down each path, keyed by the tuple of
+            nodes on the path, and "Violation" the most any arc's total
+            flow is over its capacity
+
+        Raises
+        ------
+        ValueError
+            A node given does not exist in the graph object, a commodity
+            does not have exactly one supply node or its supply and
+            demand do not balance, an arc cost is negative, or a demand
+            node cannot be reached from its commodity's supply node
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs({"From": ["A", "B", "A", "C"],
+        ...                 "To": ["B", "D", "C", "D"],
+        ...                 "Cost": [1, 1, 2, 2],
+        ...                 "Direction": ["one", "one", "one", "one"],
+        ...                 "Capacity": [10, 20, 20, 20]})
+        >>> results = graph.solve_multicommodity_flow(
+        ...     {"X": {"A": 8, "D": -8}, "Y": {"A": 6, "D": -6}})
+        >>> round(results["OBJ"]), round(results["LowerBound"])
+        (36, 36)
+        """
+        return self.to_compact().solve_multicommodity_flow(
+            commodities, iterations, tolerance)
+
+    def distance_matrix(self, sources, destinations=None, processes=None):
+        """
+        Shortest path costs from each of `sources` to each of
+        `destinations`.
+
+        Solves Dijkstra's Algorithm once from each source over the
+        compact form of this graph, spread over a pool of processes as
+        in :py:obj:`shortest_paths`, and keeps only the destination
+        columns.  The matrix can be passed into
+        :py:obj:`facility_location` and :py:obj:`solve_p_median` to
+        reuse it.
+
+        Parameters
+        ----------
+        sources : list
+            Nodes the paths start at (the rows)
+        destinations : list, optional
+            Nodes the paths end at (the columns).  Every node by default.
+        processes : int, optional
+            Number of worker processes
+
+        Returns
+        -------
+        pandas.DataFrame
+            Minimum cost from each source to each destination, ``inf``
+            where a destination cannot be reached
+
+        Raises
+        ------
+        ValueError
+            If the graph contains any negative costs, or if a node does
+            not exist in the graph
+        """
+        return self.to_compact().distance_matrix(
+            sources, destinations=destinations, processes=processes)
+
+    def facility_location(self, candidates, customers, num_facilities=None,
+                          demand=None, capacities=None, fixed_costs=None,
+                          distances=None, processes=None):
+        """
+        Return Concrete Model for the Facility Location Problem.
+
+        This calls :py:obj:`facility_location_model()` with the shortest
+        path costs from each candidate to each customer as the
+        distances.  Pairs where the customer cannot be reached are left
+        out of the model.  For more details on the model, see the
+        network module function's docstring.
+
+        Parameters
+        ----------
+        candidates : list
+            Nodes facilities can be opened at
+        customers : list
+            Nodes to serve
+        num_facilities : int, optional
+            Number of facilities to open (p-median), or any number if
+            not given
+        demand : dict, optional
+            Demand of each customer, e.g. {"C": 20, "D": 30}.  1 for
+            customers left out.
+        capacities : dict, optional
+            Demand each candidate can serve, with no limit for
+            candidates left out
+        fixed_costs : dict, optional
+            Cost of opening each candidate, 0 for candidates left out
+        distances : pandas.DataFrame, optional
+            Distance matrix from :py:obj:`distance_matrix`, to skip
+            finding the shortest paths again
+        processes : int, optional
+            Number of worker processes for the shortest paths
+
+        Raises
+        ------
+        ValueError
+            A candidate or customer node given does not exist in the
+            graph object
+        """
+        candidates = list(dict.fromkeys(candidates))
+        customers = list(dict.fromkeys(customers))
+        if distances is None:
+            distances = self.distance_matrix(candidates, customers,
+                                             processes=processes)
+        matrix = distances.loc[candidates, customers].to_numpy(dtype=float)
+        rows, columns = np.nonzero(np.isfinite(matrix))
+        pair_distances = {(candidates[row], customers[column]): cost
+                          for row, column, cost in zip(
+                              rows.tolist(), columns.tolist(),
+                              matrix[rows, columns].tolist())}
+        location_data = {None: {"Facilities": candidates,
+                                "Customers": customers,
+                                "Pairs": list(pair_distances),
+                                "Distances": pair_distances,
+                                "Demand": demand or {},
+                                "Capacity": capacities or {},
+                                "FixedCosts": fixed_costs or {},
+                                "NumFacilities": {None: num_facilities}}}
+        return facility_location_model(data=location_data)
+
+    def solve_p_median(self, candidates, customers, num_facilities,
+                       demand=None, distances=None, time_limit=None,
+                       processes=None):
+        """
+        Choose facilities that minimize the demand weighted distance
+        from each customer to its closest one, without an external
+        solver.
+
+        Facilities are added greedily, then swapped for other candidates
+        while that lowers the cost - see
+        :py:obj:`ormm.network.facilities.solve_p_median` for details.
+        This handles thousands of candidates, but unlike
+        :py:meth:`facility_location`, the solution is not guaranteed to
+        be optimal.
+
+        Parameters
+        ----------
+        candidates : list
+            Nodes facilities can be opened at
+        customers : list
+            Nodes to serve
+        num_facilities : int
+            Number of facilities to open
+        demand : dict, optional
+            Demand of each customer, 1 for customers left out
+        distances : pandas.DataFrame, optional
+            Distance matrix from :py:obj:`distance_matrix`, to skip
+            finding the shortest paths again
+        time_limit : float, optional
+            Seconds the swaps may run for, after which the best solution
+            found so far is returned
+        processes : int, optional
+            Number of worker processes for the shortest paths
+
+        Returns
+        -------
+        dictionary
+            "OBJ" is the total demand weighted distance (``inf`` if a
+            customer cannot be reached from any open facility),
+            "Facilities" the tuple of open facilities, and "Assignment"
+            a dict of the facility serving each customer
+
+        Raises
+        ------
+        ValueError
+            If a node does not exist in the graph, or if
+            `num_facilities` is not between 1 and the number of
+            candidates
+
+        Examples
+        --------
+        >>> graph = Graph()
+        >>> graph.add_arcs([["A", "B", 1, "two"], ["B", "C", 4, "two"],
+        ...                 ["C", "D", 1, "two"]])
+        >>> nodes = ["A", "B", "C", "D"]
+        >>> results = graph.solve_p_median(nodes, nodes, 2,
+        ...                                demand={"A": 2, "D": 2},
+        ...                                processes=1)
+        >>> results["OBJ"], sorted(results["Facilities"])
+        (2.0, ['A', 'D'])
+        """
+        return self.to_compact().solve_p_median(
+            candidates, customers, num_facilities, demand=demand,
+            distances=distances, time_limit=time_limit, processes=processes)
+
+    def _ordered_nodes(self):
+        """
+        Nodes in order of first appearance in the arcs, then the nodes
+        without arcs sorted, so models are built the same way every time
+        """
+        ordered = dict.fromkeys(node for arc in self.costs for node in arc)
+        extra = [node for node in self.nodes if node not in ordered]
+        try:
+            extra.sort()
+        except TypeError:
+            extra.sort(key=repr)
+        return list(ordered) + extra
+
+    def _lane_costs(self, supply, demand):
+        """Costs of the arcs from a supply node to a demand node"""
+        return {(source, dest): self.costs[(source, dest)]
+                for source in supply
+                for dest in self.arcs.get(source, [])
+                if dest in demand}
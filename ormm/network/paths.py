@@ -0,0 +1,920 @@
+"""
+Shortest path kernels that run over CSR (compressed sparse row) arrays.
+
+Nodes are integer ids 0 through n - 1.  The outgoing arcs of node `i` are
+``targets[offsets[i]:offsets[i + 1]]`` with the matching
+``costs[offsets[i]:offsets[i + 1]]``.  See :py:obj:`CompactGraph` for
+building these arrays from a :py:obj:`Graph` or from bulk arc data.
+"""
+
+from itertools import count
+import heapq
+import mmap
+import multiprocessing
+import sys
+
+import numpy as np
+
+# CSR arrays of the graph being solved, set once in each worker process
+_worker_arrays = None
+# Nodes plus arcs searched per worker process started by dijkstra_many
+_WORK_PER_PROCESS = 1_000_000
+# Number of paths built together by ShortestPathTree.paths
+_PATH_BATCH_SIZE = 4096
+
+
+def dijkstra(offsets, targets, costs, source):
+    """
+    Solve the shortest path tree problem from `source` over CSR arrays.
+
+    Uses a binary heap with lazy deletion, so the solve takes
+    :math:`O((V + E) \\log V)` time.  Costs must be nonnegative.
+
+    Parameters
+    ----------
+    offsets : numpy.ndarray
+        Array of length n + 1 with the start of each node's arcs
+    targets : numpy.ndarray
+        Array of length m with the to node id of each arc
+    costs : numpy.ndarray
+        Array of length m with the cost of each arc
+    source : int
+        Node id to solve the shortest path tree from
+
+    Returns
+    -------
+    dist : numpy.ndarray
+        Minimum cost to reach each node, ``inf`` if unreachable
+    pred : numpy.ndarray
+        Node id before each node on its best path, -1 for the source
+        and for unreachable nodes
+    """
+    num_nodes = len(offsets) - 1
+    offsets = offsets.tolist() if isinstance(offsets, np.ndarray) else offsets
+    dist = [np.inf] * num_nodes
+    pred = [-1] * num_nodes
+    solved = [False] * num_nodes
+    dist[source] = 0
+    tie_breaker = count()
+    heap = [(0, next(tie_breaker), source)]
+    while heap:
+        cost, _, node = heapq.heappop(heap)
+        if solved[node]:
+            continue
+        solved[node] = True
+        start, end = offsets[node], offsets[node + 1]
+        for to_node, arc_cost in zip(targets[start:end].tolist(),
+                                     costs[start:end].tolist()):
+            new_cost = cost + arc_cost
+            if new_cost < dist[to_node]:
+                dist[to_node] = new_cost
+                pred[to_node] = node
+                heapq.heappush(heap, (new_cost, next(tie_breaker), to_node))
+    return np.array(dist, dtype=float), np.array(pred, dtype=np.int64)
+
+
+class NegativeCycleError(ValueError):
+    """
+    Raised when the shortest path problem has no solution because the
+    graph contains a cycle of negative total cost.
+
+    Parameters
+    ----------
+    message : str
+        Error message
+    cycle : list, optional
+        Nodes around the negative cycle, if it was found
+    """
+    def __init__(self, message, cycle=None):
+        super().__init__(message)
+        self.cycle = cycle
+
+
+def _predecessor_cycle(pred):
+    """List of node ids around a cycle of `pred` pointers, or None"""
+    pred = pred.tolist()
+    visited_by = [-1] * len(pred)
+    for start in range(len(pred)):
+        node = start
+        while node != -1 and visited_by[node] == -1:
+            visited_by[node] = start
+            node = pred[node]
+        if node != -1 and visited_by[node] == start:
+            # Walked into this walk's own trail, so node is on a cycle
+            cycle = [node]
+            while pred[cycle[-1]] != node:
+                cycle.append(pred[cycle[-1]])
+            return cycle[::-1]
+    return None
+
+
+def bellman_ford(offsets, targets, costs, source):
+    """
+    Solve the shortest path tree problem from `source` with a label
+    correcting algorithm, which allows negative costs.
+
+    Works in Bellman-Ford rounds over the arc arrays: each round relaxes,
+    all at once, the arcs out of every node whose cost changed in the
+    previous round (the queue of the SPFA algorithm, handled in batches).
+    Without negative cycles, no costs change after n - 1 rounds.
+
+    Parameters
+    ----------
+    offsets, targets, costs : numpy.ndarray
+        CSR arrays of the graph, as in :py:obj:`dijkstra`
+    source : int
+        Node id to solve the shortest path tree from
+
+    Returns
+    -------
+    dist : numpy.ndarray
+        Minimum cost to reach each node, ``inf`` if unreachable
+    pred : numpy.ndarray
+        Node id before each node on its best path, -1 for the source
+        and for unreachable nodes
+
+    Raises
+    ------
+    NegativeCycleError
+        If a negative cycle can be reached from `source`.  Its `cycle`
+        attribute lists the node ids around the cycle.
+    """
+    num_nodes = len(offsets) - 1
+    sources = np.repeat(np.arange(num_nodes), np.diff(offsets))
+    dist = np.full(num_nodes, np.inf)
+    dist[source] = 0
+    pred = np.full(num_nodes, -1, dtype=np.int64)
+    changed = np.zeros(num_nodes, dtype=bool)
+    changed[source] = True
+    # Costs still changing in round n means there is a negative cycle;
+    #  keep going until it also shows up as a cycle of predecessors
+    for round_num in range(1, 2 * num_nodes + 1):
+        arcs = np.flatnonzero(changed[sources])
+        candidates = dist[sources[arcs]] + costs[arcs]
+        to_nodes = targets[arcs]
+        better = candidates < dist[to_nodes]
+        if not better.any():
+            return dist, pred
+        arcs, candidates = arcs[better], candidates[better]
+        to_nodes = to_nodes[better]
+        np.minimum.at(dist, to_nodes, candidates)
+        best = candidates == dist[to_nodes]
+        pred[to_nodes[best]] = sources[arcs[best]]
+        changed[:] = False
+        changed[to_nodes] = True
+        if round_num >= num_nodes:
+            cycle = _predecessor_cycle(pred)
+            if cycle is not None:
+                raise NegativeCycleError("Graph contains a negative cycle!",
+                                         cycle)
+    raise NegativeCycleError("Graph contains a negative cycle!")
+
+
+def floyd_warshall(sources, targets, costs, num_nodes):
+    """
+    Solve the all-pairs shortest path problem with the Floyd-Warshall
+    algorithm, vectorized over whole rows of the distance matrix.
+
+    Takes :math:`O(V^3)` time and :math:`O(V^2)` memory, so it is best
+    suited to small or dense graphs.  Negative costs are allowed as long
+    as there are no negative cycles.
+
+    Parameters
+    ----------
+    sources : numpy.ndarray
+        Array of length m with the from node id of each arc
+    targets : numpy.ndarray
+        Array of length m with the to node id of each arc
+    costs : numpy.ndarray
+        Array of length m with the cost of each arc
+    num_nodes : int
+        Number of nodes in the graph
+
+    Returns
+    -------
+    dist : numpy.ndarray
+        n x n matrix of minimum costs, ``inf`` where unreachable
+    pred : numpy.ndarray
+        n x n matrix with the node id before node j on the best path
+        from node i, -1 on the diagonal and where unreachable
+
+    Raises
+    ------
+    NegativeCycleError
+        If the graph contains a negative cycle
+    """
+    dist = np.full((num_nodes, num_nodes), np.inf)
+    np.minimum.at(dist, (sources, targets), costs)
+    np.fill_diagonal(dist, np.minimum(dist.diagonal(), 0))
+    pred = np.full((num_nodes, num_nodes), -1, dtype=np.int64)
+    pred[sources, targets] = sources
+    np.fill_diagonal(pred, -1)
+    for k in range(num_nodes):
+        through_k = dist[:, k, None] + dist[None, k, :]
+        better = through_k < dist
+        dist = np.where(better, through_k, dist)
+        pred = np.where(better, pred[None, k, :], pred)
+    on_cycle = np.flatnonzero(dist.diagonal() < 0)
+    if len(on_cycle):
+        raise NegativeCycleError("Graph contains a negative cycle!",
+                                 _predecessor_cycle(pred[on_cycle[0]]))
+    return dist, pred
+
+
+def _shareable(array):
+    """
+    Describe a memory-mapped array by its file, so worker processes map
+    the same file instead of each receiving a pickled copy
+    """
+    if isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap):
+        return ("memmap", array.filename, array.dtype.str, array.shape,
+                array.offset)
+    return array
+
+
+def _mapped(array):
+    """Open an array described by :py:obj:`_shareable`"""
+    if isinstance(array, tuple):
+        _, filename, dtype, shape, offset = array
+        return np.memmap(filename, dtype=dtype, mode="r", shape=shape,
+                         offset=offset)
+    return array
+
+
+def _pool_context():
+    """
+    Return the multiprocessing context to start worker processes with.
+
+    This is the platform default, except that processes are not forked
+    once numba (used by quantecon, which :py:mod:`ormm.markov` imports)
+    has been loaded, as its thread pools can deadlock a forked process.
+    """
+    context = multiprocessing.get_context()
+    if "numba" in sys.modules and context.get_start_method() == "fork":
+        context = multiprocessing.get_context("spawn")
+    return context
+
+
+def _init_worker(offsets, targets, costs):
+    """Store the graph arrays once per worker process"""
+    global _worker_arrays
+    _worker_arrays = (_mapped(offsets), _mapped(targets), _mapped(costs))
+
+
+def _dijkstra_sources(sources):
+    """Solve the shortest path trees of a chunk of sources in a worker"""
+    return [dijkstra(*_worker_arrays, source) for source in sources]
+
+
+def dijkstra_many(offsets, targets, costs, sources, processes=None,
+                  chunksize=None):
+    """
+    Solve the shortest path tree problem from many sources with
+    :py:obj:`dijkstra`, optionally spread over a pool of worker
+    processes.
+
+    With more than one process, the graph arrays are sent to each worker
+    once when it starts, and the sources are then handed out in chunks.
+    Arrays memory-mapped from files (e.g. by
+    ``CompactGraph.load(path, mmap_mode="r")``) are not copied at all -
+    each worker maps the same files, so the operating system keeps one
+    shared copy of the graph in memory.  Starting workers takes a while,
+    so fewer are started when there are too few searches to share out.
+
+    Parameters
+    ----------
+    offsets, targets, costs : numpy.ndarray
+        CSR arrays of the graph, as in :py:obj:`dijkstra`
+    sources : array-like of int
+        Node ids to solve the shortest path trees from
+    processes : int, optional
+        Most worker processes to use.  Defaults to 1, solving every tree
+        in this process.
+    chunksize : int, optional
+        Number of sources handed to a worker at a time.  Defaults to
+        splitting the sources into about four chunks per worker.
+
+    Returns
+    -------
+    dist : numpy.ndarray
+        len(sources) x n matrix of minimum costs
+    pred : numpy.ndarray
+        len(sources) x n matrix of predecessor node ids
+
+    Notes
+    -----
+    Where workers are started by spawning a new interpreter (on Windows,
+    on macOS by default, and once numba has been loaded), each worker
+    imports the script that asked for them, so scripts using more than
+    one process must guard their code with ``if __name__ == "__main__":``.
+    """
+    sources = list(sources)
+    # Enough searching to be worth starting each worker for
+    work = len(sources) * (len(offsets) + len(targets))
+    processes = max(1, min(processes or 1, len(sources),
+                           work // _WORK_PER_PROCESS))
+    if chunksize is None:
+        chunksize = max(1, -(-len(sources) // (4 * processes)))
+    chunks = [sources[start:start + chunksize]
+              for start in range(0, len(sources), chunksize)]
+    if processes == 1:
+        results = [dijkstra(offsets, targets, costs, source)
+                   for source in sources]
+    else:
+        with _pool_context().Pool(
+                processes, initializer=_init_worker,
+                initargs=(_shareable(offsets), _shareable(targets),
+                          _shareable(costs))) as pool:
+            results = [result for chunk_results in
+                       pool.map(_dijkstra_sources, chunks)
+                       for result in chunk_results]
+    num_nodes = len(offsets) - 1
+    if not results:
+        return (np.empty((0, num_nodes)),
+                np.empty((0, num_nodes), dtype=np.int64))
+    dist, pred = zip(*results)
+    return np.vstack(dist), np.vstack(pred)
+
+
+def _path_to(pred, source, target):
+    """List of node ids from `source` to `target` following `pred`"""
+    path = [target]
+    while path[-1] != source:
+        path.append(pred[path[-1]])
+    return path[::-1]
+
+
+def point_to_point(offsets, targets, costs, source, target, heuristic=None):
+    """
+    Solve the shortest path problem from `source` to `target`, stopping
+    as soon as `target` is solved.
+
+    Without a heuristic, this is Dijkstra's Algorithm.  With one, it is
+    the A* algorithm, which solves nodes in order of their cost plus
+    their estimated remaining cost to `target`.  The heuristic must
+    never overestimate the remaining cost, and must be consistent
+    (``heuristic(i) <= c(i, j) + heuristic(j)`` for every arc), for
+    the path found to be optimal.
+
+    Parameters
+    ----------
+    offsets, targets, costs : numpy.ndarray
+        CSR arrays of the graph, as in :py:obj:`dijkstra`
+    source : int
+        Node id to start from
+    target : int
+        Node id to find the best path to
+    heuristic : callable, optional
+        Function of a node id returning a lower bound on its remaining
+        cost to `target`
+
+    Returns
+    -------
+    cost : float
+        Minimum cost from `source` to `target`, ``inf`` if unreachable
+    path : list of int or None
+        Node ids on the best path, None if unreachable
+    """
+    dist = {source: 0}
+    pred = {}
+    solved = set()
+    tie_breaker = count()
+    start_estimate = heuristic(source) if heuristic is not None else 0
+    heap = [(start_estimate, next(tie_breaker), source)]
+    while heap:
+        _, _, node = heapq.heappop(heap)
+        if node in solved:
+            continue
+        if node == target:
+            return dist[node], _path_to(pred, source, target)
+        solved.add(node)
+        cost = dist[node]
+        start, end = offsets[node], offsets[node + 1]
+        for to_node, arc_cost in zip(targets[start:end].tolist(),
+                                     costs[start:end].tolist()):
+            new_cost = cost + arc_cost
+            if new_cost < dist.get(to_node, np.inf):
+                dist[to_node] = new_cost
+                pred[to_node] = node
+                estimate = (new_cost + heuristic(to_node)
+                            if heuristic is not None else new_cost)
+                heapq.heappush(heap, (estimate, next(tie_breaker), to_node))
+    return np.inf, None
+
+
+def bidirectional_dijkstra(forward, backward, source, target):
+    """
+    Solve the shortest path problem from `source` to `target` with
+    Dijkstra's Algorithm run from both ends at once.
+
+    The search alternates between growing a tree out of `source` and a
+    tree into `target`, and stops once the two smallest costs left in
+    the queues add up to no less than the best connection found so far.
+    Each tree usually covers a much smaller area than a one-way search.
+
+    Parameters
+    ----------
+    forward : tuple of numpy.ndarray
+        CSR (offsets, targets, costs) arrays of the graph
+    backward : tuple of numpy.ndarray
+        CSR (offsets, targets, costs) arrays of the graph with every arc
+        reversed
+    source : int
+        Node id to start from
+    target : int
+        Node id to find the best path to
+
+    Returns
+    -------
+    cost : float
+        Minimum cost from `source` to `target`, ``inf`` if unreachable
+    path : list of int or None
+        Node ids on the best path, None if unreachable
+    """
+    if source == target:
+        return 0, [source]
+    arrays = [forward, backward]
+    dists = [{source: 0}, {target: 0}]
+    preds = [{}, {}]
+    solved = [set(), set()]
+    tie_breaker = count()
+    heaps = [[(0, next(tie_breaker), source)],
+             [(0, next(tie_breaker), target)]]
+    best_cost, meeting_node = np.inf, None
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best_cost:
+            break
+        # Grow the side with the smaller queue
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        cost, _, node = heapq.heappop(heaps[side])
+        if node in solved[side]:
+            continue
+        solved[side].add(node)
+        offsets, targets, costs = arrays[side]
+        start, end = offsets[node], offsets[node + 1]
+        dist, other_dist = dists[side], dists[1 - side]
+        for to_node, arc_cost in zip(targets[start:end].tolist(),
+                                     costs[start:end].tolist()):
+            new_cost = cost + arc_cost
+            if new_cost < dist.get(to_node, np.inf):
+                dist[to_node] = new_cost
+                preds[side][to_node] = node
+                heapq.heappush(heaps[side],
+                               (new_cost, next(tie_breaker), to_node))
+            if to_node in other_dist:
+                total = dist[to_node] + other_dist[to_node]
+                if total < best_cost:
+                    best_cost, meeting_node = total, to_node
+    if meeting_node is None:
+        return np.inf, None
+    path = _path_to(preds[0], source, meeting_node)
+    # Backward predecessors point from each node towards target
+    node = meeting_node
+    while node != target:
+        node = preds[1][node]
+        path.append(node)
+    return best_cost, path
+
+
+def _spur_path(forward, to_target, next_node, path, positions, position,
+               tree_start, excluded_next):
+    """
+    Best path from the spur node ``path[position]`` to the target of
+    `to_target` that avoids the root path ``path[:position]`` and does
+    not leave the spur node for any of `excluded_next`.
+
+    Runs A* with the exact costs to the target in the full graph as the
+    heuristic, so the search heads straight along the best path.  It
+    stops at the first solved node whose best path in the full graph
+    avoids the root path, since the rest of the path follows that.
+    Nodes after both the spur node and `tree_start` on `path` are known
+    to have such a best path.
+
+    Returns the spur path and its cost, or (None, ``inf``).
+    """
+    offsets, targets, costs = forward
+    spur = path[position]
+    clear_from = max(position + 1, tree_start)
+    # Whether each node's best path in the full graph avoids the root
+    clear = {}
+
+    def is_clear(node):
+        walked = []
+        while node not in clear:
+            node_position = positions.get(node, -1)
+            if node_position >= clear_from or next_node[node] == -1:
+                result = True
+                break
+            if node_position != -1 and node_position <= position:
+                result = False
+                break
+            walked.append(node)
+            node = next_node[node]
+        else:
+            result = clear[node]
+        clear.update((walked_node, result) for walked_node in walked)
+        clear[node] = result
+        return result
+
+    dist = {spur: 0}
+    pred = {}
+    solved = set()
+    tie_breaker = count()
+    # Ties go to the node farthest along, which is usually on a best path
+    heap = [(to_target[spur], 0, next(tie_breaker), spur)]
+    while heap:
+        estimate, _, _, node = heapq.heappop(heap)
+        if node in solved:
+            continue
+        solved.add(node)
+        if node == spur:
+            follow = next_node[spur] not in excluded_next and \
+                is_clear(next_node[spur])
+        else:
+            follow = is_clear(node)
+        if follow:
+            spur_path = _path_to(pred, spur, node)
+            while next_node[spur_path[-1]] != -1:
+                spur_path.append(next_node[spur_path[-1]])
+            return spur_path, estimate
+        cost = dist[node]
+        start, end = offsets[node], offsets[node + 1]
+        for to_node, arc_cost in zip(targets[start:end].tolist(),
+                                     costs[start:end].tolist()):
+            if -1 < positions.get(to_node, -1) <= position or \
+                    to_target[to_node] == np.inf or \
+                    (node == spur and to_node in excluded_next):
+                continue
+            new_cost = cost + arc_cost
+            if new_cost < dist.get(to_node, np.inf):
+                dist[to_node] = new_cost
+                pred[to_node] = node
+                heapq.heappush(heap, (new_cost + to_target[to_node],
+                                      -new_cost, next(tie_breaker), to_node))
+    return None, np.inf
+
+
+def k_shortest_paths(forward, backward, source, target, k):
+    """
+    Find the `k` best loopless paths from `source` to `target` with
+    Yen's Algorithm.
+
+    Every node on the last path found (the spur node) is tried as the
+    place a new path leaves it, keeping the part before it (the root
+    path) and avoiding the next arc of every path found so far that
+    shares that root.  A few changes keep each round fast:
+
+    * One Dijkstra solve on the reversed graph gives the exact cost from
+      every node to `target`.  It guides each spur search as an A*
+      heuristic, and its tree finishes the search as soon as it reaches
+      a node whose best path avoids the root path.
+    * A path only spurs from the node where it left the path it came
+      from (Lawler's change), since the spurs before that node were
+      already searched from that path.
+    * The paths found are kept in a prefix tree, so the arcs to avoid
+      out of each spur node are looked up instead of comparing the root
+      path against every path found so far, and the cost to each node
+      along a path is kept to price its root paths.
+
+    Parameters
+    ----------
+    forward : tuple of numpy.ndarray
+        CSR (offsets, targets, costs) arrays of the graph.  Costs must
+        be nonnegative.
+    backward : tuple of numpy.ndarray
+        CSR (offsets, targets, costs) arrays of the graph with every arc
+        reversed
+    source : int
+        Node id to start from
+    target : int
+        Node id to find the paths to
+    k : int
+        Number of paths to find
+
+    Returns
+    -------
+    list of tuple
+        Up to `k` pairs of (cost, list of node ids), from best to worst.
+        Fewer are returned if there are fewer loopless paths.
+    """
+    offsets, targets, costs = forward
+    to_target, next_node = dijkstra(*backward, target)
+    if k < 1 or to_target[source] == np.inf:
+        return []
+    to_target, next_node = to_target.tolist(), next_node.tolist()
+
+    def add_path(path, deviation, totals):
+        """Add a path, pricing its arcs from `deviation` onwards"""
+        total = totals[-1]
+        for from_node, to_node in zip(path[deviation:-1],
+                                      path[deviation + 1:]):
+            start, end = offsets[from_node], offsets[from_node + 1]
+            total += float(costs[start:end][
+                targets[start:end] == to_node].min())
+            totals.append(total)
+        found.append((path, totals, deviation))
+        subtree = tree
+        for node in path[1:]:
+            subtree = subtree.setdefault(node, {})
+
+    # Paths found, as (path, cost to each node on it, position it left
+    #  the path it came from)
+    found = []
+    # Prefix tree of the paths found, as nested {next node: subtree}
+    #  dicts after `source`
+    tree = {}
+    path = [source]
+    while path[-1] != target:
+        path.append(next_node[path[-1]])
+    add_path(path, 0, [0.0])
+    candidates = []
+    seen = {tuple(path)}
+    tie_breaker = count()
+    while len(found) < k:
+        path, totals, deviation = found[-1]
+        positions = {node: position for position, node in enumerate(path)}
+        # Rest of the path from here on follows the best paths to target
+        tree_start = len(path) - 1
+        while tree_start > deviation and \
+                next_node[path[tree_start - 1]] == path[tree_start]:
+            tree_start -= 1
+        subtree = tree
+        for node in path[1:deviation + 1]:
+            subtree = subtree[node]
+        for position in range(deviation, len(path) - 1):
+            spur_path, spur_cost = _spur_path(
+                forward, to_target, next_node, path, positions, position,
+                tree_start, subtree)
+            subtree = subtree[path[position + 1]]
+            if spur_path is None:
+                continue
+            new_path = path[:position] + spur_path
+            if tuple(new_path) in seen:
+                continue
+            seen.add(tuple(new_path))
+            heapq.heappush(candidates, (totals[position] + spur_cost,
+                                        next(tie_breaker), new_path,
+                                        totals[:position + 1], position))
+        if not candidates:
+            break
+        _, _, path, totals, deviation = heapq.heappop(candidates)
+        add_path(path, deviation, totals)
+    return [(totals[-1], path) for path, totals, _ in found]
+
+
+def _arc_position(offsets, targets, from_node, to_node):
+    """Position of the arc from `from_node` to `to_node` in `targets`"""
+    start = offsets[from_node]
+    return start + int(np.flatnonzero(
+        targets[start:offsets[from_node + 1]] == to_node)[0])
+
+
+def repair_tree(forward, backward, dist, pred, arcs):
+    """
+    Repair a shortest path tree after the costs of some arcs change.
+
+    Only the part of the tree the changes affect is solved again, as in
+    the dynamic algorithm of Ramalingam and Reps.  Nodes below an arc of
+    the tree that got more expensive lose their costs, and take the best
+    cost offered by the arcs into them from the rest of the tree.  Arcs
+    that got cheaper offer a lower cost to the node they lead to.  Then
+    Dijkstra's Algorithm is run from only the nodes offered a cost,
+    stopping wherever costs stop improving, so the work is about the
+    size of the region whose costs or paths change.
+
+    Parameters
+    ----------
+    forward : tuple of numpy.ndarray
+        CSR (offsets, targets, costs) arrays of the graph, with the new
+        costs.  Costs must be nonnegative.
+    backward : tuple of numpy.ndarray
+        CSR arrays of the graph with every arc reversed, also with the
+        new costs
+    dist, pred : numpy.ndarray
+        Shortest path tree solved with the old costs, as returned by
+        :py:obj:`dijkstra`.  They are not changed.
+    arcs : iterable of tuple of int
+        (From node id, to node id) of each arc whose cost changed
+
+    Returns
+    -------
+    dist, pred : numpy.ndarray
+        Shortest path tree with the new costs
+    changed : list of int
+        Node ids solved again, in the order they were solved (so each
+        node comes after its predecessor), followed by the node ids that
+        can no longer be reached
+    """
+    offsets, targets, costs = forward
+    back_offsets, back_targets, back_costs = backward
+    dist, pred = dist.copy(), pred.copy()
+    arcs = [(from_node, to_node, float(costs[_arc_position(
+        offsets, targets, from_node, to_node)]))
+        for from_node, to_node in arcs]
+    # Nodes below arcs of the tree that got more expensive
+    affected = set()
+    stack = [to_node for from_node, to_node, cost in arcs
+             if pred[to_node] == from_node
+             and dist[from_node] + cost > dist[to_node]]
+    while stack:
+        node = stack.pop()
+        if node in affected:
+            continue
+        affected.add(node)
+        start, end = offsets[node], offsets[node + 1]
+        stack.extend(to_node for to_node in targets[start:end].tolist()
+                     if pred[to_node] == node)
+    affected = list(affected)
+    dist[affected] = np.inf
+    pred[affected] = -1
+    tie_breaker = count()
+    heap = []
+    for node in affected:
+        start, end = back_offsets[node], back_offsets[node + 1]
+        for from_node, arc_cost in zip(back_targets[start:end].tolist(),
+                                       back_costs[start:end].tolist()):
+            new_cost = dist[from_node] + arc_cost
+            if new_cost < dist[node]:
+                dist[node], pred[node] = new_cost, from_node
+        if dist[node] < np.inf:
+            heap.append((dist[node], next(tie_breaker), node))
+    for from_node, to_node, cost in arcs:
+        if dist[from_node] + cost < dist[to_node]:
+            dist[to_node] = dist[from_node] + cost
+            pred[to_node] = from_node
+            heap.append((dist[to_node], next(tie_breaker), to_node))
+    heapq.heapify(heap)
+    changed = []
+    solved = set()
+    while heap:
+        cost, _, node = heapq.heappop(heap)
+        if node in solved or cost > dist[node]:
+            continue
+        solved.add(node)
+        changed.append(node)
+        start, end = offsets[node], offsets[node + 1]
+        for to_node, arc_cost in zip(targets[start:end].tolist(),
+                                     costs[start:end].tolist()):
+            new_cost = cost + arc_cost
+            if new_cost < dist[to_node]:
+                dist[to_node] = new_cost
+                pred[to_node] = node
+                heapq.heappush(heap, (new_cost, next(tie_breaker), to_node))
+    changed.extend(node for node in affected if node not in solved)
+    return dist, pred, changed
+
+
+def extract_paths(pred, nodes):
+    """
+    Build the paths to a batch of nodes from a predecessor array.
+
+    All of the paths are walked back one step at a time together, so the
+    work is vectorized over `nodes` and takes as many steps as the
+    longest path.
+
+    Parameters
+    ----------
+    pred : numpy.ndarray
+        Predecessor array, as returned by :py:obj:`dijkstra`
+    nodes : array-like of int
+        Node ids to build the paths for.  Each must be reachable.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        Node ids on the path from the source to each of `nodes`
+    """
+    current = np.asarray(nodes, dtype=np.int64)
+    steps = [current]
+    while True:
+        current = np.where(current >= 0, pred[np.maximum(current, 0)], -1)
+        if (current < 0).all():
+            break
+        steps.append(current)
+    # Rows are steps back from each node; -1 pads the shorter paths
+    steps = np.vstack(steps)[::-1]
+    return [column[column >= 0] for column in steps.T]
+
+
+class ShortestPathTree():
+    """
+    Solution of the shortest path tree problem, stored as arrays of
+    costs and predecessors.
+
+    Paths are not built until they are asked for, which avoids storing
+    a copy of every path from the source.  Indexing with "Costs" or
+    "Paths" gives the same dictionaries as :py:obj:`Graph.shortest_path`.
+
+    Parameters
+    ----------
+    labels : numpy.ndarray
+        Label of each node id
+    source : int
+        Node id of the source node
+    dist : numpy.ndarray
+        Minimum cost to reach each node, ``inf`` if unreachable
+    pred : numpy.ndarray
+        Node id before each node on its best path, -1 for the source
+        and for unreachable nodes
+    index : dict, optional
+        Node id of each label.  Built from `labels` if not given.
+    """
+    def __init__(self, labels, source, dist, pred, index=None):
+        self.labels = labels
+        self.source = source
+        self.dist = dist
+        self.pred = pred
+        self._index = index
+
+    def __repr__(self):
+        return (f"ShortestPathTree(source={self.labels[self.source]!r}, "
+                f"num_reached={len(self.reached)})")
+
+    def __getitem__(self, key):
+        if key == "Costs":
+            return self.costs
+        if key == "Paths":
+            return self.paths()
+        if key == "Predecessors":
+            return self.predecessors
+        raise KeyError(key)
+
+    @property
+    def reached(self):
+        """Array of the node ids reachable from the source"""
+        return np.flatnonzero(np.isfinite(self.dist))
+
+    @property
+    def costs(self):
+        """Dictionary of the minimum cost to each reachable node"""
+        reached = self.reached
+        return dict(zip(self.labels[reached].tolist(),
+                        self.dist[reached].tolist()))
+
+    @property
+    def predecessors(self):
+        """Dictionary of the node before each reachable node on its path"""
+        reached = self.reached
+        reached = reached[reached != self.source]
+        return dict(zip(self.labels[reached].tolist(),
+                        self.labels[self.pred[reached]].tolist()))
+
+    def _ids(self, nodes):
+        """Node ids of node labels, or a ValueError if not found"""
+        if self._index is None:
+            self._index = {label: node_id for node_id, label
+                           in enumerate(self.labels.tolist())}
+        node_ids = []
+        for node in nodes:
+            if node not in self._index:
+                raise ValueError(f"Destination Node {node} does not " +
+                                 "exist in the Graph!")
+            node_ids.append(self._index[node])
+        return np.array(node_ids, dtype=np.int64)
+
+    def path(self, target):
+        """
+        Return the best path to `target`.
+
+        Parameters
+        ----------
+        target
+            Label of the node to build the path to
+
+        Returns
+        -------
+        tuple or None
+            Node labels from the source to `target`, None if `target`
+            cannot be reached
+        """
+        return self.paths([target])[target]
+
+    def paths(self, targets=None):
+        """
+        Return the best paths to a batch of nodes.
+
+        Parameters
+        ----------
+        targets : iterable, optional
+            Labels of the nodes to build the paths to.  Defaults to
+            every reachable node.
+
+        Returns
+        -------
+        dict
+            Path (tuple of node labels, or None if unreachable) to each
+            of `targets`
+        """
+        if targets is None:
+            target_ids = self.reached
+        else:
+            target_ids = self._ids(targets)
+        paths = dict.fromkeys(self.labels[target_ids].tolist())
+        target_ids = target_ids[np.isfinite(self.dist[target_ids])]
+        # Build in batches to bound the padded array of path steps
+        for start in range(0, len(target_ids), _PATH_BATCH_SIZE):
+            batch = target_ids[start:start + _PATH_BATCH_SIZE]
+            for target, path in zip(self.labels[batch].tolist(),
+                                    extract_paths(self.pred, batch)):
+                paths[target] = tuple(self.labels[path].tolist())
+        return paths
@@ -0,0 +1,338 @@
+"""
+Project scheduling kernels (CPM and PERT) that run over arc arrays.
+
+The graph is an activity-on-arc project network: every arc is an
+activity, its cost is the activity's duration, and every node is an
+event that happens once all of the activities into it are finished.
+Nodes are integer ids 0 through n - 1, as stored by
+:py:obj:`CompactGraph`.
+"""
+
+import numpy as np
+
+# Most sampled activity durations held in memory at once by pert
+_SAMPLE_BATCH_ELEMENTS = 2**22
+# Slack below this fraction of the project duration counts as zero
+_TOLERANCE = 1e-9
+
+
+def topological_levels(num_nodes, sources, targets):
+    """
+    Level each node of a directed acyclic graph by the most arcs on any
+    path into it.
+
+    Uses Kahn's Algorithm a whole level at a time: the nodes with no
+    arcs left into them form the next level, and their arcs are removed
+    together.  Every arc goes from a lower level to a higher one, so
+    processing the levels in order is a topological order, and each
+    node and arc is handled once.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources, targets : array-like of int
+        From and to node id of each arc
+
+    Returns
+    -------
+    numpy.ndarray
+        Level of each node, starting from 0
+
+    Raises
+    ------
+    ValueError
+        If the graph contains a cycle
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    order = np.argsort(sources, kind="stable")
+    heads = targets[order]
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    in_degree = np.bincount(targets, minlength=num_nodes)
+    levels = np.full(num_nodes, -1, dtype=np.int64)
+    frontier = np.flatnonzero(in_degree == 0)
+    depth = 0
+    while len(frontier):
+        levels[frontier] = depth
+        depth += 1
+        starts, ends = offsets[frontier], offsets[frontier + 1]
+        lengths = ends - starts
+        # Heads of every arc out of the frontier
+        arc_heads = heads[np.repeat(starts - np.cumsum(lengths) + lengths,
+                                    lengths) + np.arange(lengths.sum())]
+        np.subtract.at(in_degree, arc_heads, 1)
+        frontier = np.unique(arc_heads)
+        frontier = frontier[in_degree[frontier] == 0]
+    if (levels == -1).any():
+        raise ValueError("Graph contains a cycle, so it is not a project "
+                         "network!")
+    return levels
+
+
+def _grouped_arcs(levels, ends):
+    """
+    Arcs sorted by the level of one of their ends, then by that end.
+
+    Returns the sorted arc positions, where each level's arcs start, and
+    where each end's arcs start within the sorted arcs.
+    """
+    end_levels = levels[ends]
+    order = np.lexsort((ends, end_levels))
+    level_starts = np.searchsorted(end_levels[order],
+                                   np.arange(levels.max() + 2))
+    sorted_ends = ends[order]
+    end_starts = np.flatnonzero(np.r_[True, sorted_ends[1:] !=
+                                      sorted_ends[:-1]])
+    return order, level_starts, end_starts
+
+
+def event_times(num_nodes, sources, targets, durations, levels=None):
+    """
+    Earliest and latest times of each event in a project network.
+
+    A forward pass takes each event's earliest time as the latest
+    finish of the activities into it, and a backward pass takes each
+    event's latest time as the earliest latest start of the activities
+    out of it, without delaying the project.  Both passes work a whole
+    level of :py:obj:`topological_levels` at a time, and `durations`
+    may hold many samples of the activity durations, which are all
+    passed through together.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources, targets : array-like of int
+        From and to node id of each activity (arc)
+    durations : array-like
+        Duration of each activity, as an array of length m, or of shape
+        (m, s) for `s` samples of the durations.  Must be nonnegative.
+    levels : numpy.ndarray, optional
+        Levels of the nodes from :py:obj:`topological_levels`, to skip
+        finding them again
+
+    Returns
+    -------
+    earliest : numpy.ndarray
+        Earliest time of each event, of shape (n,) or (n, s)
+    latest : numpy.ndarray
+        Latest time of each event, of the same shape
+
+    Raises
+    ------
+    ValueError
+        If the graph contains a cycle
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    durations = np.asarray(durations, dtype=float)
+    if levels is None:
+        levels = topological_levels(num_nodes, sources, targets)
+    shape = (num_nodes,) + durations.shape[1:]
+    earliest = np.zeros(shape)
+    if len(sources) == 0:
+        return earliest, earliest.copy()
+    # Forward pass, by level of the event each activity finishes at
+    order, level_starts, end_starts = _grouped_arcs(levels, targets)
+    for start, end in zip(level_starts[1:-1], level_starts[2:]):
+        arcs = order[start:end]
+        if not len(arcs):
+            continue
+        group_starts = end_starts[np.searchsorted(end_starts, start):
+                                  np.searchsorted(end_starts, end)] - start
+        finishes = earliest[sources[arcs]] + durations[arcs]
+        earliest[targets[arcs[group_starts]]] = np.maximum.reduceat(
+            finishes, group_starts)
+    # Backward pass, by level of the event each activity starts at
+    latest = np.broadcast_to(earliest.max(axis=0), shape).copy()
+    order, level_starts, end_starts = _grouped_arcs(levels, sources)
+    for start, end in zip(level_starts[-2::-1], level_starts[:0:-1]):
+        arcs = order[start:end]
+        if not len(arcs):
+            continue
+        group_starts = end_starts[np.searchsorted(end_starts, start):
+                                  np.searchsorted(end_starts, end)] - start
+        starts = latest[targets[arcs]] - durations[arcs]
+        latest[sources[arcs[group_starts]]] = np.minimum.reduceat(
+            starts, group_starts)
+    return earliest, latest
+
+
+def _critical(slack, duration):
+    """Mask of the activities with no slack"""
+    return slack <= _TOLERANCE * np.maximum(duration, 1)
+
+
+def critical_path(num_nodes, sources, targets, durations):
+    """
+    Solve the critical path method (CPM) for a project network.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources, targets : array-like of int
+        From and to node id of each activity (arc)
+    durations : array-like
+        Duration of each activity.  Must be nonnegative.
+
+    Returns
+    -------
+    duration : float
+        Shortest time the whole project can be finished in
+    earliest_start, latest_start, slack : numpy.ndarray
+        Earliest and latest start time of each activity that does not
+        delay the project, and the difference between them
+    path : list of int
+        Node ids along one critical path, the longest path through the
+        network.  Every activity on it has no slack.
+
+    Raises
+    ------
+    ValueError
+        If any duration is negative, or if the graph contains a cycle
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    durations = np.asarray(durations, dtype=float)
+    if (durations < 0).any():
+        raise ValueError("Activity durations must be nonnegative!")
+    earliest, latest = event_times(num_nodes, sources, targets, durations)
+    earliest_start = earliest[sources]
+    latest_start = latest[targets] - durations
+    slack = latest_start - earliest_start
+    duration = float(earliest.max()) if num_nodes else 0.0
+    if not num_nodes:
+        return duration, earliest_start, latest_start, slack, []
+    # Walk back from the last event over activities that set the
+    #  earliest time of the event they finish at
+    critical = _critical(slack, duration) & _critical(
+        earliest[targets] - earliest_start - durations, duration)
+    arcs_into = dict(zip(targets[critical].tolist(),
+                         sources[critical].tolist()))
+    path = [int(np.argmax(earliest))]
+    while path[-1] in arcs_into:
+        path.append(arcs_into[path[-1]])
+    return duration, earliest_start, latest_start, slack, path[::-1]
+
+
+def sample_durations(optimistic, most_likely, pessimistic, num_samples,
+                     rng, distribution="beta"):
+    """
+    Sample activity durations from three point estimates.
+
+    Parameters
+    ----------
+    optimistic, most_likely, pessimistic : numpy.ndarray
+        Shortest, most likely, and longest duration of each activity
+    num_samples : int
+        Number of samples of every duration
+    rng : numpy.random.Generator
+        Source of the random numbers
+    distribution : str, optional
+        "beta" (default) for the PERT beta distribution, whose mean is
+        (a + 4m + b) / 6, or "triangular"
+
+    Returns
+    -------
+    numpy.ndarray
+        Sampled durations, of shape (m, `num_samples`), so each
+        activity's samples are contiguous
+
+    Raises
+    ------
+    ValueError
+        If `distribution` is not recognized
+    """
+    optimistic, most_likely, pessimistic = (
+        estimate[:, np.newaxis]
+        for estimate in [optimistic, most_likely, pessimistic])
+    spread = pessimistic - optimistic
+    # Activities with no spread are fixed, but still sampled so the
+    #  distributions stay well defined
+    width = np.where(spread > 0, spread, 1)
+    mode = (most_likely - optimistic) / width
+    size = (len(spread), num_samples)
+    if distribution == "beta":
+        fractions = rng.beta(1 + 4 * mode, 1 + 4 * (1 - mode), size)
+    elif distribution == "triangular":
+        # Inverse of the triangular distribution's CDF on [0, 1]
+        uniform = rng.random(size)
+        fractions = np.where(uniform < mode,
+                             np.sqrt(uniform * mode),
+                             1 - np.sqrt((1 - uniform) * (1 - mode)))
+    else:
+        raise ValueError("Argument 'distribution' must be either 'beta'"
+                         " or 'triangular'!")
+    return optimistic + np.where(spread > 0, spread, 0) * fractions
+
+
+def pert(num_nodes, sources, targets, optimistic, most_likely, pessimistic,
+         num_samples=10000, distribution="beta", seed=None):
+    """
+    Simulate the completion time of a project network with uncertain
+    activity durations (Monte Carlo PERT).
+
+    Durations are sampled in batches and every batch is passed through
+    :py:obj:`event_times` at once, so the work per batch is a handful of
+    array operations per level of the network.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources, targets : array-like of int
+        From and to node id of each activity (arc)
+    optimistic, most_likely, pessimistic : array-like
+        Shortest, most likely, and longest duration of each activity.
+        Must satisfy 0 <= optimistic <= most_likely <= pessimistic.
+    num_samples : int, optional
+        Number of simulated projects, 10,000 by default
+    distribution : str, optional
+        "beta" (default) or "triangular", as in
+        :py:obj:`sample_durations`
+    seed : int or numpy.random.Generator, optional
+        Seed for the random numbers, for repeatable results
+
+    Returns
+    -------
+    durations : numpy.ndarray
+        Completion time of each simulated project
+    criticality : numpy.ndarray
+        Fraction of the simulated projects each activity was critical in
+
+    Raises
+    ------
+    ValueError
+        If the estimates are out of order or negative, if `distribution`
+        is not recognized, or if the graph contains a cycle
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    optimistic, most_likely, pessimistic = (
+        np.asarray(estimate, dtype=float)
+        for estimate in [optimistic, most_likely, pessimistic])
+    if (optimistic < 0).any() or (most_likely < optimistic).any() or \
+            (pessimistic < most_likely).any():
+        raise ValueError("Duration estimates must satisfy 0 <= optimistic"
+                         " <= most likely <= pessimistic!")
+    rng = np.random.default_rng(seed)
+    levels = topological_levels(num_nodes, sources, targets)
+    batch_size = max(1, _SAMPLE_BATCH_ELEMENTS // max(len(sources), 1))
+    project_durations = []
+    critical_counts = np.zeros(len(sources))
+    for start in range(0, num_samples, batch_size):
+        samples = sample_durations(optimistic, most_likely, pessimistic,
+                                   min(batch_size, num_samples - start),
+                                   rng, distribution)
+        earliest, latest = event_times(num_nodes, sources, targets,
+                                       samples, levels)
+        duration = earliest.max(axis=0, initial=0)
+        slack = latest[targets] - samples - earliest[sources]
+        critical_counts += _critical(slack, duration).sum(axis=1)
+        project_durations.append(duration)
+    durations = (np.concatenate(project_durations) if project_durations
+                 else np.zeros(0))
+    return durations, critical_counts / max(num_samples, 1)
@@ -0,0 +1,166 @@
+"""
+Immutable graph snapshots for answering queries from many threads.
+"""
+
+import hashlib
+
+import numpy as np
+
+from ormm.network.compact import _storable_labels, CompactGraph
+
+
+def _read_only(array):
+    """View of `array` that cannot be written to"""
+    if array is None:
+        return None
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class GraphSnapshot(CompactGraph):
+    """
+    Read-only copy of a graph that many threads can query at once.
+
+    A :py:obj:`CompactGraph` whose arrays cannot be written to, and
+    whose attributes cannot be changed, so queries from many threads
+    need no locks.  Everything a query might otherwise build the first
+    time it is needed (the reversed arcs, and the check for negative
+    costs) is built up front.  Usually made with :py:obj:`Graph.snapshot`.
+
+    Snapshots are hashable, and equal when they have the same nodes,
+    arcs, costs, and capacities, so they can be used as keys of result
+    caches that stay valid across rebuilds of an unchanged graph.
+
+    Parameters
+    ----------
+    labels, offsets, targets, costs : array-like
+        Arrays of the graph, as in :py:obj:`CompactGraph`
+    capacities : array-like, optional
+        Capacity of each arc, as in :py:obj:`CompactGraph`
+    hierarchy : ContractionHierarchy, optional
+        Index of the same graph, to answer :py:obj:`shortest_path_to`
+        with method "hierarchy"
+
+    Notes
+    -----
+    To serve queries while the graph changes, keep the current snapshot
+    in one variable that the query threads read, and have the thread
+    that changes the graph replace it with a new snapshot when done.
+    Replacing the variable is atomic, and queries already running keep
+    the snapshot they started with.
+
+    The search kernels are written in Python, so threads take turns
+    running them rather than running in parallel.  For queries from many
+    sources, :py:obj:`shortest_paths` with `processes` runs over a pool
+    of processes instead.
+    """
+    def __init__(self, labels, offsets, targets, costs, capacities=None,
+                 hierarchy=None):
+        super().__init__(labels, offsets, targets, costs, capacities)
+        for name in ["labels", "offsets", "targets", "costs", "capacities"]:
+            setattr(self, name, _read_only(getattr(self, name)))
+        self.hierarchy = hierarchy
+        reverse = CompactGraph._from_ids(
+            self.labels, self.targets.astype(np.int64),
+            self.sources.astype(np.int64), self.costs, self.capacities)
+        for name in ["offsets", "targets", "costs", "capacities"]:
+            setattr(reverse, name, _read_only(getattr(reverse, name)))
+        reverse.index = self.index
+        reverse._reverse = self
+        self._reverse = reverse
+        self._nonnegative = not self.num_arcs or self.costs.min() >= 0
+        digest = hashlib.blake2b(digest_size=8)
+        labels = _storable_labels(self.labels)
+        digest.update(repr(labels.tolist()).encode() if labels.dtype == object
+                      else labels.tobytes())
+        for array in [self.offsets, self.targets, self.costs,
+                      self.capacities]:
+            if array is not None:
+                digest.update(np.ascontiguousarray(array))
+        self._hash = int.from_bytes(digest.digest(), "little", signed=True)
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError("GraphSnapshot is read-only!")
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError("GraphSnapshot is read-only!")
+
+    def __repr__(self):
+        return (f"GraphSnapshot(num_nodes={self.num_nodes}, "
+                f"num_arcs={self.num_arcs})")
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if not isinstance(other, GraphSnapshot):
+            return NotImplemented
+        if self is other:
+            return True
+        if self._hash != other._hash or \
+                (self.capacities is None) != (other.capacities is None):
+            return False
+        return all(np.array_equal(mine, theirs) for mine, theirs in [
+            (self.labels, other.labels), (self.offsets, other.offsets),
+            (self.targets, other.targets), (self.costs, other.costs),
+            (self.capacities, other.capacities)] if mine is not None)
+
+    @classmethod
+    def from_compact(cls, compact, hierarchy=None):
+        """
+        Build a snapshot of a :py:obj:`CompactGraph`.
+
+        The snapshot shares the compact graph's arrays, through views
+        that cannot be written to, so taking it does not copy the graph.
+        The compact graph's arrays must not be changed afterwards.
+
+        Parameters
+        ----------
+        compact : CompactGraph
+            Compact graph to take the snapshot of
+        hierarchy : ContractionHierarchy, optional
+            Index of the same graph, as in :py:obj:`GraphSnapshot`
+
+        Returns
+        -------
+        GraphSnapshot
+        """
+        return cls(compact.labels, compact.offsets, compact.targets,
+                   compact.costs, compact.capacities, hierarchy)
+
+    @classmethod
+    def _from_ids(cls, labels, from_ids, to_ids, costs, capacities=None):
+        """Build the snapshot from interned arcs, as in CompactGraph"""
+        return cls.from_compact(CompactGraph._from_ids(
+            labels, from_ids, to_ids, costs, capacities))
+
+    def _check_nonnegative(self):
+        """Raise a ValueError if any arc has a negative cost"""
+        if not self._nonnegative:
+            super()._check_nonnegative()
+
+    def shortest_path_to(self, source, target, method="dijkstra",
+                         heuristic=None, coordinates=None):
+        """
+        Solve the shortest path problem from `source` to `target` only.
+
+        Same as :py:obj:`CompactGraph.shortest_path_to`, with the extra
+        method "hierarchy" to search the snapshot's `hierarchy`.
+
+        Raises
+        ------
+        ValueError
+            If method "hierarchy" is used and the snapshot has no
+            `hierarchy`, or as in :py:obj:`CompactGraph.shortest_path_to`
+        """
+        if method == "hierarchy":
+            if self.hierarchy is None:
+                raise ValueError("Method 'hierarchy' requires a snapshot"
+                                 " taken with a contraction hierarchy!")
+            return self.hierarchy.shortest_path_to(source, target)
+        return super().shortest_path_to(source, target, method, heuristic,
+                                        coordinates)
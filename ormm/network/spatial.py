@@ -0,0 +1,362 @@
+"""
+Neighbor searches over point coordinates, for building graphs whose
+arcs join nearby points.
+
+Points are integer ids 0 through n - 1, in the order of the coordinate
+rows.  Searches use a uniform grid: every point is binned into a cell,
+and only the cells around a point are searched for its neighbors.
+"""
+
+import itertools
+
+import numpy as np
+
+# Most candidate neighbor pairs compared at once
+_CANDIDATE_BATCH = 2**22
+# Mean radius of the Earth in kilometers
+EARTH_RADIUS = 6371.0088
+# Largest number of grid cells, so cell keys fit in an int64
+_MAX_CELLS = 2.0**62
+# Most times dense cells are searched again over finer grids
+_MAX_DEPTH = 16
+
+_METRICS = {"euclidean", "manhattan", "haversine"}
+
+
+def _unit_vectors(coordinates):
+    """Points on the unit sphere of (latitude, longitude) degree rows"""
+    latitude, longitude = np.radians(coordinates).T
+    return np.column_stack([np.cos(latitude) * np.cos(longitude),
+                            np.cos(latitude) * np.sin(longitude),
+                            np.sin(latitude)])
+
+
+class _Grid():
+    """
+    Points binned into cubic cells of side `size`.
+
+    Points are sorted by the key of their cell, so the points of each
+    occupied cell are contiguous and nearby points are close in memory.
+    Point `i` of the grid is point ``order[i]`` of the input.
+    """
+    def __init__(self, points, size):
+        low = points.min(axis=0)
+        extent = points.max(axis=0) - low
+        cells = np.floor(extent / size) + 1
+        if np.prod(cells) > _MAX_CELLS:
+            size *= (np.prod(cells) / _MAX_CELLS) ** (1 / len(cells)) * 1.01
+            cells = np.floor(extent / size) + 1
+        self.size = size
+        self.shape = cells.astype(np.int64)
+        cells = np.minimum(np.floor((points - low) / size).astype(np.int64),
+                           self.shape - 1)
+        keys = self._keys(cells)
+        self.order = np.argsort(keys, kind="stable")
+        self.points, self.cells = points[self.order], cells[self.order]
+        self.keys, self.starts, counts = np.unique(
+            keys[self.order], return_index=True, return_counts=True)
+        self.ends = self.starts + counts
+
+    def _keys(self, cells):
+        """Flat key of each row of cell coordinates"""
+        return np.ravel_multi_index(tuple(cells.T), tuple(self.shape))
+
+    def _lookup(self, cells):
+        """
+        Rows of cell coordinates that are occupied cells, and the
+        positions of those cells in `keys`
+        """
+        inside = ((cells >= 0) & (cells < self.shape)).all(axis=1)
+        keys = self._keys(cells[inside])
+        positions = np.minimum(np.searchsorted(self.keys, keys),
+                               len(self.keys) - 1)
+        found = self.keys[positions] == keys
+        return np.flatnonzero(inside)[found], positions[found]
+
+    def _offsets(self, reach):
+        """Offsets to every cell within `reach` cells"""
+        return itertools.product(range(-reach, reach + 1),
+                                 repeat=self.points.shape[1])
+
+    def block_counts(self, reach=1):
+        """
+        Number of points in the cells within `reach` cells of each
+        occupied cell (including its own)
+        """
+        counts = self.ends - self.starts
+        occupied = self.cells[self.starts]
+        totals = np.zeros(len(self.keys), dtype=np.int64)
+        for offset in self._offsets(reach):
+            rows, positions = self._lookup(occupied + offset)
+            totals[rows] += counts[positions]
+        return totals
+
+    def candidates(self, queries, reach):
+        """
+        Pairs of each query point and every point in the cells within
+        `reach` cells of it (including its own), grouped by query point.
+        Query points are given by their position in `queries`.
+        """
+        starts, ends, owners = [], [], []
+        for offset in self._offsets(reach):
+            rows, positions = self._lookup(self.cells[queries] + offset)
+            starts.append(self.starts[positions])
+            ends.append(self.ends[positions])
+            owners.append(rows)
+        starts, ends, owners = (np.concatenate(arrays)
+                                for arrays in [starts, ends, owners])
+        order = np.argsort(owners, kind="stable")
+        starts, ends, owners = starts[order], ends[order], owners[order]
+        lengths = ends - starts
+        # Every point in the cells found
+        points = np.repeat(starts - np.cumsum(lengths) + lengths,
+                           lengths) + np.arange(lengths.sum())
+        return np.repeat(owners, lengths), points
+
+
+def _distances(points, sources, targets, metric):
+    """Distance between each pair of points"""
+    differences = points[sources] - points[targets]
+    if metric == "manhattan":
+        return np.abs(differences).sum(axis=1)
+    return np.sqrt(np.einsum("ij,ij->i", differences, differences))
+
+
+def _cell_size(points, k, radius):
+    """
+    Grid cell side for a radius search, or that puts about k / 2 points
+    in each cell for a k nearest neighbors search
+    """
+    if k is None:
+        return radius if radius > 0 else 1.0
+    extent = np.ptp(points, axis=0)
+    extent = extent[extent > 0]
+    if not len(extent):
+        return 1.0
+    size = (np.prod(extent) * (k + 1) / 2 / len(points)) ** (1 / len(extent))
+    return min(size, radius) if radius else size
+
+
+def _query_batch(grid, queries, k, radius, metric):
+    """Neighbor pairs of one batch of query points"""
+    sources, targets, distances = [], [], []
+    reach = 1
+    while len(queries):
+        owners, query_targets = grid.candidates(queries, reach)
+        keep = queries[owners] != query_targets
+        owners, query_targets = owners[keep], query_targets[keep]
+        query_distances = _distances(grid.points, queries[owners],
+                                     query_targets, metric)
+        if radius is not None:
+            keep = query_distances <= radius
+            owners, query_targets, query_distances = (
+                owners[keep], query_targets[keep], query_distances[keep])
+        finished = np.ones(len(queries), dtype=bool)
+        searched = reach * grid.size
+        if k is not None and reach < grid.shape.max() and (
+                radius is None or searched < radius):
+            # Points outside the searched cells are over `searched` away
+            #  in some coordinate, so are no closer in either metric, and
+            #  a query point is finished once k candidates are closer
+            keep = query_distances <= searched
+            owners, query_targets, query_distances = (
+                owners[keep], query_targets[keep], query_distances[keep])
+            finished = np.bincount(owners, minlength=len(queries)) >= k
+            keep = finished[owners]
+            owners, query_targets, query_distances = (
+                owners[keep], query_targets[keep], query_distances[keep])
+        if k is not None:
+            # Keep the k closest candidates of each query point, sorting
+            #  by distance then (with a radix sort) by query point
+            order = np.argsort(query_distances)
+            order = order[np.argsort(owners[order].astype(np.uint16),
+                                     kind="stable")]
+            owners, query_targets, query_distances = (
+                owners[order], query_targets[order], query_distances[order])
+            group_sizes = np.bincount(owners, minlength=len(queries))
+            group_starts = np.cumsum(group_sizes) - group_sizes
+            keep = np.arange(len(owners)) - group_starts[owners] < k
+            owners, query_targets, query_distances = (
+                owners[keep], query_targets[keep], query_distances[keep])
+        sources.append(queries[owners])
+        targets.append(query_targets)
+        distances.append(query_distances)
+        queries = queries[~finished]
+        reach += 1
+    return sources, targets, distances
+
+
+def _batches(sizes, most):
+    """
+    Split positions into consecutive batches of at most `most`
+    positions, whose `sizes` add up to at most `_CANDIDATE_BATCH` (or
+    of one position, if its size alone is more)
+    """
+    totals = np.cumsum(sizes)
+    start = 0
+    while start < len(sizes):
+        before = totals[start - 1] if start else 0
+        end = int(np.searchsorted(totals, before + _CANDIDATE_BATCH,
+                                  side="right"))
+        end = min(max(end, start + 1), start + most)
+        yield start, end
+        start = end
+
+
+def _neighbors(points, queries, k, radius, metric, depth=0):
+    """
+    Neighbor pairs from each of the `queries` (row ids of `points`),
+    with the rows of `points` as ids.
+
+    For k nearest neighbors, cells holding many more points than the
+    rest are searched again over a finer grid of just the points near
+    them, so clustered points are not all compared with each other.
+    A point in a cell with over k points has its k nearest neighbors
+    within the width of the cell (times the number of dimensions), so
+    it is enough to search the cells that close to it.
+    """
+    grid = _Grid(points, _cell_size(points, k, radius))
+    positions = np.empty(len(points), dtype=np.int64)
+    positions[grid.order] = np.arange(len(points))
+    queries = np.sort(positions[queries])
+    cells = np.searchsorted(grid.starts, queries, side="right") - 1
+    sources, targets, distances = [], [], []
+    if k is not None and depth < _MAX_DEPTH:
+        reach = points.shape[1]
+        counts = grid.ends - grid.starts
+        # Small enough that the finer grid has smaller cells
+        dense = counts[cells] > (2 * reach + 1) ** reach * (k + 1)
+        searched = np.zeros(len(queries), dtype=bool)
+        for cell in np.unique(cells[dense]).tolist():
+            block = np.unique(grid.candidates(grid.starts[[cell]], reach)[1])
+            if len(block) == len(points):
+                continue
+            # Query points are sorted, so those in the cell are together
+            start, end = np.searchsorted(cells, [cell, cell + 1])
+            found = _neighbors(grid.points[block], np.searchsorted(
+                block, queries[start:end]), k, radius, metric, depth + 1)
+            sources.append(block[found[0]])
+            targets.append(block[found[1]])
+            distances.append(found[2])
+            searched[start:end] = True
+        queries, cells = queries[~searched], cells[~searched]
+    # Query points are numbered in 16 bits within a batch
+    most = 2**16 if k is not None else len(queries)
+    sizes = grid.block_counts()[cells]
+    for start, end in _batches(sizes, most):
+        for arrays, found in zip([sources, targets, distances],
+                                 _query_batch(grid, queries[start:end], k,
+                                              radius, metric)):
+            arrays.extend(found)
+    if not sources:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0))
+    return (grid.order[np.concatenate(sources)],
+            grid.order[np.concatenate(targets)], np.concatenate(distances))
+
+
+def neighbor_pairs(coordinates, k=None, radius=None, metric="euclidean",
+                   symmetric=True, earth_radius=EARTH_RADIUS):
+    """
+    Find pairs of nearby points, as the k nearest neighbors of each
+    point and/or every point within a radius.
+
+    Points are binned into a grid of cells, sized so each cell holds a
+    few points (or as wide as `radius`), and each point is compared only
+    with the points in the cells around it.  For k
+    nearest neighbors, the block of cells searched around a point grows
+    until its kth nearest neighbor is closer than any point outside the
+    block could be.  Cells that hold many more points than the rest,
+    as clustered points do, are searched again over a finer grid of
+    just the points around them, and points are compared in batches
+    sized by the pairs they produce.  This takes about O(n k) work for
+    well spread or clustered points, instead of the O(n^2) of comparing
+    every pair.
+
+    Parameters
+    ----------
+    coordinates : array-like
+        Coordinates of each point, one row per point.  For "haversine",
+        each row is a (latitude, longitude) in degrees.
+    k : int, optional
+        Number of nearest neighbors of each point to pair it with
+    radius : float, optional
+        Largest distance between paired points.  With `k`, each point
+        is paired with its k nearest neighbors within `radius`.
+    metric : str, optional
+        Distance between points - "euclidean" (default), "manhattan",
+        or "haversine" for the great circle distance between points on
+        the Earth
+    symmetric : bool, optional
+        If True (default), each pair is given once, with the smaller
+        id first, whether one or both of the points are neighbors of the
+        other.  If False, pairs are from each point to each of its
+        neighbors, so two points that are each other's neighbors are
+        paired twice.
+    earth_radius : float, optional
+        Radius of the Earth for "haversine" distances, in kilometers by
+        default.  `radius` is in the same units.
+
+    Returns
+    -------
+    sources, targets : numpy.ndarray
+        Point ids of each pair, with each point's neighbors in order of
+        distance if `symmetric` is False
+    distances : numpy.ndarray
+        Distance between each pair of points
+
+    Raises
+    ------
+    ValueError
+        If neither `k` nor `radius` is given, if either is negative, or
+        if `metric` is not recognized
+    """
+    if k is None and radius is None:
+        raise ValueError("At least one of `k` or `radius` must be given!")
+    if (k is not None and k < 0) or (radius is not None and radius < 0):
+        raise ValueError("Arguments `k` and `radius` must be"
+                         " nonnegative!")
+    if metric not in _METRICS:
+        raise ValueError("Argument 'metric' must be one of 'euclidean',"
+                         " 'manhattan', or 'haversine'!")
+    points = np.asarray(coordinates, dtype=float)
+    if points.ndim == 1:
+        points = points[:, np.newaxis]
+    num_points = len(points)
+    if k is not None:
+        k = min(k, num_points - 1)
+    if not num_points or k == 0:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0))
+    search_radius = radius
+    if metric == "haversine":
+        # Straight lines through the sphere order points the same way
+        #  as great circles, so search over the chords between them
+        points = _unit_vectors(points)
+        if radius is not None:
+            search_radius = 2 * np.sin(min(radius / earth_radius, np.pi) / 2)
+    search_metric = "euclidean" if metric == "haversine" else metric
+    sources, targets, distances = _neighbors(
+        points, np.arange(num_points), k, search_radius, search_metric)
+    if k is None and symmetric:
+        # Pairs within the radius are found from both ends
+        keep = sources < targets
+        sources, targets, distances = (sources[keep], targets[keep],
+                                       distances[keep])
+    elif symmetric:
+        low = np.minimum(sources, targets)
+        high = np.maximum(sources, targets)
+        _, first = np.unique(low * num_points + high, return_index=True)
+        sources, targets, distances = low[first], high[first], \
+            distances[first]
+    else:
+        # Neighbors within a radius are not yet in order of distance
+        order = (np.argsort(distances) if k is None
+                 else np.arange(len(distances)))
+        order = order[np.argsort(sources[order], kind="stable")]
+        sources, targets, distances = (sources[order], targets[order],
+                                       distances[order])
+    if metric == "haversine":
+        distances = 2 * earth_radius * np.arcsin(np.minimum(distances / 2,
+                                                            1))
+    return sources, targets, distances
@@ -0,0 +1,384 @@
+"""
+Traveling salesman heuristics that run over a distance matrix.
+
+Cities are integer ids 0 through n - 1, and ``distances[i, j]`` is the
+cost of traveling from city `i` to city `j`.  A tour visits every city
+once and returns to where it started, and is stored as a list of the
+cities in the order they are visited.  Tours are built with a
+construction heuristic, then improved with local search moves that only
+look at each city's nearest neighbors.
+"""
+
+from collections import deque
+import time
+
+import numpy as np
+
+# Smallest change in tour cost that counts as an improvement
+_EPSILON = 1e-9
+# Number of cities improved between checks of the time limit
+_CHECK_EVERY = 64
+
+
+def tour_cost(distances, tour):
+    """Total cost of a tour, including the trip back to its start"""
+    tour = np.asarray(tour)
+    return float(distances[tour, np.roll(tour, -1)].sum())
+
+
+def neighbor_lists(distances, k):
+    """
+    The `k` nearest other cities to each city.
+
+    Distances are taken in whichever direction is shorter, so cities
+    that are close either way are neighbors.
+
+    Parameters
+    ----------
+    distances : numpy.ndarray
+        n x n matrix of distances between the cities
+    k : int
+        Number of neighbors of each city
+
+    Returns
+    -------
+    numpy.ndarray
+        n x min(k, n - 1) matrix of each city's neighbors, nearest first
+    """
+    num_cities = len(distances)
+    k = min(k, num_cities - 1)
+    if k <= 0:
+        return np.zeros((num_cities, 0), dtype=np.int64)
+    nearest = np.minimum(distances, distances.T).astype(float)
+    np.fill_diagonal(nearest, np.inf)
+    neighbors = np.argpartition(nearest, k - 1, axis=1)[:, :k]
+    order = np.argsort(np.take_along_axis(nearest, neighbors, axis=1),
+                       axis=1, kind="stable")
+    return np.take_along_axis(neighbors, order, axis=1)
+
+
+def nearest_neighbor_tour(distances, start=0):
+    """
+    Build a tour by always traveling to the nearest unvisited city.
+
+    Parameters
+    ----------
+    distances : numpy.ndarray
+        n x n matrix of distances between the cities
+    start : int, optional
+        City to start the tour from
+
+    Returns
+    -------
+    list of int
+        Cities in the order they are visited
+    """
+    remaining = np.ones(len(distances), dtype=bool)
+    remaining[start] = False
+    tour = [start]
+    for _ in range(len(distances) - 1):
+        row = np.where(remaining, distances[tour[-1]], np.inf)
+        city = int(row.argmin())
+        remaining[city] = False
+        tour.append(city)
+    return tour
+
+
+def savings_tour(distances, start=0, neighbors=None):
+    """
+    Build a tour with the Clarke-Wright savings heuristic.
+
+    Every city starts on its own trip out of and back to `start`.  Trips
+    are then joined in order of the saving ``d(i, start) + d(start, j) -
+    d(i, j)`` of traveling from `i` straight to `j`.  Only the pairs in
+    `neighbors` are tried, and any trips left at the end are joined
+    nearest end first.
+
+    Parameters
+    ----------
+    distances : numpy.ndarray
+        n x n matrix of distances between the cities
+    start : int, optional
+        City to start the tour from (the depot)
+    neighbors : numpy.ndarray, optional
+        Neighbor lists from :py:obj:`neighbor_lists`; 10 per city if
+        not given
+
+    Returns
+    -------
+    list of int
+        Cities in the order they are visited
+    """
+    num_cities = len(distances)
+    if neighbors is None:
+        neighbors = neighbor_lists(distances, 10)
+    # Candidate pairs in both directions, skipping the start city
+    from_cities = np.repeat(np.arange(num_cities), neighbors.shape[1])
+    to_cities = neighbors.ravel()
+    from_cities, to_cities = (np.concatenate([from_cities, to_cities]),
+                              np.concatenate([to_cities, from_cities]))
+    keep = (from_cities != start) & (to_cities != start)
+    from_cities, to_cities = from_cities[keep], to_cities[keep]
+    savings = (distances[from_cities, start] + distances[start, to_cities] -
+               distances[from_cities, to_cities])
+    order = np.argsort(-savings, kind="stable")
+    successor = [-1] * num_cities
+    predecessor = [-1] * num_cities
+    # Last city of the trip each city starts, kept up to date for the
+    #  first cities of trips, to avoid closing a loop
+    trip_end = list(range(num_cities))
+    trip_start = list(range(num_cities))
+    for from_city, to_city in zip(from_cities[order].tolist(),
+                                  to_cities[order].tolist()):
+        if successor[from_city] != -1 or predecessor[to_city] != -1 or \
+                trip_start[from_city] == to_city:
+            continue
+        successor[from_city] = to_city
+        predecessor[to_city] = from_city
+        first, last = trip_start[from_city], trip_end[to_city]
+        trip_end[first] = last
+        trip_start[last] = first
+    # Join the trips, nearest first trip city first
+    firsts = np.array([city for city in range(num_cities)
+                       if predecessor[city] == -1 and city != start],
+                      dtype=np.int64)
+    tour = [start]
+    remaining = np.ones(len(firsts), dtype=bool)
+    for _ in range(len(firsts)):
+        nearest = int(np.where(remaining, distances[tour[-1], firsts],
+                               np.inf).argmin())
+        remaining[nearest] = False
+        city = int(firsts[nearest])
+        while city != -1:
+            tour.append(city)
+            city = successor[city]
+    return tour
+
+
+class _LocalSearch():
+    """
+    Tour being improved by 2-opt and Or-opt moves, with the position of
+    each city on it.
+    """
+    def __init__(self, distances, tour, neighbors):
+        self.cost = distances.item
+        self.tour = list(tour)
+        self.position = [0] * len(tour)
+        for position, city in enumerate(self.tour):
+            self.position[city] = position
+        self.neighbors = neighbors.tolist()
+        self.symmetric = bool((distances == distances.T).all())
+
+    def next(self, city):
+        position = self.position[city] + 1
+        return self.tour[position if position < len(self.tour) else 0]
+
+    def prev(self, city):
+        return self.tour[self.position[city] - 1]
+
+    def reverse(self, first, last):
+        """Reverse the part of the tour from `first` to `last`"""
+        tour, position = self.tour, self.position
+        num_cities = len(tour)
+        start, end = position[first], position[last]
+        length = (end - start) % num_cities + 1
+        if 2 * length > num_cities:
+            # Reverse the rest instead, which gives the same tour
+            start, end = end + 1, start - 1
+            length = num_cities - length
+        for _ in range(length // 2):
+            start %= num_cities
+            end %= num_cities
+            tour[start], tour[end] = tour[end], tour[start]
+            position[tour[start]] = start
+            position[tour[end]] = end
+            start += 1
+            end -= 1
+
+    def two_opt(self, city):
+        """
+        Apply the best improving 2-opt move that adds an arc from `city`
+        to one of its neighbors, and return the cities whose arcs
+        changed (empty if none improve)
+        """
+        cost = self.cost
+        best_gain, best_move = _EPSILON, None
+        for direction in [self.next, self.prev]:
+            other = direction(city)
+            removed = cost(city, other)
+            for neighbor in self.neighbors[city]:
+                added = cost(city, neighbor)
+                if added >= removed:
+                    break
+                neighbor_other = direction(neighbor)
+                if neighbor_other == city or neighbor == other:
+                    continue
+                gain = removed + cost(neighbor, neighbor_other) - added - \
+                    cost(other, neighbor_other)
+                if gain > best_gain:
+                    best_gain = gain
+                    best_move = (direction, other, neighbor, neighbor_other)
+        if best_move is None:
+            return []
+        direction, other, neighbor, neighbor_other = best_move
+        if direction == self.next:
+            self.reverse(other, neighbor)
+        else:
+            self.reverse(city, neighbor_other)
+        return [city, other, neighbor, neighbor_other]
+
+    def or_opt(self, city):
+        """
+        Apply the best improving move of the 1 to 3 cities starting at
+        `city` to between a neighbor and the city after or before it,
+        and return the cities whose arcs changed (empty if none improve)
+        """
+        cost, tour, position = self.cost, self.tour, self.position
+        num_cities = len(tour)
+        best_gain, best_move = _EPSILON, None
+        segment = [city]
+        for _ in range(min(3, num_cities - 3)):
+            first, last = segment[0], segment[-1]
+            before, after = self.prev(first), self.next(last)
+            removed = cost(before, first) + cost(last, after) - \
+                cost(before, after)
+            for neighbor in self.neighbors[first] + self.neighbors[last]:
+                if neighbor in segment:
+                    continue
+                for left, right in [(neighbor, self.next(neighbor)),
+                                    (self.prev(neighbor), neighbor)]:
+                    if left == before or right == after:
+                        continue
+                    gain = removed + cost(left, right) - \
+                        cost(left, first) - cost(last, right)
+                    reversed_gain = removed + cost(left, right) - \
+                        cost(left, last) - cost(first, right) \
+                        if self.symmetric and len(segment) > 1 else -np.inf
+                    if max(gain, reversed_gain) > best_gain:
+                        best_gain = max(gain, reversed_gain)
+                        best_move = (list(segment), left,
+                                     reversed_gain > gain)
+            segment.append(self.next(last))
+        if best_move is None:
+            return []
+        segment, left, flip = best_move
+        before, after = self.prev(segment[0]), self.next(segment[-1])
+        moved = set(segment)
+        rest = [tour_city for tour_city in tour if tour_city not in moved]
+        insert_at = rest.index(left) + 1
+        self.tour = rest[:insert_at] + (segment[::-1] if flip else segment) \
+            + rest[insert_at:]
+        for tour_position, tour_city in enumerate(self.tour):
+            position[tour_city] = tour_position
+        return segment + [before, after, left, self.next(left)]
+
+
+def improve_tour(distances, tour, neighbors, time_limit=None):
+    """
+    Improve a tour with 2-opt and Or-opt moves until none improve it.
+
+    Each move must add an arc from a city to one of its `neighbors`, so
+    a city is checked in time proportional to its number of neighbors
+    instead of the number of cities.  Cities are checked from a queue
+    (don't-look bits): only the cities whose arcs a move changed are
+    checked again.  2-opt moves reverse part of the tour, so they are
+    only used when `distances` is symmetric.
+
+    Parameters
+    ----------
+    distances : numpy.ndarray
+        n x n matrix of distances between the cities
+    tour : list of int
+        Tour to improve, as a list of the cities in order
+    neighbors : numpy.ndarray
+        Neighbor lists from :py:obj:`neighbor_lists`
+    time_limit : float, optional
+        Seconds to stop after, keeping the best tour found so far
+
+    Returns
+    -------
+    list of int
+        Improved tour, starting from the same city as `tour`
+    """
+    if len(tour) < 4:
+        return list(tour)
+    deadline = (time.perf_counter() + time_limit
+                if time_limit is not None else np.inf)
+    search = _LocalSearch(distances, tour, neighbors)
+    queue = deque(search.tour)
+    queued = [True] * len(tour)
+    checked = 0
+    while queue:
+        checked += 1
+        if checked % _CHECK_EVERY == 0 and time.perf_counter() > deadline:
+            break
+        city = queue.popleft()
+        queued[city] = False
+        changed = (search.two_opt(city) if search.symmetric else []) or \
+            search.or_opt(city)
+        for changed_city in changed:
+            if not queued[changed_city]:
+                queued[changed_city] = True
+                queue.append(changed_city)
+    # Rotate back to the starting city
+    start = search.position[tour[0]]
+    return search.tour[start:] + search.tour[:start]
+
+
+def solve_tsp(distances, start=0, construction="nearest", neighbors=10,
+              time_limit=None):
+    """
+    Find a short tour through every city with a construction heuristic
+    followed by local search.
+
+    Parameters
+    ----------
+    distances : array-like
+        n x n matrix of distances between the cities, which must be
+        finite.  It does not need to be symmetric.
+    start : int, optional
+        City the tour starts and ends at
+    construction : str, optional
+        "nearest" (default) to start from the nearest neighbor tour, or
+        "savings" for the Clarke-Wright savings heuristic
+    neighbors : int, optional
+        Number of nearest neighbors of each city the local search
+        tries to connect it to, 10 by default
+    time_limit : float, optional
+        Seconds the local search may run for
+
+    Returns
+    -------
+    cost : float
+        Total cost of the tour
+    tour : list of int
+        Cities in the order they are visited, starting at `start`
+
+    Raises
+    ------
+    ValueError
+        If `distances` is not square, or if `construction` is not
+        recognized
+
+    Examples
+    --------
+    >>> cost, tour = solve_tsp([[0, 1, 4, 1], [1, 0, 1, 4],
+    ...                         [4, 1, 0, 1], [1, 4, 1, 0]])
+    >>> cost, tour
+    (4.0, [0, 1, 2, 3])
+    """
+    distances = np.asarray(distances, dtype=float)
+    if distances.ndim != 2 or distances.shape[0] != distances.shape[1]:
+        raise ValueError("Distances must be a square matrix!")
+    if not len(distances):
+        return 0.0, []
+    candidates = neighbor_lists(distances, neighbors)
+    if construction == "nearest":
+        tour = nearest_neighbor_tour(distances, start)
+    elif construction == "savings":
+        tour = savings_tour(distances, start, candidates)
+    else:
+        raise ValueError("Argument 'construction' must be either 'nearest'"
+                         " or 'savings'!")
+    tour = improve_tour(distances, tour, candidates, time_limit)
+    return tour_cost(distances, tour), tour
@@ -0,0 +1,237 @@
+"""
+Spanning tree and connectivity kernels that run over arc arrays.
+
+Nodes are integer ids 0 through n - 1, and arcs are given as parallel
+arrays of from node ids, to node ids, and costs, as stored by
+:py:obj:`CompactGraph`.  Spanning trees treat every arc as undirected.
+"""
+
+from itertools import count
+import heapq
+
+import numpy as np
+
+
+def kruskal(num_nodes, sources, targets, costs):
+    """
+    Find a minimum spanning forest with Kruskal's Algorithm.
+
+    Arcs are sorted by cost once, then added in order unless their ends
+    are already joined.  Joined nodes are tracked with a union-find
+    structure (union by size with path halving), so the solve takes
+    :math:`O(E \\log E)` time for the sort plus nearly linear time for
+    the rest.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources : array-like of int
+        From node id of each arc
+    targets : array-like of int
+        To node id of each arc
+    costs : array-like
+        Cost of each arc
+
+    Returns
+    -------
+    numpy.ndarray
+        Positions of the arcs in the forest, in the order they were
+        added.  There are n - k of them for a graph with k connected
+        components.
+    """
+    order = np.argsort(np.asarray(costs), kind="stable")
+    parent = list(range(num_nodes))
+    size = [1] * num_nodes
+    tree_arcs = []
+    sources = np.asarray(sources)[order].tolist()
+    targets = np.asarray(targets)[order].tolist()
+    for arc, from_node, to_node in zip(order.tolist(), sources, targets):
+        # Find both roots, halving the paths along the way
+        while parent[from_node] != from_node:
+            parent[from_node] = from_node = parent[parent[from_node]]
+        while parent[to_node] != to_node:
+            parent[to_node] = to_node = parent[parent[to_node]]
+        if from_node == to_node:
+            continue
+        if size[from_node] < size[to_node]:
+            from_node, to_node = to_node, from_node
+        parent[to_node] = from_node
+        size[from_node] += size[to_node]
+        tree_arcs.append(arc)
+        if len(tree_arcs) == num_nodes - 1:
+            break
+    return np.array(tree_arcs, dtype=np.int64)
+
+
+def prim(num_nodes, sources, targets, costs):
+    """
+    Find a minimum spanning forest with Prim's Algorithm.
+
+    Grows a tree from one node at a time, using a binary heap with lazy
+    deletion to find the cheapest arc out of the tree, and starts a new
+    tree from the next unreached node when one runs out of arcs.  The
+    solve takes :math:`O(E \\log V)` time.
+
+    Parameters
+    ----------
+    num_nodes, sources, targets, costs
+        Arc arrays of the graph, as in :py:obj:`kruskal`
+
+    Returns
+    -------
+    numpy.ndarray
+        Positions of the arcs in the forest, in the order they were
+        added
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    num_arcs = len(sources)
+    # Undirected CSR arrays: every arc listed from both of its ends
+    ends = np.concatenate([sources, targets])
+    order = np.argsort(ends, kind="stable")
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=num_nodes), out=offsets[1:])
+    offsets = offsets.tolist()
+    neighbors = np.concatenate([targets, sources])[order].tolist()
+    arc_ids = (order % max(num_arcs, 1)).tolist()
+    arc_costs = np.concatenate([costs, costs])[order].tolist()
+    in_tree = [False] * num_nodes
+    # Cheapest arc cost seen into each node, so worse arcs are not pushed
+    best = [np.inf] * num_nodes
+    tree_arcs = []
+    tie_breaker = count()
+    for root in range(num_nodes):
+        if in_tree[root]:
+            continue
+        heap = [(0, next(tie_breaker), root, -1)]
+        while heap:
+            _, _, node, arc = heapq.heappop(heap)
+            if in_tree[node]:
+                continue
+            in_tree[node] = True
+            if arc != -1:
+                tree_arcs.append(arc)
+            start, end = offsets[node], offsets[node + 1]
+            for neighbor, cost, arc in zip(neighbors[start:end],
+                                           arc_costs[start:end],
+                                           arc_ids[start:end]):
+                if cost < best[neighbor] and not in_tree[neighbor]:
+                    best[neighbor] = cost
+                    heapq.heappush(heap, (cost, next(tie_breaker),
+                                          neighbor, arc))
+    return np.array(tree_arcs, dtype=np.int64)
+
+
+def connected_components(num_nodes, sources, targets):
+    """
+    Label the connected components of a graph, ignoring arc directions.
+
+    Works on whole arrays: every round hooks the root of each arc's
+    larger label onto the smaller label, then shortcuts every node
+    straight to its root (pointer jumping), until no arc joins two
+    different labels.
+
+    Parameters
+    ----------
+    num_nodes : int
+        Number of nodes, with ids 0 through n - 1
+    sources, targets : array-like of int
+        From and to node id of each arc
+
+    Returns
+    -------
+    numpy.ndarray
+        Component number of each node, from 0 to k - 1, numbered in
+        order of each component's lowest node id
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    labels = np.arange(num_nodes)
+    while True:
+        from_labels, to_labels = labels[sources], labels[targets]
+        joins = from_labels != to_labels
+        if not joins.any():
+            break
+        from_labels, to_labels = from_labels[joins], to_labels[joins]
+        # Labels are always roots here, so this only moves roots
+        np.minimum.at(labels, np.maximum(from_labels, to_labels),
+                      np.minimum(from_labels, to_labels))
+        while True:
+            jumped = labels[labels]
+            if (jumped == labels).all():
+                break
+            labels = jumped
+        # Drop arcs already inside one component
+        sources, targets = sources[joins], targets[joins]
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def strongly_connected_components(offsets, targets):
+    """
+    Label the strongly connected components of a directed graph with
+    Tarjan's Algorithm, in linear time.
+
+    The depth-first search keeps its own stack, so deep graphs do not
+    hit Python's recursion limit.
+
+    Parameters
+    ----------
+    offsets : numpy.ndarray
+        Array of length n + 1 with the start of each node's arcs
+    targets : numpy.ndarray
+        Array of length m with the to node id of each arc
+
+    Returns
+    -------
+    numpy.ndarray
+        Component number of each node, from 0 to k - 1.  Components
+        are numbered in reverse topological order, so arcs between
+        components always go from a higher number to a lower one.
+    """
+    num_nodes = len(offsets) - 1
+    offsets = offsets.tolist() if isinstance(offsets, np.ndarray) else offsets
+    targets = targets.tolist() if isinstance(targets, np.ndarray) else targets
+    index = [-1] * num_nodes
+    low = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    component = [-1] * num_nodes
+    stack = []
+    num_found = 0
+    counter = count()
+    for root in range(num_nodes):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = next(counter)
+        stack.append(root)
+        on_stack[root] = True
+        # Each frame is a node and the position of its next arc
+        frames = [[root, offsets[root]]]
+        while frames:
+            frame = frames[-1]
+            node, position = frame
+            if position < offsets[node + 1]:
+                frame[1] += 1
+                to_node = targets[position]
+                if index[to_node] == -1:
+                    index[to_node] = low[to_node] = next(counter)
+                    stack.append(to_node)
+                    on_stack[to_node] = True
+                    frames.append([to_node, offsets[to_node]])
+                elif on_stack[to_node]:
+                    low[node] = min(low[node], index[to_node])
+                continue
+            frames.pop()
+            if frames:
+                parent = frames[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                # Node is the root of a component - pop it off the stack
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = num_found
+                    if member == node:
+                        break
+                num_found += 1
+    return np.array(component, dtype=np.int64)
@@ -0,0 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ormm.network import Graph, CompactGraph, GraphSnapshot
+from tests.test_network_flow import SIMPLE_ARCS
+
+
+def test_compact_from_graph():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    graph.nodes.add("G")
+    compact = graph.to_compact()
+    assert compact.num_nodes == 7
+    assert compact.num_arcs == sum(len(arcs) for arcs in graph.arcs.values())
+    assert set(compact.labels.tolist()) == graph.nodes
+    assert len(compact.offsets) == compact.num_nodes + 1
+    for node in graph.nodes:
+        node_id = compact.index[node]
+        start, end = compact.offsets[node_id], compact.offsets[node_id + 1]
+        arcs = {compact.labels[to_id]: cost for to_id, cost in
+                zip(compact.targets[start:end], compact.costs[start:end])}
+        assert arcs == {to_node: graph.costs[(node, to_node)]
+                        for to_node in graph.arcs.get(node, [])}
+    assert compact.shortest_path("A") == graph.shortest_path("A")
+    assert compact.shortest_path("G") == {"Costs": {"G": 0},
+                                          "Paths": {"G": ("G",)}}
+    with pytest.raises(ValueError):
+        compact.shortest_path("Z")
+
+
+def test_compact_from_arcs():
+    compact = CompactGraph.from_arcs(["A", "B", "A", "C"],
+                                     ["B", "C", "B", "A"],
+                                     [1, 2, 5, 4],
+                                     ["one", "one", "one", "two"])
+    assert compact.labels.tolist() == ["A", "B", "C"]
+    assert compact.offsets.tolist() == [0, 2, 3, 4]
+    assert compact.targets.tolist() == [1, 2, 2, 0]
+    assert compact.costs.tolist() == [5, 4, 2, 4]
+    assert compact.sources.tolist() == [0, 0, 1, 2]
+    assert compact.targets.dtype == np.int32
+    # Arcs are bi-directional without directions, as in Graph.add_arcs
+    arcs = [["A", "B", 1], ["B", "C", 2], ["A", "C", 5]]
+    graph = Graph()
+    graph.add_arcs(arcs)
+    compact = CompactGraph.from_arcs(*zip(*arcs))
+    assert compact.shortest_path("C") == graph.to_compact().shortest_path("C")
+    assert compact.num_arcs == 6
+    with pytest.raises(ValueError):
+        CompactGraph.from_arcs(["A"], ["B", "C"], [1])
+
+
+def test_compact_save_load(tmp_path):
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    graph.nodes.add(7)
+    compact = graph.to_compact()
+    compact.save(tmp_path / "mixed")
+    loaded = CompactGraph.load(tmp_path / "mixed")
+    assert loaded.labels.tolist() == compact.labels.tolist()
+    assert loaded.shortest_path("A") == compact.shortest_path("A")
+    graph.nodes.remove(7)
+    graph.save(tmp_path / "graph")
+    mapped = CompactGraph.load(tmp_path / "graph", mmap_mode="r")
+    for name in ["labels", "offsets", "targets", "costs"]:
+        assert isinstance(getattr(mapped, name), np.memmap)
+    assert mapped.labels.dtype.kind == "U"
+    assert mapped.shortest_path("A") == graph.shortest_path("A")
+    loaded_graph = Graph.load(tmp_path / "graph")
+    assert dict(loaded_graph.arcs) == dict(graph.arcs)
+    assert loaded_graph.costs == graph.costs
+    assert loaded_graph.nodes == graph.nodes
+
+
+def test_compact_capacities(tmp_path):
+    graph = Graph()
+    graph.add_arcs(pd.DataFrame({"From": ["A", "B", "A"],
+                                 "To": ["B", "C", "C"],
+                                 "Cost": [1, 2, 3],
+                                 "Direction": ["one", "two", "one"],
+                                 "Capacity": [5, np.nan, 2]}))
+    compact = graph.to_compact()
+    assert compact.capacities.tolist() == [5, 2, np.inf, np.inf]
+    assert compact.reverse().capacities.tolist() == [5, np.inf, 2, np.inf]
+    graph.save(tmp_path / "graph")
+    loaded = Graph.load(tmp_path / "graph")
+    assert loaded.capacities == graph.capacities
+    assert loaded.max_flow("A", "B")["Flow"] == 7
+    assert Graph().to_compact().capacities is None
+    # Capacities are read in order only from exactly five columns
+    graph = Graph()
+    graph.add_arcs([["A", "B", 1, "one", 5], ["B", "C", 2, "two", 4]])
+    assert graph.capacities == {("A", "B"): 5, ("B", "C"): 4,
+                                ("C", "B"): 4}
+    graph = Graph()
+    graph.add_arcs(np.array([["A", "B", 1, "one", "x", "y"],
+                             ["B", "C", 2, "two", "z", "w"]], dtype=object))
+    assert graph.capacities == {}
+    assert graph.costs == {("A", "B"): 1, ("B", "C"): 2, ("C", "B"): 2}
+
+
+def test_graph_snapshot(tmp_path):
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    snapshot = graph.snapshot(hierarchy=True)
+    assert isinstance(snapshot, CompactGraph)
+    with pytest.raises(ValueError):
+        snapshot.costs[0] = 100
+    with pytest.raises(AttributeError):
+        snapshot.costs = np.zeros(snapshot.num_arcs)
+    # Hashable, and equal to other snapshots of the same graph
+    assert snapshot == graph.snapshot() and snapshot is not graph.snapshot()
+    assert len({snapshot, graph.snapshot()}) == 1
+    graph.save(tmp_path)
+    loaded = GraphSnapshot.load(tmp_path, mmap_mode="r")
+    assert loaded == snapshot and hash(loaded) == hash(snapshot)
+    expected = graph.shortest_path_to("A", "F")
+    assert snapshot.shortest_path_to("A", "F", method="hierarchy") == \
+        expected
+    assert snapshot.shortest_path_to("A", "F", method="bidirectional") == \
+        expected
+    with pytest.raises(ValueError):
+        loaded.shortest_path_to("A", "F", method="hierarchy")
+    # Queries from many threads, while the graph changes
+    sources = sorted(graph.nodes) * 20
+
+    def query(source):
+        return snapshot.shortest_path(source)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = pool.map(query, sources)
+        graph.add_arcs([["A", "F", 1, "two"]])
+        changed = graph.snapshot()
+        for source, result in zip(sources, results):
+            assert result == loaded.shortest_path(source)
+    assert changed != snapshot
+    assert changed.shortest_path_to("A", "F")["Cost"] == 1
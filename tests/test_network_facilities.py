@@ -0,0 +1,87 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from ormm.network import facility_location_model, Graph, solve_p_median
+
+# Line of nodes, with a node off the end that cannot reach the rest
+LINE_ARCS = [["A", "B", 1, "two"],
+             ["B", "C", 4, "two"],
+             ["C", "D", 1, "two"],
+             ["D", "E", 2, "one"]]
+NODES = ["A", "B", "C", "D"]
+
+
+def test_solve_p_median():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        distances = rng.random((9, 15)) * 10
+        weights = rng.integers(1, 5, 15)
+        p = int(rng.integers(1, 5))
+        best = min((distances[list(facilities)].min(axis=0) * weights).sum()
+                   for facilities in combinations(range(9), p))
+        cost, facilities, assignment = solve_p_median(distances, p, weights)
+        assert len(set(facilities.tolist())) == p
+        assert set(assignment.tolist()) <= set(facilities.tolist())
+        assert cost == pytest.approx(
+            (distances[assignment, np.arange(15)] * weights).sum())
+        assert cost >= best - 1e-9
+        # No single swap of a facility lowers the cost
+        for facility in facilities.tolist():
+            for candidate in set(range(9)) - set(facilities.tolist()):
+                swapped = np.where(facilities == facility, candidate,
+                                   facilities)
+                assert (distances[swapped].min(axis=0) * weights).sum() \
+                    >= cost - 1e-9
+    with pytest.raises(ValueError):
+        solve_p_median(distances, 10)
+    with pytest.raises(ValueError):
+        solve_p_median(distances, 0)
+
+
+def test_graph_p_median():
+    graph = Graph()
+    graph.add_arcs(LINE_ARCS)
+    distances = graph.distance_matrix(NODES, NODES + ["E"], processes=1)
+    assert distances.loc["A", "D"] == 6 and distances.loc["A", "E"] == 8
+    results = graph.solve_p_median(NODES, NODES, 2, demand={"A": 2, "D": 2},
+                                   distances=distances)
+    assert results["OBJ"] == 2
+    assert sorted(results["Facilities"]) == ["A", "D"]
+    assert results["Assignment"] == {"A": "A", "B": "A", "C": "D", "D": "D"}
+    # Nothing can be reached from "E"
+    results = graph.solve_p_median(["E"], NODES, 1, processes=1)
+    assert results["OBJ"] == np.inf
+    assert graph.distance_matrix(["E"], processes=1).loc["E", "A"] == \
+        np.inf
+    with pytest.raises(ValueError):
+        graph.distance_matrix(["Z"])
+
+
+def test_facility_location_model():
+    graph = Graph()
+    graph.add_arcs(LINE_ARCS)
+    instance = graph.facility_location(
+        NODES + ["E"], NODES, num_facilities=2, demand={"A": 2},
+        capacities={"A": 3}, fixed_costs={"B": 5}, processes=1)
+    # No paths from "E" to the customers, so it serves none of them
+    pairs = {(facility, customer) for facility in NODES
+             for customer in NODES}
+    assert set(instance.Pairs) == pairs
+    assert set(instance.Assign) == pairs
+    assert len(instance.OpenConstraint) == len(pairs)
+    assert list(instance.CapacityConstraint) == ["A"]
+    assert instance.NumFacilities.value == 2
+    assert instance.Distances["A", "D"] == 6
+    assert instance.Demand["B"] == 1 and instance.FixedCosts["B"] == 5
+    # Without a count or capacities, those constraints are skipped
+    instance = graph.facility_location(NODES, NODES, processes=1)
+    assert len(instance.CountConstraint) == 0
+    assert len(instance.CapacityConstraint) == 0
+    # Pairs default to every facility and customer pair
+    instance = facility_location_model(data={None: {
+        "Facilities": ["F1", "F2"], "Customers": ["C1", "C2", "C3"],
+        "Distances": {(facility, customer): 1 for facility in ["F1", "F2"]
+                      for customer in ["C1", "C2", "C3"]}}})
+    assert len(instance.Assign) == 6
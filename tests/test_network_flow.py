@@ -2,7 +2,9 @@ import time
 import random
 
 import pyomo.environ as pyo
+import numpy as np
 import pandas as pd
+import pytest
 
 from ormm.network import transportation_model, Graph
 from tests.methods import solve_instance
@@ -56,6 +58,23 @@ def test_transportation_model():
                         ('S3', 'D5'): 0.0}
 
 
+def test_transportation_sparse_lanes():
+    # Drop half of the lanes and add arcs that are not lanes
+    sparse_arcs = ARC_DATA[ARC_DATA["Cost"] < 12]
+    graph = Graph()
+    graph.add_arcs(sparse_arcs)
+    graph.add_arcs([["D1", "S1", 1, "one"], ["S1", "S2", 1, "two"]])
+    instance = graph.transportation(SUPPLY, DEMAND)
+    lanes = {(source, dest) for source, dest in
+             zip(sparse_arcs["From"], sparse_arcs["To"])}
+    assert set(instance.Lanes) == lanes
+    assert set(instance.Flows) == lanes
+    assert set(instance.ShippingCosts) == lanes
+    # Lanes default to every source and destination pair
+    instance = transportation_model(filename=TRANSPORTATION_DATA)
+    assert len(instance.Flows) == len(SUPPLY) * len(DEMAND)
+
+
 def huge_transportation_model():
     # Define large random datasets
     num_nodes = 1_000
@@ -129,6 +148,68 @@ def test_add_arcs_input_types():
         assert paths == test_paths
 
 
+def test_add_arcs_bulk_matches_single_arcs():
+    arcs = SIMPLE_ARCS + [["C", "B", 4, "two"], ["A", "B", 2, "one"],
+                          ["G", "A", 1, "one"]]
+    graph_bulk = Graph()
+    graph_bulk.add_arcs(np.array(arcs, dtype=object))
+    graph_bulk.add_arcs([])
+    graph_single = Graph()
+    for arc in arcs:
+        graph_single._add_arc(*arc)
+    assert dict(graph_bulk.arcs) == dict(graph_single.arcs)
+    assert list(graph_bulk.costs.items()) == \
+        list(graph_single.costs.items())
+    assert graph_bulk.nodes == graph_single.nodes
+    assert graph_bulk.arcs["C"] == ["F", "B"]
+    assert graph_bulk.costs[("A", "B")] == 2
+    assert graph_bulk.costs[("B", "C")] == 4
+    # Rows without a direction are bi-directional, as when added one by
+    #  one, but a given None is one-directional
+    graph = Graph()
+    graph.add_arcs([["A", "B", 1], ["B", "C", 2, "two"],
+                    ["C", "D", 3, None]])
+    assert set(graph.costs) == {("A", "B"), ("B", "A"), ("B", "C"),
+                                ("C", "B"), ("C", "D")}
+    with pytest.raises(ValueError):
+        Graph().add_arcs(pd.DataFrame([["A", "B"]]))
+    with pytest.raises(TypeError):
+        Graph().add_arcs(5)
+
+
+def test_read_arcs(tmp_path):
+    arcs_file = tmp_path / "arcs.csv"
+    pd.DataFrame(SIMPLE_ARCS, columns=["from_node", "To", "Cost",
+                                       "Direction"]).to_csv(arcs_file,
+                                                            index=False)
+    graph_file = Graph()
+    graph_file.read_arcs(arcs_file, chunksize=4)
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    assert dict(graph_file.arcs) == dict(graph.arcs)
+    assert graph_file.costs == graph.costs
+    # Columns read in order when there is no header
+    arcs_file = tmp_path / "arcs.txt"
+    pd.DataFrame(SIMPLE_ARCS).to_csv(arcs_file, index=False, header=False)
+    graph_file = Graph()
+    graph_file.read_arcs(arcs_file, chunksize=4, header=None)
+    assert graph_file.costs == graph.costs
+    with pytest.raises(ValueError):
+        graph_file.read_arcs(arcs_file, file_type="dat")
+
+
+def test_read_arcs_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    arcs_file = tmp_path / "arcs.parquet"
+    pd.DataFrame(SIMPLE_ARCS, columns=["From", "To", "Cost",
+                                       "Direction"]).to_parquet(arcs_file)
+    graph_file = Graph()
+    graph_file.read_arcs(arcs_file, chunksize=4)
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    assert graph_file.costs == graph.costs
+
+
 def test_shortest_path_simple():
     graph = Graph()
     graph.add_arcs(SIMPLE_ARCS)
@@ -142,6 +223,19 @@ def test_shortest_path_simple():
     assert paths == test_paths
 
 
+def test_shortest_path_unreachable():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS + [["G", "A", 1, "one"]])
+    analysis = graph.shortest_path("A")
+    assert "G" not in analysis["Costs"]
+    assert "G" not in analysis["Paths"]
+    analysis = graph.shortest_path("B")
+    assert analysis["Costs"] == {'B': 0, 'C': 3, 'F': 13}
+    assert analysis["Paths"]["F"] == ('B', 'C', 'F')
+    with pytest.raises(ValueError):
+        graph.shortest_path("Z")
+
+
 if __name__ == "__main__":
     # huge_transportation_model()
     test_transportation_model()
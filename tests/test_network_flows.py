@@ -0,0 +1,332 @@
+import numpy as np
+from pyomo.core.expr.visitor import identify_variables
+import pytest
+
+from ormm.network import Graph, linear_assignment, max_flow, \
+    multicommodity_flow_model, network_simplex, solve_transportation
+from tests.test_network_flow import ARC_DATA, SUPPLY, DEMAND
+
+# Two plants shipping to two customers, directly or through a cross-dock
+CROSS_DOCK_ARCS = [["P1", "X", 2, "one", 20],
+                   ["P2", "X", 3, "one", 20],
+                   ["X", "C1", 1, "one", 15],
+                   ["X", "C2", 2, "one", 8],
+                   ["P1", "C1", 6, "one", 10],
+                   ["P2", "C2", 7, "one", 10]]
+CROSS_DOCK_SUPPLY = {"P1": 15, "P2": 10, "C1": -12, "C2": -13}
+
+
+def test_solve_transportation():
+    graph = Graph()
+    graph.add_arcs(ARC_DATA)
+    results = graph.solve_transportation(SUPPLY, DEMAND)
+    assert results["OBJ"] == 475
+    flows = results["Flows"]
+    assert set(flows) == {(source, dest) for source in SUPPLY
+                          for dest in DEMAND}
+    for source, supply in SUPPLY.items():
+        assert sum(flows[(source, dest)] for dest in DEMAND) == supply
+    for dest, demand in DEMAND.items():
+        assert sum(flows[(source, dest)] for source in SUPPLY) == demand
+    # Duals satisfy complementary slackness
+    u, v = results["SupplyConstraint"], results["DemandConstraint"]
+    for (source, dest), flow in flows.items():
+        reduced = graph.costs[(source, dest)] - u[source] - v[dest]
+        assert reduced >= -1e-9
+        if flow > 0:
+            assert reduced == pytest.approx(0)
+    assert sum(u[source] * SUPPLY[source] for source in SUPPLY) + \
+        sum(v[dest] * DEMAND[dest] for dest in DEMAND) == \
+        pytest.approx(475)
+    # Same answer from a cost matrix
+    matrix = [[graph.costs[(source, dest)] for dest in DEMAND]
+              for source in SUPPLY]
+    assert solve_transportation(SUPPLY, DEMAND, matrix)["OBJ"] == 475
+    with pytest.raises(ValueError):
+        graph.solve_transportation({"S1": 15, "S9": 15}, DEMAND)
+
+
+def test_solve_transportation_infeasible():
+    with pytest.raises(ValueError):
+        solve_transportation({"A": 10}, {"B": 5}, {("A", "B"): 1})
+    # The only lane to "C" is forbidden
+    with pytest.raises(ValueError):
+        solve_transportation({"A": 5, "B": 5}, {"C": 5, "D": 5},
+                             [[np.inf, 1], [np.nan, 2]])
+
+
+def test_network_simplex():
+    scipy_optimize = pytest.importorskip("scipy.optimize")
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        num_nodes, num_arcs = 12, 40
+        sources = rng.integers(0, num_nodes, num_arcs)
+        targets = (sources + rng.integers(1, num_nodes, num_arcs)) % num_nodes
+        costs = rng.integers(0, 20, num_arcs).astype(float)
+        capacities = rng.integers(5, 30, num_arcs).astype(float)
+        supplies = rng.integers(-10, 10, num_nodes).astype(float)
+        supplies[-1] -= supplies.sum()
+        incidence = np.zeros((num_nodes, num_arcs))
+        incidence[sources, np.arange(num_arcs)] = 1
+        incidence[targets, np.arange(num_arcs)] = -1
+        expected = scipy_optimize.linprog(
+            costs, A_eq=incidence, b_eq=supplies,
+            bounds=list(zip(np.zeros(num_arcs), capacities)),
+            method="highs")
+        if expected.status != 0:
+            with pytest.raises(ValueError):
+                network_simplex(num_nodes, sources, targets, costs,
+                                supplies, capacities)
+            continue
+        flows, potentials = network_simplex(num_nodes, sources, targets,
+                                            costs, supplies, capacities)
+        assert flows @ costs == pytest.approx(expected.fun)
+        np.testing.assert_allclose(incidence @ flows, supplies)
+        assert (flows >= 0).all() and (flows <= capacities).all()
+        reduced = costs - potentials[sources] + potentials[targets]
+        assert (reduced[flows < capacities] >= -1e-9).all()
+        assert (reduced[flows > 0] <= 1e-9).all()
+
+
+def test_network_simplex_unbounded():
+    # Negative cycle between 1 and 2 with no capacity limit
+    with pytest.raises(ValueError):
+        network_simplex(3, [0, 1, 2], [1, 2, 1], [1, -2, 1], [1, -1, 0])
+    flows, _ = network_simplex(3, [0, 1, 2], [1, 2, 1], [1, -2, 1],
+                               [1, -1, 0], capacities=[5, 5, 5])
+    assert flows.tolist() == [1, 5, 5]
+
+
+def test_transshipment(caplog):
+    graph = Graph()
+    graph.add_arcs(CROSS_DOCK_ARCS)
+    graph.nodes.update(["Z", "Y"])
+    instance = graph.transshipment(CROSS_DOCK_SUPPLY)
+    # Built from ordered data, without Pyomo's warning about sets
+    assert "nondeterministic" not in caplog.text
+    assert list(instance.Arcs) == list(graph.costs)
+    # Nodes in order of the arcs, then the nodes without arcs
+    assert list(instance.Nodes) == ["P1", "X", "P2", "C1", "C2", "Y", "Z"]
+    assert list(instance.FlowBalanceConstraint) == ["P1", "X", "P2", "C1",
+                                                    "C2"]
+    assert instance.Supply["X"] == 0
+    assert instance.Flows["X", "C2"].bounds == (0, 8)
+    # Only the arcs into and out of a node are in its constraint
+    assert len(list(identify_variables(
+        instance.FlowBalanceConstraint["X"].body))) == 4
+    results = graph.solve_transshipment(CROSS_DOCK_SUPPLY)
+    # The cross-dock to C2 is full, so the rest ships directly
+    assert results["OBJ"] == 108
+    flows = results["Flows"]
+    assert flows[("X", "C2")] == 8 and flows[("P2", "C2")] == 5
+    for node, supply in CROSS_DOCK_SUPPLY.items():
+        assert sum(flow for (from_node, _), flow in flows.items()
+                   if from_node == node) - \
+            sum(flow for (_, to_node), flow in flows.items()
+                if to_node == node) == supply
+    duals = results["FlowBalanceConstraint"]
+    assert sum(duals[node] * supply
+               for node, supply in CROSS_DOCK_SUPPLY.items()) - \
+        8 * (duals["X"] - duals["C2"] - 2) == pytest.approx(108)
+    # Same as the transportation problem on a bipartite graph
+    graph = Graph()
+    graph.add_arcs(ARC_DATA)
+    supply = {**SUPPLY, **{dest: -demand for dest, demand in DEMAND.items()}}
+    assert graph.solve_transshipment(supply)["OBJ"] == 475
+    with pytest.raises(ValueError):
+        graph.solve_transshipment({"S1": 15, "D9": -15})
+    with pytest.raises(ValueError):
+        graph.transshipment({"S9": 15})
+
+
+def test_multicommodity_flow_model(caplog):
+    graph = Graph()
+    graph.add_arcs(CROSS_DOCK_ARCS)
+    commodities = {"Bikes": {"P1": 12, "C1": -12},
+                   "Parts": {"P2": 10, "C1": -4, "C2": -6}}
+    instance = graph.multicommodity_flow(commodities)
+    assert "nondeterministic" not in caplog.text
+    assert list(instance.Commodities) == ["Bikes", "Parts"]
+    assert set(instance.Flows) == {(commodity, *arc)
+                                   for commodity in commodities
+                                   for arc in graph.costs}
+    assert len(instance.FlowBalanceConstraint) == 2 * len(graph.nodes)
+    assert instance.Supply["Parts", "C2"] == -6
+    assert instance.Supply["Bikes", "C2"] == 0
+    assert set(instance.BundleConstraint) == set(graph.costs)
+    # Arcs without a capacity have no bundle constraint
+    instance = multicommodity_flow_model(data={None: {
+        "Commodities": ["K"], "Nodes": ["A", "B"], "Arcs": [("A", "B")],
+        "Costs": {("A", "B"): 1}, "Supply": {("K", "A"): 1, ("K", "B"): -1}}})
+    assert len(instance.BundleConstraint) == 0
+    with pytest.raises(ValueError):
+        graph.multicommodity_flow({"Bikes": {"P9": 12, "C1": -12}})
+
+
+def test_solve_multicommodity_flow():
+    graph = Graph()
+    graph.add_arcs(CROSS_DOCK_ARCS)
+    # Without binding capacities, each commodity takes its shortest paths
+    results = graph.solve_multicommodity_flow(
+        {"Bikes": {"P1": 12, "C1": -12},
+         "Parts": {"P2": 10, "C1": -2, "C2": -6, "X": -2}})
+    assert results["OBJ"] == results["LowerBound"] == 12 * 3 + 2 * 4 + \
+        6 * 5 + 2 * 3
+    assert results["Violation"] == 0
+    assert results["Paths"]["Bikes"] == {("P1", "X", "C1"): 12}
+    assert results["Flows"]["Parts"][("P2", "X")] == 10
+    # Both commodities want the cross-dock to C2, which only fits 8
+    results = graph.solve_multicommodity_flow(
+        {"Bikes": {"P1": 6, "C2": -6}, "Parts": {"P2": 7, "C2": -7}})
+    assert results["LowerBound"] <= 6 * 4 + 7 * 5 + 5 * 2 + 1e-9
+    assert results["OBJ"] == pytest.approx(6 * 4 + 7 * 5 + 5 * 2, rel=1e-2)
+    assert results["Violation"] < 0.1
+    for commodity, paths in results["Paths"].items():
+        assert sum(paths.values()) == pytest.approx(
+            6 if commodity == "Bikes" else 7)
+    with pytest.raises(ValueError):
+        graph.solve_multicommodity_flow({"Bikes": {"P1": 6, "P2": 6,
+                                                   "C2": -12}})
+    with pytest.raises(ValueError):
+        graph.solve_multicommodity_flow({"Bikes": {"P1": 6, "C2": -5}})
+    with pytest.raises(ValueError):
+        graph.solve_multicommodity_flow({"Bikes": {"C1": 6, "P1": -6}})
+
+
+def test_solve_multicommodity_flow_random():
+    scipy_optimize = pytest.importorskip("scipy.optimize")
+    rng = np.random.default_rng(0)
+    # Grid of nodes, with arcs both ways between neighbors
+    side = 5
+    arcs = []
+    for row in range(side):
+        for col in range(side):
+            node = row * side + col
+            for neighbor in ([node + 1] if col + 1 < side else []) + \
+                    ([node + side] if row + 1 < side else []):
+                arcs.append([node, neighbor, int(rng.integers(1, 10)),
+                             "two", int(rng.integers(5, 25))])
+    graph = Graph()
+    graph.add_arcs(arcs)
+    arc_list = list(graph.costs)
+    commodities = {}
+    for commodity in range(6):
+        origin, destination = rng.choice(side * side, 2, replace=False)
+        demand = int(rng.integers(5, 20))
+        commodities[commodity] = {int(origin): demand,
+                                  int(destination): -demand}
+    # Node-arc incidence matrix of each commodity, side by side
+    num_nodes, num_arcs = side * side, len(arc_list)
+    incidence = np.zeros((num_nodes, num_arcs))
+    for arc, (from_node, to_node) in enumerate(arc_list):
+        incidence[from_node, arc], incidence[to_node, arc] = 1, -1
+    supplies = np.zeros((len(commodities), num_nodes))
+    for commodity, supply in commodities.items():
+        for node, amount in supply.items():
+            supplies[commodity, node] = amount
+    expected = scipy_optimize.linprog(
+        np.tile([graph.costs[arc] for arc in arc_list], len(commodities)),
+        A_ub=np.tile(np.eye(num_arcs), len(commodities)),
+        b_ub=[graph.capacities[arc] for arc in arc_list],
+        A_eq=np.kron(np.eye(len(commodities)), incidence),
+        b_eq=supplies.ravel(), method="highs")
+    assert expected.status == 0
+    results = graph.solve_multicommodity_flow(commodities)
+    assert results["LowerBound"] <= expected.fun + 1e-6
+    assert results["OBJ"] == pytest.approx(expected.fun, rel=1e-2)
+    assert results["Violation"] < 0.5
+    for commodity, supply in commodities.items():
+        flows = np.array([results["Flows"][commodity].get(arc, 0)
+                          for arc in arc_list])
+        np.testing.assert_allclose(incidence @ flows, supplies[commodity],
+                                   atol=1e-9)
+
+
+def test_max_flow():
+    graph = Graph()
+    graph.add_arcs([["S", "A", 1, "one", 20], ["S", "B", 1, "one", 5],
+                    ["A", "B", 1, "one", 15], ["A", "T", 1, "one", 5],
+                    ["B", "T", 1, "one", 10], ["B", "C", 1, "two", 3]])
+    assert graph.capacities[("C", "B")] == 3
+    results = graph.max_flow("S", "T")
+    assert results["Flow"] == 15
+    assert results["SourceSide"] == {"S", "A", "B", "C"}
+    assert sorted(results["Cut"]) == [("A", "T"), ("B", "T")]
+    flows = results["Flows"]
+    assert flows[("A", "T")] == 5 and flows[("B", "T")] == 10
+    for node in ["A", "B", "C"]:
+        assert sum(flow for (from_node, _), flow in flows.items()
+                   if from_node == node) == \
+            sum(flow for (_, to_node), flow in flows.items()
+                if to_node == node)
+    # Arcs without a capacity have no limit
+    graph.add_arcs([["S", "T", 1, "one"]])
+    with pytest.raises(ValueError):
+        graph.max_flow("S", "T")
+    assert graph.max_flow("A", "T")["Flow"] == 15
+    with pytest.raises(ValueError):
+        graph.max_flow("S", "Z")
+
+
+def test_max_flow_random():
+    csgraph = pytest.importorskip("scipy.sparse.csgraph")
+    sparse = pytest.importorskip("scipy.sparse")
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        num_nodes, num_arcs = 30, 150
+        sources = rng.integers(0, num_nodes, num_arcs)
+        targets = (sources + rng.integers(1, num_nodes, num_arcs)) % num_nodes
+        capacities = rng.integers(0, 20, num_arcs)
+        matrix = sparse.csr_matrix((capacities, (sources, targets)),
+                                   shape=(num_nodes, num_nodes))
+        expected = csgraph.maximum_flow(matrix, 0, num_nodes - 1)
+        value, flows, source_side = max_flow(num_nodes, sources, targets,
+                                             capacities, 0, num_nodes - 1)
+        assert value == expected.flow_value
+        assert (flows >= 0).all() and (flows <= capacities).all()
+        cut = source_side[sources] & ~source_side[targets]
+        assert capacities[cut].sum() == value
+
+
+def test_assignment():
+    graph = Graph()
+    graph.add_arcs(ARC_DATA)
+    sources, destinations = list(SUPPLY), list(DEMAND)
+    results = graph.assignment(sources, destinations)
+    # Three sources, so three of the five destinations are used
+    assert results["OBJ"] == 25
+    assert results["Assignment"] == {"S1": "D4", "S2": "D5", "S3": "D1"}
+    # Arcs only go from sources to destinations
+    with pytest.raises(ValueError):
+        graph.assignment(destinations[:3], sources)
+    # Every pair needs an arc
+    graph = Graph()
+    graph.add_arcs([["A", "X", 1, "one"], ["B", "X", 2, "one"],
+                    ["B", "Y", 5, "one"], ["C", "X", 1, "one"]])
+    assert graph.assignment(["A", "B"], ["X", "Y"]) == \
+        {"OBJ": 6, "Assignment": {"A": "X", "B": "Y"}}
+    assert graph.assignment(["A", "B"], ["X"])["Assignment"] == {"A": "X"}
+    with pytest.raises(ValueError):
+        graph.assignment(["A", "C"], ["X", "Y"])
+    with pytest.raises(ValueError):
+        graph.assignment(["A", "Z"], ["X", "Y"])
+
+
+def test_linear_assignment():
+    scipy_optimize = pytest.importorskip("scipy.optimize")
+    rng = np.random.default_rng(0)
+    for num_rows, num_cols in [(8, 8), (5, 9), (9, 5), (40, 40)]:
+        for _ in range(10):
+            costs = rng.integers(0, 10, (num_rows, num_cols)).astype(float)
+            costs[rng.random(costs.shape) < 0.2] = np.inf
+            try:
+                rows, cols = scipy_optimize.linear_sum_assignment(costs)
+            except ValueError:
+                with pytest.raises(ValueError):
+                    linear_assignment(costs)
+                continue
+            row_ids, col_ids = linear_assignment(costs)
+            assert costs[row_ids, col_ids].sum() == costs[rows, cols].sum()
+            assert len(set(row_ids.tolist())) == len(set(col_ids.tolist())) \
+                == min(num_rows, num_cols)
+            assert (np.diff(row_ids) > 0).all()
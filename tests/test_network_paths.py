@@ -0,0 +1,386 @@
+import numpy as np
+import pytest
+
+from ormm.network import CompactGraph, ContractionHierarchy, Graph, \
+    NegativeCycleError, ShortestPathTree
+from tests.test_network_flow import SIMPLE_ARCS
+
+
+def random_graph(num_nodes=40, num_arcs=150, seed=0):
+    rng = np.random.default_rng(seed)
+    arcs = [[int(from_node), int(to_node), int(cost), direction]
+            for from_node, to_node, cost, direction in zip(
+                rng.integers(0, num_nodes, num_arcs),
+                rng.integers(0, num_nodes, num_arcs),
+                rng.integers(1, 20, num_arcs),
+                rng.choice(["one", "two"], num_arcs))]
+    graph = Graph()
+    graph.add_arcs(arcs)
+    return graph
+
+
+def test_all_pairs_shortest_path():
+    graph = random_graph()
+    results = [graph.all_pairs_shortest_path(method, predecessors=True,
+                                             processes=processes)
+               for method, processes in [("floyd_warshall", None),
+                                         ("dijkstra", 1),
+                                         ("dijkstra", 2)]]
+    nodes = results[0]["Nodes"].tolist()
+    for node_id, node in enumerate(nodes):
+        costs = graph.shortest_path(node)["Costs"]
+        row = np.full(len(nodes), np.inf)
+        row[[nodes.index(to_node) for to_node in costs]] = list(
+            costs.values())
+        for result in results:
+            np.testing.assert_array_equal(result["Costs"][node_id], row)
+    # Following predecessors back gives the minimum cost
+    costs, pred = results[0]["Costs"], results[0]["Predecessors"]
+    compact = graph.to_compact()
+    arc_costs = dict(zip(zip(compact.sources.tolist(),
+                             compact.targets.tolist()),
+                         compact.costs.tolist()))
+    for source, target in [(0, 5), (3, 17), (10, 2)]:
+        total, node = 0, target
+        while pred[source, node] != -1:
+            total += arc_costs[(pred[source, node], node)]
+            node = pred[source, node]
+        assert node == source and total == costs[source, target]
+    with pytest.raises(ValueError):
+        graph.all_pairs_shortest_path("bellman")
+
+
+def test_all_pairs_negative_costs():
+    graph = Graph()
+    graph.add_arcs([["A", "B", 4, "one"], ["B", "C", -2, "one"],
+                    ["A", "C", 3, "one"]])
+    result = graph.all_pairs_shortest_path("floyd_warshall")
+    assert result["Costs"][0].tolist() == [0, 4, 2]
+    with pytest.raises(ValueError):
+        graph.all_pairs_shortest_path("dijkstra")
+    graph.add_arcs([["C", "A", -3, "one"]])
+    with pytest.raises(ValueError):
+        graph.all_pairs_shortest_path("floyd_warshall")
+
+
+def test_all_pairs_simple():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    result = graph.all_pairs_shortest_path()
+    a_row = result["Costs"][result["Nodes"].tolist().index("A")]
+    assert dict(zip(result["Nodes"].tolist(), a_row.tolist())) == \
+        graph.shortest_path("A")["Costs"]
+
+
+def test_shortest_path_cache():
+    graph = Graph(cache_size=2)
+    graph.add_arcs(SIMPLE_ARCS)
+    first = graph.shortest_path("A")
+    assert graph.shortest_path("A") is first
+    graph.shortest_path("B")
+    graph.shortest_path("C")
+    assert graph.cache_info() == {"Hits": 1, "Misses": 3,
+                                  "Size": 2, "MaxSize": 2}
+    # "A" was least recently used, so it was dropped
+    assert graph.shortest_path("A") is not first
+    assert graph.cache_info()["Misses"] == 4
+    graph.add_arcs([["A", "C", 1, "one"]])
+    assert graph.cache_info()["Size"] == 0
+    assert graph.shortest_path("A")["Costs"]["C"] == 1
+    graph._add_arc("A", "C", 2, "one")
+    assert graph.shortest_path("A")["Costs"]["C"] == 2
+    uncached = Graph()
+    uncached.add_arcs(SIMPLE_ARCS)
+    assert uncached.shortest_path("A") is not uncached.shortest_path("A")
+    assert uncached.cache_info()["Misses"] == 0
+
+
+def test_shortest_path_to():
+    graph = random_graph(num_nodes=60, num_arcs=150, seed=1)
+    nodes = sorted(graph.nodes)
+    for source in nodes[:10]:
+        tree = graph.shortest_path(source)
+        for target in nodes:
+            for method in ["dijkstra", "bidirectional", "astar",
+                           "hierarchy"]:
+                result = graph.shortest_path_to(
+                    source, target, method=method,
+                    heuristic=lambda node, target: 0)
+                if target in tree["Costs"]:
+                    assert result["Cost"] == tree["Costs"][target]
+                    assert result["Path"][0] == source
+                    assert result["Path"][-1] == target
+                    assert sum(graph.costs[arc] for arc in zip(
+                        result["Path"][:-1], result["Path"][1:])) == \
+                        result["Cost"]
+                else:
+                    assert result == {"Cost": np.inf, "Path": None}
+    with pytest.raises(ValueError):
+        graph.shortest_path_to(nodes[0], nodes[1], method="astar")
+    with pytest.raises(ValueError):
+        graph.shortest_path_to(nodes[0], "Z")
+
+
+def test_compact_copy_direct_changes():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    assert graph.shortest_path_to("A", "C")["Cost"] == 10
+    hierarchy = graph.contraction_hierarchy()
+    # Costs changed directly are picked up after clearing the cache
+    graph.costs[("B", "C")] = 100
+    graph.clear_cache()
+    assert graph.shortest_path_to("A", "C")["Cost"] == 25
+    assert graph.to_compact().shortest_path("A")["Costs"] == \
+        graph.shortest_path("A")["Costs"]
+    assert graph.contraction_hierarchy() is not hierarchy
+    assert graph.shortest_path_to("A", "C", method="hierarchy")["Cost"] == 25
+    # Arcs removed directly are noticed, not left stale
+    graph.arcs["A"].remove("D")
+    del graph.costs[("A", "D")]
+    assert graph.shortest_path_to("A", "C")["Cost"] == 107
+    # Unchanged graphs keep the same copy
+    assert graph.to_compact() is graph.to_compact()
+
+
+def test_shortest_path_to_astar_coordinates():
+    # Grid where each arc costs its length, so straight line distance
+    #  is a valid heuristic
+    coordinates = {(x, y): (x, y) for x in range(10) for y in range(10)}
+    arcs = [[(x, y), (x + dx, y + dy), np.hypot(dx, dy), "two"]
+            for x, y in coordinates for dx, dy in [(1, 0), (0, 1), (1, 1)]
+            if (x + dx, y + dy) in coordinates]
+    graph = Graph()
+    graph.add_arcs(arcs)
+    result = graph.shortest_path_to((0, 0), (9, 4), method="astar",
+                                    coordinates=coordinates)
+    expected = graph.shortest_path((0, 0))["Costs"][(9, 4)]
+    assert result["Cost"] == pytest.approx(expected)
+    # Compact copy is rebuilt after adding arcs
+    graph.add_arcs([[(0, 0), (9, 4), 1, "one"]])
+    assert graph.shortest_path_to((0, 0), (9, 4))["Path"] == \
+        ((0, 0), (9, 4))
+
+
+def test_shortest_path_predecessors():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS + [["G", "A", 1, "one"]])
+    analysis = graph.shortest_path("A")
+    tree = graph.shortest_path("A", predecessors=True)
+    assert isinstance(tree, ShortestPathTree)
+    assert tree["Costs"] == analysis["Costs"]
+    assert tree["Paths"] == analysis["Paths"]
+    assert tree.predecessors == {"B": "A", "C": "B", "D": "A",
+                                 "E": "D", "F": "E"}
+    assert tree.path("F") == ("A", "D", "E", "F")
+    assert tree.path("A") == ("A",)
+    assert tree.path("G") is None
+    assert tree.paths(["C", "G", "E"]) == {"C": ("A", "B", "C"),
+                                           "G": None,
+                                           "E": ("A", "D", "E")}
+    with pytest.raises(ValueError):
+        tree.path("Z")
+    graph = random_graph(num_nodes=200, num_arcs=600, seed=2)
+    tree = graph.shortest_path(0, predecessors=True)
+    assert tree["Costs"] == graph.shortest_path(0)["Costs"]
+    for node, path in tree["Paths"].items():
+        assert path[0] == 0 and path[-1] == node
+        assert sum(graph.costs[arc] for arc in zip(path[:-1], path[1:])) == \
+            tree["Costs"][node]
+
+
+def test_shortest_path_bellman_ford():
+    graph = random_graph(num_nodes=80, num_arcs=300, seed=3)
+    for source in [0, 7, 42]:
+        assert graph.shortest_path(source, method="bellman_ford")["Costs"] \
+            == graph.shortest_path(source)["Costs"]
+    # Negative costs without a negative cycle
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS + [["A", "G", 2, "one"],
+                                  ["G", "C", -4, "one"]])
+    with pytest.raises(ValueError):
+        graph.shortest_path("A")
+    analysis = graph.shortest_path("A", method="bellman_ford")
+    assert analysis["Costs"]["C"] == -2
+    assert analysis["Costs"]["F"] == 8
+    assert analysis["Paths"]["F"] == ("A", "G", "C", "F")
+    tree = graph.shortest_path("A", predecessors=True, method="bellman_ford")
+    assert tree.path("F") == ("A", "G", "C", "F")
+    floyd = graph.all_pairs_shortest_path("floyd_warshall")
+    nodes = floyd["Nodes"].tolist()
+    assert dict(zip(nodes, floyd["Costs"][nodes.index("A")].tolist())) == \
+        analysis["Costs"]
+
+
+def test_negative_cycle():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS + [["C", "D", -30, "one"],
+                                  ["H", "A", 1, "one"]])
+    with pytest.raises(NegativeCycleError) as error:
+        graph.shortest_path("A", method="bellman_ford")
+    cycle = error.value.cycle
+    assert set(cycle) == {"C", "D", "E", "F"}
+    assert sum(graph.costs[arc] for arc in
+               zip(cycle, cycle[1:] + cycle[:1])) < 0
+    with pytest.raises(NegativeCycleError):
+        graph.all_pairs_shortest_path("floyd_warshall")
+    with pytest.raises(ValueError):
+        graph.shortest_path("A", method="spfa")
+    # Negative cycles that cannot be reached from the source are ignored
+    graph = Graph()
+    graph.add_arcs([["A", "B", 1, "one"], ["B", "A", -2, "one"],
+                    ["C", "D", 1, "one"]])
+    assert graph.shortest_path("C", method="bellman_ford")["Costs"] == \
+        {"C": 0, "D": 1}
+
+
+def test_contraction_hierarchy(tmp_path):
+    graph = random_graph(num_nodes=300, num_arcs=900, seed=6)
+    hierarchy = graph.contraction_hierarchy(path=tmp_path / "index")
+    assert graph.contraction_hierarchy() is hierarchy
+    assert sorted(hierarchy.rank.tolist()) == \
+        list(range(len(hierarchy.labels)))
+    loaded = ContractionHierarchy.load(tmp_path / "index", mmap_mode="r")
+    rng = np.random.default_rng(6)
+    for source, target in rng.integers(0, 300, (200, 2)).tolist():
+        expected = graph.shortest_path_to(source, target)
+        for index in [hierarchy, loaded]:
+            result = index.shortest_path_to(source, target)
+            assert result["Cost"] == expected["Cost"]
+            if result["Path"] is not None:
+                assert result["Path"][0] == source
+                assert result["Path"][-1] == target
+                assert sum(graph.costs[arc] for arc in zip(
+                    result["Path"][:-1], result["Path"][1:])) == \
+                    result["Cost"]
+    with pytest.raises(ValueError):
+        hierarchy.shortest_path_to(0, "Z")
+    # Index is rebuilt after adding arcs
+    graph.add_arcs([[0, 299, 0, "one"]])
+    assert graph.shortest_path_to(0, 299, method="hierarchy") == \
+        {"Cost": 0, "Path": (0, 299)}
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS + [["C", "G", -1, "one"]])
+    with pytest.raises(ValueError):
+        graph.contraction_hierarchy()
+
+
+def all_loopless_paths(graph, source, target):
+    """Cost and path of every loopless path, found by depth-first search"""
+    paths = []
+    stack = [(source,)]
+    while stack:
+        path = stack.pop()
+        if path[-1] == target:
+            paths.append((sum(graph.costs[arc] for arc in zip(
+                path[:-1], path[1:])), path))
+            continue
+        stack.extend(path + (to_node,) for from_node, to_node in graph.costs
+                     if from_node == path[-1] and to_node not in path)
+    return sorted(paths)
+
+
+def test_k_shortest_paths():
+    graph = random_graph(num_nodes=10, num_arcs=25, seed=7)
+    nodes = sorted(graph.nodes)
+    for source in nodes[:4]:
+        for target in nodes:
+            if target == source:
+                continue
+            expected = all_loopless_paths(graph, source, target)
+            results = graph.k_shortest_paths(source, target, 30)
+            assert results["Costs"] == [cost for cost, _ in expected[:30]]
+            assert len(set(results["Paths"])) == len(results["Paths"])
+            for cost, path in zip(results["Costs"], results["Paths"]):
+                assert (cost, path) in expected
+    assert graph.k_shortest_paths(source, source, 3) == \
+        {"Costs": [0], "Paths": [(source,)]}
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS)
+    assert graph.k_shortest_paths("A", "C", 5) == \
+        {"Costs": [10, 25], "Paths": [("A", "B", "C"),
+                                      ("A", "D", "E", "F", "C")]}
+    assert graph.k_shortest_paths("C", "A", 5) == {"Costs": [], "Paths": []}
+    with pytest.raises(ValueError):
+        graph.k_shortest_paths("A", "Z", 5)
+
+
+def test_shortest_paths(tmp_path, monkeypatch):
+    graph = random_graph(num_nodes=80, num_arcs=300, seed=5)
+    sources = [0, 3, 3, 17, 42]
+    expected = {source: graph.shortest_path(source) for source in sources}
+    # Small batches are solved in this process, whatever is asked for
+    with monkeypatch.context() as patch:
+        patch.setattr("ormm.network.paths._pool_context", None)
+        assert graph.shortest_paths(sources) == expected
+        assert graph.shortest_paths(sources, processes=2) == expected
+    monkeypatch.setattr("ormm.network.paths._WORK_PER_PROCESS", 1)
+    for processes, chunksize in [(None, None), (2, 1), (2, None)]:
+        results = graph.shortest_paths(sources, processes=processes,
+                                       chunksize=chunksize)
+        assert list(results) == [0, 3, 17, 42]
+        assert results == expected
+    trees = graph.shortest_paths(sources, predecessors=True, processes=1)
+    assert isinstance(trees[17], ShortestPathTree)
+    assert trees[17]["Costs"] == expected[17]["Costs"]
+    # Workers map the saved files of a memory-mapped graph
+    graph.save(tmp_path / "graph")
+    mapped = CompactGraph.load(tmp_path / "graph", mmap_mode="r")
+    assert mapped.shortest_paths(sources, processes=2) == expected
+    with pytest.raises(ValueError):
+        graph.shortest_paths([0, "Z"])
+
+
+def test_update_costs():
+    rng = np.random.default_rng(3)
+    for seed in range(10):
+        graph = random_graph(num_nodes=60, num_arcs=200, seed=seed)
+        graph.cache_size = 5
+        sources = [0, 1, 2]
+        for source in sources:
+            graph.shortest_path(source)
+        snapshot = graph.snapshot()
+        compact = graph.to_compact()
+        trees = [compact.shortest_path(source, predecessors=True)
+                 for source in sources]
+        arcs = list(graph.costs)
+        first = graph.shortest_path(0)
+        first_costs = dict(first["Costs"])
+        for _ in range(5):
+            # Raise costs of arcs on the trees, and lower some others
+            changes = [[*arcs[position], int(rng.integers(0, 30)), "one"]
+                       for position in rng.choice(len(arcs), 8,
+                                                  replace=False)]
+            changes += [[tree.labels[tree.pred[node]], tree.labels[node],
+                         100, "one"]
+                        for tree in trees[:1]
+                        for node in rng.choice(tree.reached, 3)
+                        if tree.pred[node] != -1]
+            graph.update_costs(changes)
+            trees = compact.update_costs(*zip(*[change[:3]
+                                                for change in changes]),
+                                         trees=trees)
+            fresh = Graph(graph.arcs, graph.costs, graph.nodes)
+            for source, tree in zip(sources, trees):
+                expected = fresh.shortest_path(source)["Costs"]
+                results = graph.shortest_path(source)
+                assert results["Costs"] == expected
+                assert tree.costs == pytest.approx(expected)
+                # Paths may differ between ties, but must cost the same
+                for paths in [results["Paths"], tree.paths()]:
+                    assert paths.keys() == expected.keys()
+                    for node, path in paths.items():
+                        assert path[0] == source and path[-1] == node
+                        assert sum(graph.costs[arc] for arc in zip(
+                            path, path[1:])) == expected[node]
+        assert graph.cache_info()["Misses"] == len(sources)
+        assert graph.to_compact() is compact
+        # Results returned and snapshots taken before are left alone
+        assert first["Costs"] == first_costs
+        assert snapshot == random_graph(60, 200, seed).snapshot()
+        costs = compact.costs
+        graph.update_costs([changes[0]])
+        assert compact.costs is costs
+    with pytest.raises(ValueError):
+        graph.update_costs([[0, "Z", 1, "one"]])
+    with pytest.raises(ValueError):
+        compact.update_costs([0], [0], [-1], trees=trees)
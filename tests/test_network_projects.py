@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+
+from ormm.network import Graph
+from ormm.network.projects import critical_path, topological_levels
+
+# Activity-on-arc project network, with a critical path of 1, 3, 4, 5
+PROJECT_ARCS = [[1, 2, 3, "one"],
+                [1, 3, 2, "one"],
+                [2, 4, 4, "one"],
+                [3, 4, 6, "one"],
+                [4, 5, 1, "one"]]
+
+
+def random_project(num_nodes=30, num_arcs=80, seed=0):
+    """Random project network, with arcs from lower to higher nodes"""
+    rng = np.random.default_rng(seed)
+    ends = np.sort(rng.integers(0, num_nodes, (num_arcs, 2)), axis=1)
+    ends = ends[ends[:, 0] != ends[:, 1]]
+    return ends[:, 0], ends[:, 1], rng.random(len(ends)) * 10
+
+
+def test_critical_path():
+    graph = Graph()
+    graph.add_arcs(PROJECT_ARCS)
+    schedule = graph.critical_path()
+    assert schedule["Duration"] == 9
+    assert schedule["CriticalPath"] == (1, 3, 4, 5)
+    activities = {(from_node, to_node): (start, latest, slack)
+                  for from_node, to_node, start, latest, slack in zip(
+                      schedule["From"], schedule["To"],
+                      schedule["EarliestStart"], schedule["LatestStart"],
+                      schedule["Slack"])}
+    assert activities == {(1, 2): (0, 1, 1), (1, 3): (0, 0, 0),
+                          (2, 4): (3, 4, 1), (3, 4): (2, 2, 0),
+                          (4, 5): (8, 8, 0)}
+    graph.add_arcs([[5, 1, 1, "one"]])
+    with pytest.raises(ValueError):
+        graph.critical_path()
+    graph = Graph()
+    graph.add_arcs([[1, 2, -1, "one"]])
+    with pytest.raises(ValueError):
+        graph.critical_path()
+
+
+def test_critical_path_random():
+    # Compare with the recurrences over nodes in numbered order
+    for seed in range(10):
+        sources, targets, durations = random_project(seed=seed)
+        duration, earliest_start, latest_start, slack, path = \
+            critical_path(30, sources, targets, durations)
+        earliest = np.zeros(30)
+        for node in range(30):
+            into = targets == node
+            if into.any():
+                earliest[node] = (earliest[sources[into]] +
+                                  durations[into]).max()
+        latest = np.full(30, earliest.max())
+        for node in reversed(range(30)):
+            out = sources == node
+            if out.any():
+                latest[node] = (latest[targets[out]] - durations[out]).min()
+        assert duration == pytest.approx(earliest.max())
+        assert earliest_start == pytest.approx(earliest[sources])
+        assert latest_start == pytest.approx(latest[targets] - durations)
+        assert (slack >= -1e-9).all()
+        assert earliest[path[0]] == 0 and earliest[path[-1]] == duration
+        levels = topological_levels(30, sources, targets)
+        assert (levels[sources] < levels[targets]).all()
+
+
+def test_pert():
+    graph = Graph()
+    graph.add_arcs(PROJECT_ARCS)
+    estimates = {(1, 2): (2, 3, 10), (1, 3): (1, 2, 3),
+                 (2, 4): (3, 4, 11), (3, 4): (5, 6, 7)}
+    for distribution in ["beta", "triangular"]:
+        results = graph.pert(estimates, num_samples=5000, deadline=12,
+                             distribution=distribution, seed=0)
+        assert len(results["Durations"]) == 5000
+        assert 9 <= results["Mean"] <= 22
+        assert results["Durations"].min() >= 7
+        assert 0 < results["Probability"] < 1
+        criticality = dict(zip(zip(results["From"], results["To"]),
+                               results["Criticality"]))
+        assert criticality[(4, 5)] == 1
+        # One of the two branches is critical in every sample
+        assert criticality[(1, 2)] + criticality[(1, 3)] >= 1
+        assert 0 < criticality[(1, 2)] < 1
+    # Same seed, same results
+    assert (graph.pert(estimates, num_samples=100, seed=1)["Durations"] ==
+            graph.pert(estimates, num_samples=100, seed=1)["Durations"]).all()
+    # Fixed durations give the critical path duration every time
+    results = graph.pert({}, num_samples=10)
+    assert (results["Durations"] == 9).all()
+    assert results["Probability"] is None
+    with pytest.raises(ValueError):
+        graph.pert({(1, 2): (3, 2, 4)})
+    with pytest.raises(ValueError):
+        graph.pert(estimates, distribution="uniform")
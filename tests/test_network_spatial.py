@@ -0,0 +1,122 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ormm.network import CompactGraph, Graph
+from ormm.network.spatial import neighbor_pairs
+
+
+def all_distances(points, metric):
+    """Distance between every pair of points, inf from a point to itself"""
+    differences = points[:, np.newaxis] - points[np.newaxis]
+    if metric == "manhattan":
+        distances = np.abs(differences).sum(axis=2)
+    else:
+        distances = np.sqrt((differences**2).sum(axis=2))
+    np.fill_diagonal(distances, np.inf)
+    return distances
+
+
+def test_neighbor_pairs():
+    rng = np.random.default_rng(0)
+    for dimensions in [1, 2, 3]:
+        points = rng.random((200, dimensions))
+        # Tight cluster, and repeated points
+        points[:20] *= 0.01
+        points[20:25] = points[25]
+        for metric in ["euclidean", "manhattan"]:
+            distances = all_distances(points, metric)
+            for k, radius in [(4, None), (None, 0.2), (6, 0.1)]:
+                sources, targets, found = neighbor_pairs(
+                    points, k, radius, metric, symmetric=False)
+                assert found == pytest.approx(distances[sources, targets])
+                for point in range(len(points)):
+                    expected = np.sort(distances[point])
+                    if k is not None:
+                        expected = expected[:k]
+                    if radius is not None:
+                        expected = expected[expected <= radius]
+                    # Neighbors come in order of distance
+                    assert found[sources == point] == pytest.approx(
+                        expected)
+                pairs = {(min(pair), max(pair))
+                         for pair in zip(sources.tolist(), targets.tolist())}
+                sources, targets, _ = neighbor_pairs(points, k, radius,
+                                                     metric)
+                assert (sources < targets).all()
+                assert set(zip(sources.tolist(), targets.tolist())) == pairs
+    with pytest.raises(ValueError):
+        neighbor_pairs(points)
+    with pytest.raises(ValueError):
+        neighbor_pairs(points, k=2, metric="chebyshev")
+
+
+def test_neighbor_pairs_clustered():
+    rng = np.random.default_rng(2)
+    # Most points in one tiny cluster, so one grid cell sized for the
+    #  rest would hold all of them
+    points = np.vstack([rng.random((5000, 2)) * 100,
+                        50 + rng.random((20000, 2)) * 1e-3])
+    tracemalloc.start()
+    sources, targets, found = neighbor_pairs(points, 8, symmetric=False)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert peak < 200 * 2**20
+    assert len(found) == 8 * len(points)
+    for point in rng.choice(len(points), 100, replace=False):
+        distances = np.sqrt(((points - points[point])**2).sum(axis=1))
+        distances[point] = np.inf
+        assert found[sources == point] == pytest.approx(
+            np.sort(distances)[:8])
+
+
+def test_neighbor_pairs_haversine():
+    rng = np.random.default_rng(1)
+    points = np.column_stack([rng.uniform(-80, 80, 300),
+                              rng.uniform(-180, 180, 300)])
+    latitude, longitude = np.radians(points).T[:, :, np.newaxis]
+    # Great circle distances from the haversine formula
+    distances = 2 * 6371.0088 * np.arcsin(np.sqrt(
+        np.sin((latitude.T - latitude) / 2)**2
+        + np.cos(latitude) * np.cos(latitude.T)
+        * np.sin((longitude.T - longitude) / 2)**2))
+    np.fill_diagonal(distances, np.inf)
+    sources, targets, found = neighbor_pairs(points, 3, metric="haversine",
+                                             symmetric=False)
+    assert found == pytest.approx(distances[sources, targets])
+    assert found.reshape(300, 3) == pytest.approx(
+        np.sort(distances, axis=1)[:, :3])
+    sources, targets, found = neighbor_pairs(points, radius=1500,
+                                             metric="haversine")
+    assert len(found) == np.triu(distances <= 1500).sum()
+    assert (found <= 1500 + 1e-6).all()
+
+
+def test_from_coordinates():
+    points = pd.DataFrame({"x": [0, 1, 0, 3, 9], "y": [0, 0, 2, 4, 9]},
+                          index=list("ABCDE"))
+    graph = Graph.from_coordinates(points, k=1, metric="manhattan")
+    assert graph.nodes == set("ABCDE")
+    assert graph.costs[("D", "C")] == graph.costs[("C", "D")] == 5
+    assert graph.costs[("E", "D")] == 11
+    assert ("B", "C") not in graph.costs
+    compact = CompactGraph.from_coordinates(points, k=1, metric="manhattan")
+    assert compact.num_arcs == len(graph.costs)
+    assert compact.shortest_path("E")["Costs"] == \
+        graph.shortest_path("E")["Costs"]
+    # Only arcs from each point to its own nearest neighbor
+    graph = Graph.from_coordinates(points, k=1, direction="one",
+                                   metric="manhattan")
+    assert graph.arcs["C"] == ["A"] and "E" not in graph.arcs["D"]
+    # Points too far from the rest are left without arcs
+    graph = Graph.from_coordinates(points.to_numpy(), radius=2.5)
+    assert graph.nodes == set(range(5))
+    assert set(graph.costs) == {(0, 1), (1, 0), (0, 2), (2, 0), (1, 2),
+                                (2, 1)}
+    assert graph.costs[(1, 2)] == pytest.approx(np.sqrt(5))
+    with pytest.raises(ValueError):
+        Graph.from_coordinates(points, labels=list("AABCD"), k=1)
+    with pytest.raises(ValueError):
+        CompactGraph.from_coordinates(points, labels=list("AB"), k=1)
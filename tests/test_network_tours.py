@@ -0,0 +1,61 @@
+from itertools import permutations
+
+import numpy as np
+import pytest
+
+from ormm.network import Graph, solve_tsp
+from ormm.network.tours import tour_cost
+
+
+def random_cities(num_cities, seed=0):
+    """Distances between random points in the unit square"""
+    points = np.random.default_rng(seed).random((num_cities, 2))
+    return np.sqrt(((points[:, np.newaxis] - points)**2).sum(axis=2))
+
+
+def test_solve_tsp():
+    for seed in range(5):
+        distances = random_cities(8, seed)
+        best = min(tour_cost(distances, (0,) + order)
+                   for order in permutations(range(1, 8)))
+        for construction in ["nearest", "savings"]:
+            cost, tour = solve_tsp(distances, construction=construction)
+            assert tour[0] == 0 and sorted(tour) == list(range(8))
+            assert cost == pytest.approx(tour_cost(distances, tour))
+            assert best - 1e-9 <= cost <= 1.25 * best
+        # Distances that differ by direction use Or-opt moves only
+        asymmetric = distances + np.random.default_rng(seed).random((8, 8))
+        cost, tour = solve_tsp(asymmetric, start=3)
+        assert tour[0] == 3 and sorted(tour) == list(range(8))
+        assert cost == pytest.approx(tour_cost(asymmetric, tour))
+    # Local search improves on the nearest neighbor tour, and stops
+    #  early with a time limit
+    distances = random_cities(300, seed=1)
+    nearest = tour_cost(distances, list(range(300)))
+    cost, tour = solve_tsp(distances)
+    assert cost < nearest and sorted(tour) == list(range(300))
+    assert solve_tsp(distances, time_limit=0)[0] >= cost
+    assert solve_tsp(np.zeros((0, 0))) == (0.0, [])
+    with pytest.raises(ValueError):
+        solve_tsp(distances, construction="insertion")
+    with pytest.raises(ValueError):
+        solve_tsp(np.zeros((2, 3)))
+
+
+def test_graph_tsp():
+    # Ring of nodes with expensive chords
+    graph = Graph()
+    graph.add_arcs([[node, (node + 1) % 6, 1, "two"] for node in range(6)] +
+                   [[node, (node + 3) % 6, 5, "two"] for node in range(3)])
+    result = graph.tsp(processes=1)
+    assert result["Cost"] == 6
+    assert result["Tour"] in [(0, 1, 2, 3, 4, 5), (0, 5, 4, 3, 2, 1)]
+    assert graph.tsp(distances="costs", construction="savings") == result
+    # Nodes 0, 2 and 4 are only joined through the others
+    result = graph.tsp([2, 0, 4], processes=1)
+    assert result["Cost"] == 6 and result["Tour"][0] == 2
+    assert graph.tsp([2, 0, 4], distances="costs")["Cost"] == np.inf
+    with pytest.raises(ValueError):
+        graph.tsp([0, 7])
+    with pytest.raises(ValueError):
+        graph.tsp(distances="euclidean")
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from ormm.network import Graph
+from tests.test_network_flow import SIMPLE_ARCS
+from tests.test_network_paths import random_graph
+
+
+def test_minimum_spanning_tree():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS + [["G", "H", -1, "one"]])
+    for method in ["kruskal", "prim"]:
+        tree = graph.minimum_spanning_tree(method)
+        # Forest of the two components, so one arc fewer per component
+        assert len(tree["Costs"]) == len(graph.nodes) - 2
+        assert tree["Cost"] == 24
+        assert set(zip(tree["From"], tree["To"], tree["Costs"])) <= \
+            {(from_node, to_node, cost)
+             for (from_node, to_node), cost in graph.costs.items()}
+    with pytest.raises(ValueError):
+        graph.minimum_spanning_tree("boruvka")
+    # Both methods find trees of the same cost, which joins the same nodes
+    graph = random_graph(num_nodes=200, num_arcs=500, seed=4)
+    kruskal_tree = graph.minimum_spanning_tree("kruskal")
+    prim_tree = graph.minimum_spanning_tree("prim")
+    assert kruskal_tree["Cost"] == prim_tree["Cost"]
+    components = graph.connected_components()
+    assert len(kruskal_tree["Costs"]) == len(prim_tree["Costs"]) == \
+        len(graph.nodes) - components["Count"]
+
+
+def test_connected_components():
+    graph = Graph()
+    graph.add_arcs(SIMPLE_ARCS + [["G", "H", 1, "one"],
+                                  ["H", "I", 1, "one"]])
+    graph.nodes.add("J")
+    results = graph.connected_components()
+    assert results["Count"] == 3
+    groups = {}
+    for node, component in zip(results["Nodes"], results["Components"]):
+        groups.setdefault(component, set()).add(node)
+    assert sorted(map(sorted, groups.values())) == \
+        [["A", "B", "C", "D", "E", "F"], ["G", "H", "I"], ["J"]]
+    # Only "C" and "F" can reach each other
+    results = graph.connected_components(strong=True)
+    assert results["Count"] == 9
+    components = dict(zip(results["Nodes"], results["Components"]))
+    assert components["C"] == components["F"]
+    # Arcs go from higher to lower numbered components
+    for from_node, to_node in graph.costs:
+        assert components[from_node] >= components[to_node]
+    assert Graph().connected_components()["Count"] == 0
+    assert isinstance(results["Components"], np.ndarray)